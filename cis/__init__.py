@@ -44,7 +44,7 @@ def read_data(filenames, variable, product=None):
     return data_list[0]
 
 
-def read_data_list(filenames, variables, product=None, aliases=None):
+def read_data_list(filenames, variables, product=None, aliases=None, workers=None):
     """
     Read multiple data objects from a list of files. Files can be either gridded or ungridded but not a mix of both.
 
@@ -57,17 +57,22 @@ def read_data_list(filenames, variables, product=None, aliases=None):
     :param str product: The name of the data reading plugin to use to read the data (e.g. ``Cloud_CCI_L2``).
     :param aliases: List of aliases to put on each variable's data object as an alternative means of identifying them.
     :type aliases: string or list
+    :param int workers: The number of files to read at once, including when the data is read later, on first use. By
+     default this is set by the ``CIS_READ_WORKERS`` environment variable, or is one. The data is the same however many
+     files are read at once.
     :return:  A list of the data read out (either a :class:`GriddedDataList` or :class:`UngriddedDataList` depending on
      the type of data contained in the files)
     """
     from cis.data_io.data_reader import DataReader, expand_filelist
+    from cis.utils import read_workers
     try:
         file_set = expand_filelist(filenames)
     except ValueError as e:
         raise IOError(e)
     if len(file_set) == 0:
         raise IOError("No files found which match: {}".format(filenames))
-    return DataReader().read_data_list(file_set, variables, product, aliases)
+    with read_workers(workers):
+        return DataReader().read_data_list(file_set, variables, product, aliases)
 
 
 def get_variables(filenames, product=None, type=None):
@@ -1,7 +1,19 @@
 import logging
+from collections import OrderedDict
 import numpy as np
 from datetime import datetime
 
+from cis.collocation.col_framework import AbstractDataOnlyKernel
+
+#: The statistics held for each variable of a partial aggregate, in the order they are output
+partial_aggregate_statistics = ('count', 'sum', 'sum_of_squared_deviations', 'min', 'max')
+
+#: Attributes which identify the variable and statistic held in each cube of a partial aggregate
+PARTIAL_AGGREGATE_VARIABLE_ATTRIBUTE = 'cis_partial_aggregate_variable'
+PARTIAL_AGGREGATE_STATISTIC_ATTRIBUTE = 'cis_partial_aggregate_statistic'
+PARTIAL_AGGREGATE_LONG_NAME_ATTRIBUTE = 'cis_partial_aggregate_long_name'
+PARTIAL_AGGREGATE_STANDARD_NAME_ATTRIBUTE = 'cis_partial_aggregate_standard_name'
+
 
 class UngriddedAggregator(object):
 
@@ -13,9 +25,107 @@ class UngriddedAggregator(object):
         Performs aggregation for ungridded data by first generating a new grid, converting it into a cube, then
         collocating using the appropriate kernel and a cube cell constraint
         """
+        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint
+
+        aggregation_cube = self._make_aggregation_cube(data)
+
+        collocator = GeneralGriddedCollocator()
+        constraint = BinnedCubeCellOnlyConstraint()
+        aggregated_cube = collocator.collocate(aggregation_cube, data, constraint, kernel)
+        self._add_max_min_bounds_for_collapsed_coords(aggregated_cube, data)
+        self._rename_clashing_variables(aggregated_cube, aggregation_cube)
+
+        return aggregated_cube
+
+    def aggregate_chunks(self, chunks, kernel):
+        """
+        Performs aggregation for ungridded data supplied as a sequence of chunks (for example one per file), so that
+        only one chunk needs to be in memory at a time. The values in each cell of the grid are accumulated into
+        running statistics, from which the kernel calculates the aggregated values once every chunk has been read, so
+        only kernels with a get_value_for_statistics method can be used. Coordinates which are aggregated onto a grid
+        need an explicit start and end.
+
+        :param chunks: iterable of UngriddedData or UngriddedDataList, each with the same variables and coordinates
+        :param kernel: the kernel to use in the aggregation
+        :return: GriddedDataList of the aggregated data
+        """
+        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint, \
+            make_coord_map, _fix_longitude_range
+        from cis.collocation.data_index import GridCellBinIndexInSlices
+        from cis.data_io.gridded_data import GriddedDataList
+        from cis.exceptions import UserPrintableException
+
+        if not hasattr(kernel, 'get_value_for_statistics'):
+            raise UserPrintableException("The {} kernel can not be used to aggregate data in chunks"
+                                         .format(kernel.__class__.__name__))
+
+        aggregation_cube = None
+        for data in chunks:
+            variables = data if isinstance(data, list) else [data]
+            if aggregation_cube is None:
+                aggregation_cube = self._make_aggregation_cube(variables[0])
+                coords = aggregation_cube.coords()
+                coord_map = make_coord_map(aggregation_cube, variables[0])
+                output_coords = [coords[ci] for (hpi, ci, shi) in coord_map]
+                shape = tuple(len(coord.points) for coord in output_coords)
+                statistics = [CellStatistics(shape) for _ in variables]
+                # The running minimum and maximum of the fully collapsed coordinates, for their points and bounds
+                collapsed_ranges = {coord.name(): [np.inf, -np.inf] for coord in coords
+                                    if np.all(np.isinf(coord.bounds))}
+            elif len(variables) != len(statistics):
+                raise UserPrintableException("Every chunk of data to aggregate must contain the same variables")
+
+            for name, coord_range in collapsed_ranges.items():
+                coord_start, coord_end, coord_centre = self._get_coord_start_end_centre(variables[0].coord(name))
+                coord_range[0] = np.minimum(coord_range[0], coord_start)
+                coord_range[1] = np.maximum(coord_range[1], coord_end)
+
+            for variable, cell_statistics in zip(variables, statistics):
+                data_points = variable.get_non_masked_points()
+                _fix_longitude_range(coords, data_points)
+                # Each chunk is only binned once, so there's no point keeping its index in the index cache
+                constraint = BinnedCubeCellOnlyConstraint()
+                constraint.grid_cell_bin_index_slices = GridCellBinIndexInSlices()
+                constraint.grid_cell_bin_index_slices.index_data(coords, data_points, coord_map, use_cache=False)
+                out_indices, data_values, offsets = constraint.get_cell_segments_for_data_only(False, data_points,
+                                                                                               aggregation_cube)
+                if len(offsets) > 1:
+                    cell_statistics.add(np.ravel_multi_index(out_indices, shape), data_values, offsets)
+
+        if aggregation_cube is None:
+            raise UserPrintableException("There is no data to aggregate")
+
+        for coord in coords:
+            if coord.name() in collapsed_ranges:
+                coord_start, coord_end = collapsed_ranges[coord.name()]
+                coord.points = np.array([coord_start + (coord_end - coord_start) / 2.0])
+                coord.bounds = np.array([[coord_start, coord_end]])
+
+        collocator = GeneralGriddedCollocator()
+        aggregated_cube = GriddedDataList([])
+        for variable, cell_statistics in zip(variables, statistics):
+            empty = np.reshape(cell_statistics.count == 0, shape)
+            kernel_vals = np.reshape(kernel.get_value_for_statistics(cell_statistics), (kernel.return_size,) + shape)
+            values = [np.ma.masked_array(kernel_val.astype(np.float64), mask=empty, fill_value=collocator.fill_value)
+                      for kernel_val in kernel_vals]
+            output = collocator._create_output(variable, values, output_coords, coord_map, kernel)
+            if isinstance(kernel, PartialAggregateKernel):
+                _set_partial_aggregate_attributes(output, variable.var_name, variable.long_name,
+                                                  variable.standard_name)
+            aggregated_cube.extend(output)
+        self._rename_clashing_variables(aggregated_cube, aggregation_cube)
+
+        return aggregated_cube
+
+    def _make_aggregation_cube(self, data):
+        """
+        Make a cube whose cells are those of the aggregation grid, fully collapsing any coordinates of the data which
+        aren't in the grid
+        :param data: the data to aggregate
+        :return: iris Cube
+        """
         from cis.exceptions import CoordinateNotFoundError
         from iris.cube import Cube
-        from cis.collocation.col_implementations import GeneralGriddedCollocator, BinnedCubeCellOnlyConstraint
         new_cube_coords = []
         new_cube_shape = []
 
@@ -34,16 +144,17 @@ class UngriddedAggregator(object):
                                           "name.".format("' or '".join(list(self._grid.keys()))))
 
         dummy_data = np.reshape(np.arange(int(np.prod(new_cube_shape))) + 1.0, tuple(new_cube_shape))
-        aggregation_cube = Cube(dummy_data, dim_coords_and_dims=new_cube_coords)
-
-        collocator = GeneralGriddedCollocator()
-        constraint = BinnedCubeCellOnlyConstraint()
-        aggregated_cube = collocator.collocate(aggregation_cube, data, constraint, kernel)
-        self._add_max_min_bounds_for_collapsed_coords(aggregated_cube, data)
+        return Cube(dummy_data, dim_coords_and_dims=new_cube_coords)
 
-        # We need to rename any variables which clash with coordinate names otherwise they will not output correctly, we
-        # prepend it with 'aggregated_' to make it clear which variable has been aggregated (the original coordinate
-        # value will not have been.)
+    @staticmethod
+    def _rename_clashing_variables(aggregated_cube, aggregation_cube):
+        """
+        We need to rename any variables which clash with coordinate names otherwise they will not output correctly, we
+        prepend it with 'aggregated_' to make it clear which variable has been aggregated (the original coordinate
+        value will not have been.)
+        :param aggregated_cube: The list of aggregated data to rename
+        :param aggregation_cube: The cube defining the aggregation grid
+        """
         for idx, d in enumerate(aggregated_cube):
             if d.var_name in [coord.var_name for coord in aggregation_cube.coords()]:
                 new_name = "aggregated_" + d.var_name
@@ -52,8 +163,6 @@ class UngriddedAggregator(object):
                 logging.warning("Variable {} clashes with a coordinate variable name and has been renamed to: {}"
                                 .format(d.var_name, new_name))
 
-        return aggregated_cube
-
     @staticmethod
     def _get_CF_coordinate_units(coord):
         """
@@ -140,6 +249,285 @@ class UngriddedAggregator(object):
         return start, end, centre
 
 
+class CellStatistics(object):
+    """
+    The running count, sum, sum of squared deviations from the mean, minimum and maximum of the values in each cell of
+    a grid. These can be updated with a chunk of values at a time, or merged with the statistics of other values, and
+    give the same mean and standard deviation as calculating them from every value at once. The sum of squared
+    deviations is kept rather than the sum of squares, as the variance calculated from the latter loses precision
+    badly when the mean is large compared to the spread.
+    """
+
+    def __init__(self, shape):
+        """
+        :param shape: the shape of the grid
+        """
+        self.shape = tuple(shape)
+        size = int(np.prod(self.shape))
+        self.count = np.zeros(size, dtype=np.int64)
+        self.sum = np.zeros(size)
+        self.sum_of_squared_deviations = np.zeros(size)
+        self.min = np.full(size, np.inf)
+        self.max = np.full(size, -np.inf)
+
+    def add(self, cells, values, offsets):
+        """
+        Add values to the statistics.
+        :param cells: the (flat) number of each cell with values; every cell must appear at most once
+        :param values: the values in the cells, ordered by cell. The values in cells[i] are
+         ``values[offsets[i]:offsets[i+1]]``, and every cell must have at least one value
+        :param offsets: the start of each cell's values in values, followed by len(values)
+        """
+        counts = np.diff(offsets)
+        sums = np.add.reduceat(values, offsets[:-1])
+        deviations = values - np.repeat(sums / counts, counts)
+        self._merge(cells, counts, sums, np.add.reduceat(deviations ** 2, offsets[:-1]),
+                    np.minimum.reduceat(values, offsets[:-1]), np.maximum.reduceat(values, offsets[:-1]))
+
+    def merge(self, other):
+        """
+        Merge the statistics of another set of values on the same grid into these statistics.
+        :param other: CellStatistics to merge
+        """
+        if other.shape != self.shape:
+            raise ValueError("Can not merge statistics on a grid of shape {} with those of shape {}"
+                             .format(other.shape, self.shape))
+        cells = np.flatnonzero(other.count)
+        self._merge(cells, other.count[cells], other.sum[cells], other.sum_of_squared_deviations[cells],
+                    other.min[cells], other.max[cells])
+
+    def _merge(self, cells, counts, sums, sums_of_squared_deviations, mins, maxs):
+        """
+        Combine the statistics of some cells with these, using the pairwise update of Chan et al. for the sum of
+        squared deviations.
+        """
+        previous_counts = self.count[cells]
+        previous_sums = self.sum[cells]
+        total_counts = previous_counts + counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            delta = sums / counts - previous_sums / previous_counts
+            correction = np.where(previous_counts > 0, delta ** 2 * previous_counts * counts / total_counts, 0.0)
+        self.sum_of_squared_deviations[cells] += sums_of_squared_deviations + correction
+        self.count[cells] = total_counts
+        self.sum[cells] = previous_sums + sums
+        self.min[cells] = np.minimum(self.min[cells], mins)
+        self.max[cells] = np.maximum(self.max[cells], maxs)
+
+    def mean(self):
+        """
+        :return: the mean of the values in each cell; NaN for empty cells
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return self.sum / self.count
+
+    def stddev(self):
+        """
+        :return: the corrected sample standard deviation of the values in each cell; NaN for cells with fewer than two
+         values, as np.std gives
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.sqrt(self.sum_of_squared_deviations / (self.count - 1))
+
+
+class PartialAggregateKernel(AbstractDataOnlyKernel):
+    """
+    Outputs the statistics of the values in each cell which are needed to merge them with other partial aggregates on
+    the same grid, and to calculate the mean, standard deviation, minimum, maximum, sum and number of values from them.
+    See :func:`merge_partial_aggregates`.
+    """
+    return_size = len(partial_aggregate_statistics)
+
+    def get_variable_details(self, var_name, var_long_name, var_standard_name, var_units):
+        """Sets the names and units of each statistic variable based on those of the base variable.
+        :param var_name: base variable name
+        :param var_long_name: base variable long name
+        :param var_standard_name: base variable standard name
+        :param var_units: base variable units
+        :return: tuple of tuples each containing (variable name, variable long name, variable standard name, variable
+         units)
+        """
+        from cf_units import Unit
+        try:
+            squared_units = str(Unit(var_units) ** 2)
+        except (ValueError, TypeError):
+            squared_units = ''
+        return ((var_name + '_count', 'Number of values of %s' % var_long_name, None, ''),
+                (var_name + '_sum', 'Sum of %s' % var_long_name, None, var_units),
+                (var_name + '_sum_of_squared_deviations',
+                 'Sum of squared deviations from the mean of %s' % var_long_name, None, squared_units),
+                (var_name + '_min', 'Minimum of %s' % var_long_name, None, var_units),
+                (var_name + '_max', 'Maximum of %s' % var_long_name, None, var_units))
+
+    def get_value_for_data_only(self, values):
+        """
+        Returns the statistics of the values
+        """
+        return (np.size(values), np.sum(values), np.sum((values - np.mean(values)) ** 2), np.min(values),
+                np.max(values))
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Returns the statistics of each cell
+        """
+        return tuple(getattr(statistics, name) for name in partial_aggregate_statistics)
+
+
+def _set_partial_aggregate_attributes(cubes, var_name, long_name, standard_name):
+    """
+    Record which variable and statistic each cube of a partial aggregate holds, so that the partial aggregate can be
+    merged after it has been saved and loaded again
+    :param cubes: the statistic cubes of one variable, in the order of partial_aggregate_statistics
+    """
+    for cube, statistic in zip(cubes, partial_aggregate_statistics):
+        cube.attributes[PARTIAL_AGGREGATE_VARIABLE_ATTRIBUTE] = var_name
+        cube.attributes[PARTIAL_AGGREGATE_STATISTIC_ATTRIBUTE] = statistic
+        if long_name:
+            cube.attributes[PARTIAL_AGGREGATE_LONG_NAME_ATTRIBUTE] = long_name
+        if standard_name:
+            cube.attributes[PARTIAL_AGGREGATE_STANDARD_NAME_ATTRIBUTE] = standard_name
+
+
+def merge_partial_aggregates(partial_aggregates, kernel=None):
+    """
+    Merge partial aggregates of the same variables on the same grid, for example those of different files, and
+    calculate the kernel from the merged statistics. The grids must be the same apart from the bounds of fully
+    collapsed coordinates, which are widened to cover every partial aggregate.
+
+    :param partial_aggregates: iterable of partial aggregates, each a list of the cubes output by the
+     :class:`PartialAggregateKernel` (for example as loaded from a partial aggregate file)
+    :param kernel: the kernel to calculate, which must have a get_value_for_statistics method. If None the merged
+     partial aggregate is returned.
+    :return: GriddedDataList of the merged data
+    """
+    from cis.data_io.gridded_data import GriddedDataList, make_from_cube
+    from cis.exceptions import UserPrintableException
+    from cis.utils import set_standard_name_if_valid
+
+    if kernel is None:
+        kernel = PartialAggregateKernel()
+    elif not hasattr(kernel, 'get_value_for_statistics'):
+        raise UserPrintableException("The {} kernel can not be calculated from partial aggregates"
+                                     .format(kernel.__class__.__name__))
+
+    merged = OrderedDict()
+    for partial_aggregate in partial_aggregates:
+        for var_name, cubes in _get_partial_aggregate_cubes(partial_aggregate).items():
+            statistics = _get_partial_aggregate_statistics(cubes)
+            if var_name not in merged:
+                merged[var_name] = (cubes['sum'].copy(), statistics)
+            else:
+                template, merged_statistics = merged[var_name]
+                _merge_partial_aggregate_coords(template, cubes['sum'])
+                merged_statistics.merge(statistics)
+
+    if len(merged) == 0:
+        raise UserPrintableException("There are no partial aggregates to merge")
+
+    output = GriddedDataList([])
+    for var_name, (template, statistics) in merged.items():
+        long_name = template.attributes.get(PARTIAL_AGGREGATE_LONG_NAME_ATTRIBUTE, var_name)
+        standard_name = template.attributes.get(PARTIAL_AGGREGATE_STANDARD_NAME_ATTRIBUTE, None)
+        empty = np.reshape(statistics.count == 0, statistics.shape)
+        kernel_vals = np.reshape(kernel.get_value_for_statistics(statistics), (kernel.return_size,) + statistics.shape)
+        kernel_var_details = kernel.get_variable_details(var_name, long_name, standard_name, template.units)
+        cubes = []
+        for kernel_val, (name, kernel_long_name, kernel_standard_name, units) in zip(kernel_vals, kernel_var_details):
+            data = np.ma.masked_invalid(np.ma.masked_array(kernel_val.astype(np.float64), mask=empty))
+            data.set_fill_value(np.nan)
+            cube = make_from_cube(template.copy(data=data))
+            for attribute in (PARTIAL_AGGREGATE_VARIABLE_ATTRIBUTE, PARTIAL_AGGREGATE_STATISTIC_ATTRIBUTE,
+                              PARTIAL_AGGREGATE_LONG_NAME_ATTRIBUTE, PARTIAL_AGGREGATE_STANDARD_NAME_ATTRIBUTE):
+                cube.attributes.pop(attribute, None)
+            cube.var_name = name
+            cube.long_name = kernel_long_name
+            cube.standard_name = None
+            set_standard_name_if_valid(cube, kernel_standard_name)
+            try:
+                cube.units = units
+            except ValueError:
+                logging.warning("Units are not cf compliant, not setting them. Units {}".format(units))
+            cubes.append(cube)
+        if isinstance(kernel, PartialAggregateKernel):
+            _set_partial_aggregate_attributes(cubes, var_name, long_name, standard_name)
+        output.extend(cubes)
+    return output
+
+
+def read_partial_aggregate(filename, variables=None):
+    """
+    Read the partial aggregate saved in a file
+    :param str filename: the file to read
+    :param list variables: the names of the variables whose partial aggregates to read, which may contain wildcards.
+     All of them are read if None.
+    :return: list of the cubes of the partial aggregate
+    """
+    import iris
+    from fnmatch import fnmatch
+    cubes = []
+    for cube in iris.load_raw(filename):
+        var_name = cube.attributes.get(PARTIAL_AGGREGATE_VARIABLE_ATTRIBUTE, None)
+        if var_name is not None and (variables is None or any(fnmatch(var_name, pattern) for pattern in variables)):
+            cubes.append(cube)
+    return cubes
+
+
+def _get_partial_aggregate_cubes(partial_aggregate):
+    """
+    Find the statistic cubes of each variable in a partial aggregate
+    :param partial_aggregate: list of cubes
+    :return: OrderedDict of variable name to a dictionary of statistic name to cube
+    """
+    from cis.exceptions import UserPrintableException
+    variables = OrderedDict()
+    for cube in partial_aggregate:
+        var_name = cube.attributes.get(PARTIAL_AGGREGATE_VARIABLE_ATTRIBUTE, None)
+        statistic = cube.attributes.get(PARTIAL_AGGREGATE_STATISTIC_ATTRIBUTE, None)
+        if var_name is None or statistic not in partial_aggregate_statistics:
+            raise UserPrintableException("{} is not part of a partial aggregate".format(cube.name()))
+        variables.setdefault(var_name, {})[statistic] = cube
+    for var_name, cubes in variables.items():
+        missing = [statistic for statistic in partial_aggregate_statistics if statistic not in cubes]
+        if missing:
+            raise UserPrintableException("The partial aggregate of {} is missing the {} statistics"
+                                         .format(var_name, ", ".join(missing)))
+    return variables
+
+
+def _get_partial_aggregate_statistics(cubes):
+    """
+    Make the CellStatistics held in the statistic cubes of a partial aggregate
+    :param cubes: dictionary of statistic name to cube
+    :return: CellStatistics
+    """
+    statistics = CellStatistics(cubes['count'].shape)
+    empty_values = {'count': 0, 'sum': 0.0, 'sum_of_squared_deviations': 0.0, 'min': np.inf, 'max': -np.inf}
+    count = np.ma.filled(cubes['count'].data, 0).ravel()
+    for statistic in partial_aggregate_statistics:
+        values = np.ma.filled(cubes[statistic].data, empty_values[statistic]).ravel()
+        # Cells without any values are missing in the file, whatever was stored in them
+        setattr(statistics, statistic, np.where(count > 0, values, empty_values[statistic])
+                .astype(getattr(statistics, statistic).dtype))
+    return statistics
+
+
+def _merge_partial_aggregate_coords(cube, other):
+    """
+    Check that two partial aggregates are on the same grid, and widen the bounds of the length one coordinates of the
+    first to cover those of the second
+    """
+    from cis.exceptions import UserPrintableException
+    for coord in cube.dim_coords:
+        other_coord = other.coord(coord.name())
+        if len(coord.points) == 1 and coord.has_bounds() and other_coord.has_bounds():
+            start = np.minimum(coord.bounds[0, 0], other_coord.bounds[0, 0])
+            end = np.maximum(coord.bounds[0, 1], other_coord.bounds[0, 1])
+            coord.points = np.array([start + (end - start) / 2.0])
+            coord.bounds = np.array([[start, end]])
+        elif coord.shape != other_coord.shape or not np.allclose(coord.points, other_coord.points):
+            raise UserPrintableException("Partial aggregates can only be merged if they are on the same grid, but "
+                                         "the {} coordinates differ".format(coord.name()))
+
+
 def aggregation_grid_array(start, end, delta):
     from cis.time_util import cis_standard_time_unit
     new_grid = np.arange(start + delta / 2, end + delta / 2, delta)
@@ -43,6 +43,7 @@ def plot_cmd(main_arguments):
     _ = main_arguments.pop("quiet")
     _ = main_arguments.pop("verbose")
     _ = main_arguments.pop("force_overwrite")
+    _ = main_arguments.pop("read_workers", None)
     _ = main_arguments.pop("output_var", None)
 
     layer_opts = [{k: v for k, v in d.items() if k not in ['variables', 'filenames', 'product']}
@@ -71,6 +72,7 @@ def col_cmd(main_arguments):
     :param main_arguments:    The command line arguments (minus the col command)
     """
     from cis.collocation.col_framework import get_kernel
+    from cis.data_io.file_catalog import prune_files, get_collocation_extent
     from cis.parse import check_boolean
 
     # Read the sample data
@@ -91,11 +93,17 @@ def col_cmd(main_arguments):
 
     kernel = get_kernel(kern_name)(**kern_options) if kern_name else None
 
+    # Data further in time from the sample points than the box's time separation can't contribute to the output, so
+    #  files (or parts of files) outside of this aren't read
+    extent = get_collocation_extent(sample_data, col_options.get('t_sep', None)) if col_name == 'box' else {}
+
     for input_group in main_arguments.datagroups:
+        input_group['filenames'] = prune_files(input_group['filenames'], extent, input_group.get('product', None))
         # Then collocate each datagroup
-        data = DataReader().read_single_datagroup(input_group)
+        data = DataReader().read_single_datagroup(input_group, read_region=extent)
         output = data.collocated_onto(sample_data, how=col_name, kernel=kernel,
-                                      missing_data_for_missing_sample=missing_data_for_missing_sample, **col_options)
+                                      missing_data_for_missing_sample=missing_data_for_missing_sample,
+                                      workers=main_arguments.workers, **col_options)
         output.save_data(main_arguments.output)
 
 
@@ -106,11 +114,16 @@ def subset_cmd(main_arguments):
     :param main_arguments:    The command line arguments (minus the subset command)
     """
     import cis.exceptions as ex
+    from cis.data_io.file_catalog import prune_files, get_subset_extent
 
     if len(main_arguments.datagroups) > 1:
         __error_occurred("Subsetting can only be performed on one data group")
+    input_group = main_arguments.datagroups[0]
 
-    data = DataReader().read_single_datagroup(main_arguments.datagroups[0])
+    # Files, and the parts of files, outside of the limits aren't read
+    extent = get_subset_extent(main_arguments.limits)
+    input_group['filenames'] = prune_files(input_group['filenames'], extent, input_group.get('product', None))
+    data = DataReader().read_single_datagroup(input_group, read_region=extent)
 
     subset = data.subset(**main_arguments.limits)
 
@@ -128,12 +141,46 @@ def aggregate_cmd(main_arguments):
     :param main_arguments: The command line arguments (minus the aggregate command)
     """
     import cis.exceptions as ex
+    from cis.collocation.col import get_kernel
     from cis.data_io.gridded_data import GriddedDataList
 
     if len(main_arguments.datagroups) > 1:
         __error_occurred("Aggregation can only be performed on one data group")
     input_group = main_arguments.datagroups[0]
 
+    if main_arguments.merge:
+        from cis.aggregation.ungridded_aggregator import merge_partial_aggregates, read_partial_aggregate
+        kernel = None if main_arguments.partial else get_kernel(input_group.get("kernel", ''))
+        partial_aggregates = (read_partial_aggregate(filename, input_group['variables'])
+                              for filename in input_group['filenames'])
+        output = merge_partial_aggregates(partial_aggregates, kernel)
+        output.add_history("Merged partial aggregates using CIS version " + __version__ +
+                           "\n variables: " + str(input_group['variables']) +
+                           "\n from files: " + str(input_group['filenames']) +
+                           "\n with kernel: " + str(kernel) + ".")
+        output.save_data(main_arguments.output)
+        return
+
+    from cis.data_io.file_catalog import prune_files, get_aggregation_extent
+    input_group['filenames'] = prune_files(input_group['filenames'], get_aggregation_extent(main_arguments.grid),
+                                           input_group.get('product', None))
+
+    if main_arguments.streaming or main_arguments.partial:
+        from cis.data_io.ungridded_data import aggregate_chunks, partially_aggregate_chunks
+        reader = DataReader()
+        chunks = (reader.read_data_list(filename, input_group['variables'], input_group.get('product', None),
+                                        input_group.get('aliases', None))
+                  for filename in input_group['filenames'])
+        if main_arguments.partial:
+            if input_group.get("kernel", None):
+                logging.warning("The kernel is not used when creating a partial aggregate, it should be given when "
+                                "the partial aggregates are merged")
+            output = partially_aggregate_chunks(chunks, **main_arguments.grid)
+        else:
+            output = aggregate_chunks(chunks, how=input_group.get("kernel", ''), **main_arguments.grid)
+        output.save_data(main_arguments.output)
+        return
+
     data = DataReader().read_single_datagroup(input_group)
 
     if isinstance(data, GriddedDataList):
@@ -222,6 +269,17 @@ def stats_cmd(main_arguments):
         cubes.save_data(main_arguments.output)
 
 
+def index_cmd(main_arguments):
+    """
+    Main routine for handling calls to the index command.
+
+    :param main_arguments: The command line arguments (minus the index command)
+    """
+    from cis.data_io.file_catalog import index_files
+    for datagroup in main_arguments.datagroups:
+        index_files(datagroup['filenames'], datagroup.get('product', None))
+
+
 def version_cmd(_main_arguments):
     print("Using CIS version: {ver} ({stat})".format(ver=__version__, stat=__status__ ))
 
@@ -234,6 +292,7 @@ commands = {'plot': plot_cmd,
             'collapse': collapse_cmd,
             'eval': evaluate_cmd,
             'stats': stats_cmd,
+            'index': index_cmd,
             'version': version_cmd}
 
 
@@ -245,6 +304,7 @@ def parse_and_run_arguments(arguments=None):
     from datetime import datetime
 
     from cis.parse import parse_args
+    from cis.utils import read_workers
 
     # parse command line arguments
     arguments = parse_args(arguments)
@@ -253,9 +313,10 @@ def parse_and_run_arguments(arguments=None):
     logging.debug("Running command: " + command)
     logging.debug("With the following arguments: " + str(arguments))
 
-    # execute command
+    # execute command, reading the given number of files at once
     cmd = commands[command]
-    cmd(arguments)
+    with read_workers(getattr(arguments, 'read_workers', None)):
+        cmd(arguments)
 
 
 def main():
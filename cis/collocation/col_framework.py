@@ -49,6 +49,12 @@ class Kernel(object):
     """
     Class which provides a method for taking a number of points and returning one value. For example a nearest
     neighbour algorithm or sort algorithm or mean. This just defines the interface which the subclasses must implement.
+
+    Implementations may also provide a ``get_value_batch(points, data, offsets, indices)`` method which calculates the
+    values for many sample points at once, where the data points constrained for sample point i are
+    ``data.iloc[indices[offsets[i]:offsets[i + 1]]]``. Collocators which are able to find the constrained points for
+    every sample point up-front will use it in preference to calling :meth:`.Kernel.get_value` once per sample point,
+    unless a subclass overrides get_value without also overriding the batch method.
     """
     __metaclass__ = ABCMeta
 
@@ -91,6 +97,16 @@ class AbstractDataOnlyKernel(Kernel):
     """
     A Kernel that can work on data only, e.g. mean only requires the data values to calculate the mean, not the sampling
     point.
+
+    Implementations may also provide a ``get_value_for_data_only_batch(values, offsets)`` method which calculates the
+    values for many sample points at once. Collocators which are able to find the constrained points for every sample
+    point up-front will use it in preference to calling :meth:`.AbstractDataOnlyKernel.get_value_for_data_only` once
+    per sample point, unless a subclass overrides get_value_for_data_only without also overriding the batch method.
+
+    Implementations may also provide a ``get_value_for_statistics(statistics)`` method which calculates the values
+    from the running count, sum, sum of squared deviations, minimum and maximum of the values in each cell of a grid
+    (see :class:`cis.aggregation.ungridded_aggregator.CellStatistics`). Only kernels which provide it can be used to
+    aggregate data in chunks, or to merge partial aggregates.
     """
 
     __metaclass__ = ABCMeta
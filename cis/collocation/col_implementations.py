@@ -1,3 +1,4 @@
+import itertools
 import logging
 
 import iris
@@ -21,6 +22,20 @@ class GeneralUngriddedCollocator(Collocator):
     Collocator for locating onto ungridded sample points
     """
 
+    #: The number of chunks of sample points given to each worker process when collocating in parallel
+    chunks_per_worker = 4
+
+    def __init__(self, fill_value=None, var_name='', var_long_name='', var_units='',
+                 missing_data_for_missing_sample=False, workers=1):
+        """
+        :param int workers: The number of processes to collocate with. Sample points are split into contiguous chunks
+         which are collocated in parallel by forked worker processes, which share the data and indexes with this
+         process rather than having them copied to them.
+        """
+        super(GeneralUngriddedCollocator, self).__init__(fill_value, var_name, var_long_name, var_units,
+                                                         missing_data_for_missing_sample)
+        self.workers = workers
+
     def collocate(self, points, data, constraint, kernel):
         """
         This collocator takes a list of HyperPoints and a data object (currently either Ungridded
@@ -57,9 +72,25 @@ class GeneralUngriddedCollocator(Collocator):
 
         log_memory_profile("GeneralUngriddedCollocator after data retrieval")
 
-        # Create index if constraint and/or kernel require one.
+        # Find the constrained points of every sample point up-front, where the constraint is able to. These are cached
+        # (keyed on a fingerprint of the points), so no indexes are needed if they have already been found. The
+        # workers of a parallel collocation find those for their own chunk of sample points, which are then cached
+        # together here.
+        in_parallel = self.workers > 1 and len(sample_points) > 1
+        neighbours_key, neighbours = None, None
+        if hasattr(constraint, 'neighbour_indices_key') and not isinstance(kernel, nn_horizontal_only):
+            neighbours_key = constraint.neighbour_indices_key(self.missing_data_for_missing_sample, data_points,
+                                                              sample_points)
+            cached = data_index.index_cache.get(neighbours_key)
+            if cached is not None:
+                neighbours = cached['offsets'], cached['indices']
+        # Create index if constraint and/or kernel require one
         coord_map = None
-        data_index.create_indexes(constraint, points, data_points, coord_map)
+        if neighbours is None:
+            data_index.create_indexes(constraint, points, data_points, coord_map)
+            if neighbours_key is not None and not in_parallel:
+                neighbours = constraint.get_neighbour_indices(self.missing_data_for_missing_sample, data_points,
+                                                              sample_points, key=neighbours_key)
         log_memory_profile("GeneralUngriddedCollocator after indexing")
 
         logging.info("--> Collocating...")
@@ -81,13 +112,69 @@ class GeneralUngriddedCollocator(Collocator):
         logging.info("    {} sample points".format(sample_points_count))
         # Apply constraint and/or kernel to each sample point.
 
+        if in_parallel:
+            find_neighbours = neighbours is None and neighbours_key is not None
+            found = self._collocate_points_in_parallel(sample_points, data_points, constraint, kernel, values,
+                                                       neighbours, find_neighbours)
+            if find_neighbours:
+                data_index.index_cache.put(neighbours_key, offsets=found[0], indices=found[1])
+        else:
+            self._collocate_points(sample_points, data_points, constraint, kernel, values, neighbours)
+        log_memory_profile("GeneralUngriddedCollocator after running kernel on sample points")
+
+        # Mask any bad values
+        values = np.ma.masked_invalid(values)
+
+        return_data = UngriddedDataList()
+        for idx, var_details in enumerate(var_set_details):
+            var_metadata = Metadata(name=var_details[0], long_name=var_details[1], shape=(len(sample_points),),
+                                    missing_value=self.fill_value, units=var_details[3])
+            set_standard_name_if_valid(var_metadata, var_details[2])
+            return_data.append(UngriddedData(values[idx, :], var_metadata, points.coords()))
+        log_memory_profile("GeneralUngriddedCollocator final")
+
+        return return_data
+
+    def _collocate_points(self, sample_points, data_points, constraint, kernel, values, neighbours=None):
+        """
+        Apply the constraint and kernel to each sample point, setting the values of those for which the kernel
+        returns a value.
+
+        :param sample_points: A dataframe of the sample points
+        :param data_points: A dataframe of the (non-missing) data points
+        :param constraint: The constraint, with any indexes it needs already created
+        :param kernel: The kernel
+        :param values: The masked array of values, of shape (kernel return size, number of sample points)
+        :param neighbours: Tuple of the (offsets, indices) of the constrained data points of every sample point, as
+         returned by :meth:`SepConstraintKdtree.get_neighbour_indices`, if they have already been found
+        """
         if isinstance(kernel, nn_horizontal_only):
             # Only find the nearest point using the kd-tree, without constraint in other dimensions
             nearest_points = data_points.iloc[constraint.haversine_distance_kd_tree_index.find_nearest_point(sample_points)]
             values[0, :] = nearest_points.vals.values
+            return
+
+        data_only_batch = _get_batch_method(kernel, "get_value_for_data_only_batch", "get_value_for_data_only")
+        if neighbours is not None and (data_only_batch or _get_batch_method(kernel, "get_value_batch", "get_value")):
+            # Reduce the constrained points of every sample point in a single pass
+            offsets, indices = neighbours
+            counts = np.diff(offsets)
+            has_points = counts > 0
+            if has_points.any():
+                # Kernels are only given sample points with some data, so drop the empty segments
+                segment_offsets = np.concatenate(([0], np.cumsum(counts[has_points])))
+                if data_only_batch is not None:
+                    values[:, has_points] = data_only_batch(data_points.vals.values[indices], segment_offsets)
+                else:
+                    values[:, has_points] = kernel.get_value_batch(sample_points[has_points], data_points,
+                                                                   segment_offsets, indices)
         else:
-            for i, point, con_points in constraint.get_iterator(self.missing_data_for_missing_sample, None, None,
-                                                                data_points, None, sample_points, None):
+            if neighbours is not None:
+                iterator = self._iterate_neighbours(sample_points, data_points, neighbours)
+            else:
+                iterator = constraint.get_iterator(self.missing_data_for_missing_sample, None, None, data_points, None,
+                                                   sample_points, None)
+            for i, point, con_points in iterator:
 
                 try:
                     values[:, i] = kernel.get_value(point, con_points)
@@ -96,20 +183,123 @@ class GeneralUngriddedCollocator(Collocator):
                     raise NotImplementedError(e)
                 except ValueError as e:
                     pass
-        log_memory_profile("GeneralUngriddedCollocator after running kernel on sample points")
 
-        # Mask any bad values
-        values = np.ma.masked_invalid(values)
+    def _iterate_neighbours(self, sample_points, data_points, neighbours):
+        """
+        Iterate over the sample points and their constrained data points, as found up-front. Sample points with missing
+        values are skipped if missing_data_for_missing_sample is set.
+        """
+        offsets, indices = neighbours
+        for i in range(len(sample_points)):
+            point = sample_points.iloc[i]
+            if not (self.missing_data_for_missing_sample and (hasattr(point, 'vals') and np.isnan(point.vals))):
+                yield i, point, data_points.iloc[indices[offsets[i]:offsets[i + 1]]]
+
+    def _collocate_points_in_parallel(self, sample_points, data_points, constraint, kernel, values, neighbours=None,
+                                      find_neighbours=False):
+        """
+        Collocate contiguous chunks of the sample points in a pool of forked worker processes. The workers inherit the
+        data points, constraint, indexes and any constrained points already found from this process, so only the chunk
+        boundaries and the values (and the constrained points each worker finds) are sent between processes. Falls back
+        to collocating in this process where processes can't be forked.
+
+        :param neighbours: Tuple of the (offsets, indices) of the constrained data points of every sample point, as
+         returned by :meth:`SepConstraintKdtree.get_neighbour_indices`, if they have already been found
+        :param bool find_neighbours: If true the workers find the constrained data points of their chunks with
+         :meth:`SepConstraintKdtree.find_neighbour_indices`, and they are returned
+        :return: Tuple of the (offsets, indices) of the constrained data points of every sample point, if
+         find_neighbours is set, otherwise None
+        """
+        global _parallel_collocation
+        import multiprocessing
+        try:
+            context = multiprocessing.get_context('fork')
+        except (AttributeError, ValueError):
+            logging.warning("Unable to fork worker processes on this platform, collocating in a single process")
+            if find_neighbours:
+                neighbours = constraint.find_neighbour_indices(self.missing_data_for_missing_sample, data_points,
+                                                               sample_points)
+            self._collocate_points(sample_points, data_points, constraint, kernel, values, neighbours)
+            return neighbours if find_neighbours else None
+
+        # Note that min is shadowed by the kernel of the same name in this module
+        chunk_count = int(np.minimum(self.workers * self.chunks_per_worker, len(sample_points)))
+        boundaries = np.linspace(0, len(sample_points), chunk_count + 1).astype(int)
+        logging.info("    Collocating {} chunks of sample points with {} workers".format(chunk_count, self.workers))
+
+        _parallel_collocation = (self, sample_points, data_points, constraint, kernel, values.shape[0], neighbours,
+                                 find_neighbours)
+        chunk_neighbours = []
+        try:
+            pool = context.Pool(self.workers)
+            try:
+                chunks = pool.imap(_collocate_chunk, zip(boundaries[:-1], boundaries[1:]))
+                for start, stop, chunk_values, found in chunks:
+                    values[:, start:stop] = chunk_values
+                    chunk_neighbours.append(found)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _parallel_collocation = None
+
+        if not find_neighbours:
+            return None
+        counts = np.concatenate([np.diff(offsets) for offsets, _ in chunk_neighbours])
+        return (np.concatenate(([0], np.cumsum(counts))),
+                np.concatenate([indices for _, indices in chunk_neighbours]))
+
+
+def _get_batch_method(kernel, batch_method_name, method_name):
+    """
+    Get a method of a kernel which calculates the values for many sample points at once, if it has one which can be
+    used in place of the method calculating them one at a time. It can't be used if the kernel's class (for example a
+    plugin subclassing one of the kernels here) overrides the single value method without also overriding the batch
+    method, as the batch method would then give different values.
+
+    :param kernel: The kernel
+    :param str batch_method_name: The name of the batch method, e.g. get_value_batch
+    :param str method_name: The name of the single value method it replaces, e.g. get_value
+    :return: The bound batch method, or None if there isn't one which can be used
+    """
+    def defining_class(name):
+        return next((cls for cls in type(kernel).__mro__ if name in vars(cls)), None)
 
-        return_data = UngriddedDataList()
-        for idx, var_details in enumerate(var_set_details):
-            var_metadata = Metadata(name=var_details[0], long_name=var_details[1], shape=(len(sample_points),),
-                                    missing_value=self.fill_value, units=var_details[3])
-            set_standard_name_if_valid(var_metadata, var_details[2])
-            return_data.append(UngriddedData(values[idx, :], var_metadata, points.coords()))
-        log_memory_profile("GeneralUngriddedCollocator final")
+    batch_class = defining_class(batch_method_name)
+    method_class = defining_class(method_name)
+    if batch_class is None or (method_class is not None and not issubclass(batch_class, method_class)):
+        return None
+    return getattr(kernel, batch_method_name)
 
-        return return_data
+
+#: The collocator, sample points, data points, constraint, kernel, kernel return size, constrained points (if already
+#: found) and whether to find the constrained points of a parallel collocation, which are inherited by the forked worker
+#: processes
+_parallel_collocation = None
+
+
+def _collocate_chunk(bounds):
+    """
+    Collocate a contiguous chunk of the sample points of the current parallel collocation, in a worker process.
+
+    :param bounds: Tuple of the (start, stop) positions of the chunk in the sample points
+    :return: Tuple of (start, stop, masked array of values, constrained points found for the chunk or None)
+    """
+    collocator, sample_points, data_points, constraint, kernel, return_size, neighbours, find_neighbours = \
+        _parallel_collocation
+    start, stop = bounds
+    chunk_points = sample_points.iloc[start:stop].reset_index(drop=True)
+    found = None
+    if neighbours is not None:
+        offsets, indices = neighbours
+        neighbours = offsets[start:stop + 1] - offsets[start], indices[offsets[start]:offsets[stop]]
+    elif find_neighbours:
+        # These aren't cached here, but returned to be cached (once) by the parent process
+        neighbours = found = constraint.find_neighbour_indices(collocator.missing_data_for_missing_sample,
+                                                               data_points, chunk_points)
+    values = np.ma.masked_all((return_size, stop - start))
+    collocator._collocate_points(chunk_points, data_points, constraint, kernel, values, neighbours)
+    return start, stop, values, found
 
 
 class GriddedUngriddedCollocator(Collocator):
@@ -118,10 +308,11 @@ class GriddedUngriddedCollocator(Collocator):
     """
 
     def __init__(self, fill_value=None, var_name='', var_long_name='', var_units='',
-                 missing_data_for_missing_sample=False, extrapolate=False):
+                 missing_data_for_missing_sample=False, extrapolate=False, weights_file=None):
         super(GriddedUngriddedCollocator, self).__init__(fill_value, var_name, var_long_name, var_units,
                                                          missing_data_for_missing_sample)
         self.extrapolate = extrapolate
+        self.weights_file = weights_file
         self.interpolator = None
 
     def collocate(self, points, data, constraint, kernel):
@@ -142,22 +333,15 @@ class GriddedUngriddedCollocator(Collocator):
         from cis.collocation.gridded_interpolation import GriddedUngriddedInterpolator
         log_memory_profile("GriddedUngriddedCollocator Initial")
 
-        if isinstance(data, list):
-            # Indexing and constraints (for SepConstraintKdTree) will only take place on the first iteration,
-            # so we really can just call this method recursively if we've got a list of data.
-            output = UngriddedDataList()
-            for var in data:
-                output.extend(self.collocate(points, var, constraint, kernel))
-            return output
-
         if constraint is not None and not isinstance(constraint, DummyConstraint):
             raise ValueError("A constraint cannot be specified for the GriddedUngriddedCollocator")
-        data_points = data
+        variables = data if isinstance(data, list) else [data]
 
         # First fix the sample points so that they all fall within the same 360 degree longitude range
         _fix_longitude_range(points.coords(), points)
         # Then fix the data points so that they fall onto the same 360 degree longitude range as the sample points
-        _fix_longitude_range(points.coords(), data_points)
+        for var in variables:
+            _fix_longitude_range(points.coords(), var)
 
         log_memory_profile("GriddedUngriddedCollocator after data retrieval")
 
@@ -166,16 +350,27 @@ class GriddedUngriddedCollocator(Collocator):
 
         if self.interpolator is None:
             # Cache the interpolator
-            self.interpolator = GriddedUngriddedInterpolator(data, points, kernel, self.missing_data_for_missing_sample)
-
-        values = self.interpolator(data, fill_value=self.fill_value, extrapolate=self.extrapolate)
+            self.interpolator = GriddedUngriddedInterpolator(variables[0], points, kernel,
+                                                             self.missing_data_for_missing_sample,
+                                                             weights_file=self.weights_file)
+
+        if len(variables) > 1 and all(var.shape == variables[0].shape for var in variables):
+            # The variables are on the same grid, so interpolate them all at once
+            values = self.interpolator.interpolate_stacked(variables, fill_value=self.fill_value,
+                                                           extrapolate=self.extrapolate)
+        else:
+            values = [self.interpolator(var, fill_value=self.fill_value, extrapolate=self.extrapolate)
+                      for var in variables]
 
         log_memory_profile("GriddedUngriddedCollocator after running kernel on sample points")
 
-        metadata = Metadata(self.var_name or data.var_name, long_name=self.var_long_name or data.long_name,
-                            shape=values.shape, missing_value=self.fill_value, units=self.var_units or data.units)
-        set_standard_name_if_valid(metadata, data.standard_name)
-        return_data = UngriddedDataList([UngriddedData(values, metadata, points.coords())])
+        return_data = UngriddedDataList()
+        for var, var_values in zip(variables, values):
+            metadata = Metadata(self.var_name or var.var_name, long_name=self.var_long_name or var.long_name,
+                                shape=var_values.shape, missing_value=self.fill_value,
+                                units=self.var_units or var.units)
+            set_standard_name_if_valid(metadata, var.standard_name)
+            return_data.append(UngriddedData(var_values, metadata, points.coords()))
 
         log_memory_profile("GriddedUngriddedCollocator final")
 
@@ -257,11 +452,14 @@ class SepConstraint(PointConstraint):
 
 
 class SepConstraintKdtree(PointConstraint):
-    """A separation constraint that uses a k-D tree to optimise spatial constraining.
-    If no horizontal separation parameter is supplied, this reduces to an exhaustive
-    search using the other parameter(s).
+    """A separation constraint that uses a k-D tree to optimise spatial constraining, and an index of the data points
+    sorted by time, altitude and pressure to optimise constraining in those coordinates. When finding the constrained
+    points for every sample point at once, whichever of these indexes gives the fewest candidate points is used.
     """
 
+    #: The maximum number of candidate (sample point, data point) pairs to check at once
+    max_candidate_pairs = 2 ** 22
+
     def __init__(self, h_sep=None, a_sep=None, p_sep=None, t_sep=None):
         from cis.exceptions import InvalidCommandLineOptionError
 
@@ -294,6 +492,9 @@ class SepConstraintKdtree(PointConstraint):
                 raise InvalidCommandLineOptionError(e)
             self.checks.append(self.time_constraint)
 
+        if self.checks:
+            self.sorted_coordinates_index = None
+
     def time_constraint(self, points, ref_point):
         return np.nonzero(np.abs(points.time - ref_point.time) < self.t_sep)[0]
 
@@ -334,10 +535,7 @@ class SepConstraintKdtree(PointConstraint):
         total_count = 0
         sample_points_count = len(points)
 
-        indices = False
-
-        if self.haversine_distance_kd_tree_index and self.h_sep:
-            indices = self.haversine_distance_kd_tree_index.find_points_within_distance_sample(points, self.h_sep)
+        offsets, indices = self.get_neighbour_indices(missing_data_for_missing_sample, data_points, points)
 
         for i, p in points.iterrows():
 
@@ -350,15 +548,197 @@ class SepConstraintKdtree(PointConstraint):
 
             # If missing_data_for_missing_sample
             if not (missing_data_for_missing_sample and (hasattr(p, 'vals') and np.isnan(p.vals))):
-                if indices:
-                    # Note that data_points has to be a dataframe at this point because of the indexing
-                    d_points = data_points.iloc[indices[i]]
-                else:
-                    d_points = data_points
-                for check in self.checks:
-                    d_points = d_points.iloc[check(d_points, p)]
+                # Note that data_points has to be a dataframe at this point because of the indexing
+                yield i, p, data_points.iloc[indices[offsets[i]:offsets[i + 1]]]
+
+    def get_neighbour_indices(self, missing_data_for_missing_sample, data_points, points, key=None):
+        """
+        Find the constrained data points for every sample point at once.
 
-                yield i, p, d_points
+        The result is a CSR-style structure: the constrained points for sample point i are
+        ``data_points.iloc[indices[offsets[i]:offsets[i + 1]]]``.
+
+        The result is cached (see :data:`cis.collocation.data_index.index_cache`), so collocating another variable with
+        the same data points onto the same sample points reuses it.
+
+        :param missing_data_for_missing_sample: If true, sample points with missing values are given no data points
+        :param data_points: A dataframe of the (non-masked) data points
+        :param points: A dataframe of the sample points
+        :param str key: The :meth:`neighbour_indices_key` of the points, if it has already been calculated
+        :return: Tuple of (offsets, indices) numpy arrays
+        """
+        if key is None:
+            key = self.neighbour_indices_key(missing_data_for_missing_sample, data_points, points)
+        cached = data_index.index_cache.get(key)
+        if cached is not None:
+            return cached['offsets'], cached['indices']
+        offsets, indices = self.find_neighbour_indices(missing_data_for_missing_sample, data_points, points)
+        data_index.index_cache.put(key, offsets=offsets, indices=indices)
+        return offsets, indices
+
+    def find_neighbour_indices(self, missing_data_for_missing_sample, data_points, points):
+        """
+        Find the constrained data points for every sample point at once, as :meth:`get_neighbour_indices` does but
+        without caching them.
+
+        :param missing_data_for_missing_sample: If true, sample points with missing values are given no data points
+        :param data_points: A dataframe of the (non-masked) data points
+        :param points: A dataframe of the sample points
+        :return: Tuple of (offsets, indices) numpy arrays
+        """
+        from cis.collocation.haversinedistancekdtreeindex import create_index
+        sample_points_count = len(points)
+        if missing_data_for_missing_sample and 'vals' in points:
+            sample_mask = ~np.isnan(points.vals.values)
+        else:
+            sample_mask = np.ones(sample_points_count, dtype=bool)
+
+        windows = self._find_windows(data_points, points, sample_mask)
+        sample_index = None
+        if self.haversine_distance_kd_tree_index and self.h_sep:
+            # The k-D tree of the sample points is needed both to count and to find the points within h_sep
+            sample_index = create_index(points)
+        if sample_index is not None and not self._windows_more_selective(points, windows, sample_index):
+            neighbours = self.haversine_distance_kd_tree_index.find_points_within_distance_sample(
+                points, self.h_sep, sample_index=sample_index)
+            counts = np.fromiter((len(n) for n in neighbours), dtype=np.intp, count=sample_points_count)
+            counts[~sample_mask] = 0
+            sample_indices = np.repeat(np.arange(sample_points_count), counts)
+            indices = np.fromiter(itertools.chain.from_iterable(n for n, m in zip(neighbours, sample_mask) if m),
+                                  dtype=np.intp, count=counts.sum())
+            keep = self._check_pairs(points, sample_indices, data_points, indices)
+            sample_indices, indices = sample_indices[keep], indices[keep]
+        else:
+            if windows is None:
+                # There is nothing to narrow the search, so every data point is a candidate for every sample point
+                sort_order = np.arange(len(data_points))
+                starts = np.zeros(sample_points_count, dtype=np.intp)
+                stops = np.where(sample_mask, len(data_points), 0)
+            else:
+                sort_order, starts, stops = windows
+            sample_indices, indices = self._check_windows(data_points, points, sort_order, starts, stops)
+
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(sample_indices, minlength=sample_points_count))))
+        return offsets, indices
+
+    def neighbour_indices_key(self, missing_data_for_missing_sample, data_points, points):
+        """
+        Fingerprint the separations, and the coordinates of the sample and data points (and which sample points are
+        missing, where that matters), to give the key the constrained data points of every sample point are cached with.
+        """
+        items = [self.__class__.__name__, self.h_sep, getattr(self, 'a_sep', None), getattr(self, 'p_sep', None),
+                 getattr(self, 't_sep', None)]
+        if missing_data_for_missing_sample and 'vals' in points:
+            items.append(np.isnan(points.vals.values))
+        for frame in (points, data_points):
+            for name in sorted(frame.columns):
+                if name != 'vals':
+                    items.extend((name, frame[name].values))
+        return data_index.fingerprint(*items)
+
+    def _find_windows(self, data_points, points, sample_mask):
+        """
+        Find, for each sample point, the window of data points sorted by time, altitude or pressure which could satisfy
+        that separation constraint. The coordinate giving the fewest candidate points in total is used.
+
+        :param data_points: A dataframe of the data points
+        :param points: A dataframe of the sample points
+        :param sample_mask: Boolean array which is false for sample points which should be given no data points
+        :return: Tuple of (sort order, starts, stops), where the candidates for sample point i are
+         ``sort_order[starts[i]:stops[i]]``, or None if none of the coordinates can be searched this way
+        """
+        if not getattr(self, 'sorted_coordinates_index', None):
+            return None
+        separations = [('time', self.time_constraint, getattr(self, 't_sep', None)),
+                       ('altitude', self.alt_constraint, getattr(self, 'a_sep', None)),
+                       ('air_pressure', self.pressure_constraint, getattr(self, 'p_sep', None))]
+        best, best_count = None, None
+        for name, check, separation in separations:
+            if check not in self.checks or name not in self.sorted_coordinates_index.sort_orders:
+                continue
+            centres = points[name].values
+            if name == 'air_pressure' and not np.all(centres > 0):
+                # The ratio check doesn't correspond to a window of log pressure for non-positive pressures
+                continue
+            starts, stops = self.sorted_coordinates_index.find_windows(name, centres, separation)
+            stops = np.where(sample_mask, stops, starts)
+            count = (stops - starts).sum()
+            if best is None or count < best_count:
+                best = (self.sorted_coordinates_index.sort_orders[name], starts, stops)
+                best_count = count
+        return best
+
+    def _windows_more_selective(self, points, windows, sample_index):
+        """
+        Determine whether the sorted coordinate windows give fewer candidates than the k-D tree. This is the case for
+        long time series from fixed sites, for example, where the k-D tree finds every point at a site.
+        """
+        if windows is None:
+            return False
+        _, starts, stops = windows
+        spatial_count = self.haversine_distance_kd_tree_index.count_points_within_distance_sample(
+            points, self.h_sep, sample_index=sample_index)
+        return spatial_count is not None and (stops - starts).sum() < spatial_count
+
+    def _check_windows(self, data_points, points, sort_order, starts, stops):
+        """
+        Check the data points in the window of each sample point against all of the separation constraints. The
+        sample points are checked in chunks to limit the memory used.
+
+        :return: Tuple of (sample indices, indices) of the pairs satisfying the constraints, ordered by sample point
+         and then by data point
+        """
+        counts = stops - starts
+        cumulative_counts = np.concatenate(([0], np.cumsum(counts)))
+        sample_chunks, index_chunks = [], []
+        first = 0
+        while first < len(points):
+            # Take as many sample points as fit in the chunk, but always at least one
+            last = np.searchsorted(cumulative_counts, cumulative_counts[first] + self.max_candidate_pairs,
+                                   side='right') - 1
+            last = int(np.clip(last, first + 1, len(points)))
+            chunk_counts = counts[first:last]
+            sample_indices = np.repeat(np.arange(first, last), chunk_counts)
+            positions = np.arange(cumulative_counts[first], cumulative_counts[last]) + \
+                np.repeat(starts[first:last] - cumulative_counts[first:last], chunk_counts)
+            indices = sort_order[positions]
+            keep = self._check_pairs(points, sample_indices, data_points, indices, check_horizontal=bool(self.h_sep))
+            sample_indices, indices = sample_indices[keep], indices[keep]
+            order = np.lexsort((indices, sample_indices))
+            sample_chunks.append(sample_indices[order])
+            index_chunks.append(indices[order])
+            first = last
+        if not sample_chunks:
+            return np.array([], dtype=np.intp), np.array([], dtype=np.intp)
+        return np.concatenate(sample_chunks), np.concatenate(index_chunks)
+
+    def _check_pairs(self, points, sample_indices, data_points, indices, check_horizontal=False):
+        """
+        Vectorised form of the separation checks for many (sample point, data point) pairs.
+
+        :param points: A dataframe of the sample points
+        :param sample_indices: The position of the sample point of each pair
+        :param data_points: A dataframe of the data points
+        :param indices: The position of the data point of each pair
+        :param check_horizontal: Also check the horizontal separation, for pairs which weren't found using the k-D tree
+        :return: A boolean numpy array, true where the pair satisfies all of the checks
+        """
+        keep = np.ones(len(indices), dtype=bool)
+        if check_horizontal:
+            from cis.collocation.kdtree import haversine
+            keep &= haversine(data_points[['latitude', 'longitude']].values[indices],
+                              points[['latitude', 'longitude']].values[sample_indices]) <= self.h_sep
+        if self.time_constraint in self.checks:
+            keep &= np.abs(data_points.time.values[indices] - points.time.values[sample_indices]) < self.t_sep
+        if self.alt_constraint in self.checks:
+            keep &= np.abs(data_points.altitude.values[indices] - points.altitude.values[sample_indices]) < self.a_sep
+        if self.pressure_constraint in self.checks:
+            data_pressure = data_points.air_pressure.values[indices]
+            sample_pressure = points.air_pressure.values[sample_indices]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                keep &= np.where(data_pressure > sample_pressure,
+                                 data_pressure / sample_pressure, sample_pressure / data_pressure) < self.p_sep
+        return keep
 
 
 # noinspection PyPep8Naming
@@ -373,6 +753,18 @@ class mean(AbstractDataOnlyKernel):
         """
         return np_mean(values)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Return the mean of each segment
+        """
+        return _segment_mean(values, offsets)
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Return the mean of each cell of running statistics
+        """
+        return statistics.mean()
+
 
 # noinspection PyPep8Naming
 class stddev(AbstractDataOnlyKernel):
@@ -386,6 +778,18 @@ class stddev(AbstractDataOnlyKernel):
         """
         return np_std(values, ddof=1)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Return the standard deviation of each segment
+        """
+        return _segment_stddev(values, offsets)
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Return the standard deviation of each cell of running statistics
+        """
+        return statistics.stddev()
+
 
 # noinspection PyPep8Naming,PyShadowingBuiltins
 class min(AbstractDataOnlyKernel):
@@ -399,6 +803,18 @@ class min(AbstractDataOnlyKernel):
         """
         return np_min(values)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Return the minimum value of each segment
+        """
+        return np.minimum.reduceat(values, offsets[:-1])
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Return the minimum value of each cell of running statistics
+        """
+        return statistics.min
+
 
 # noinspection PyPep8Naming,PyShadowingBuiltins
 class max(AbstractDataOnlyKernel):
@@ -412,6 +828,18 @@ class max(AbstractDataOnlyKernel):
         """
         return np_max(values)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Return the maximum value of each segment
+        """
+        return np.maximum.reduceat(values, offsets[:-1])
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Return the maximum value of each cell of running statistics
+        """
+        return statistics.max
+
 
 class sum(AbstractDataOnlyKernel):
     """
@@ -424,6 +852,18 @@ class sum(AbstractDataOnlyKernel):
         """
         return np_sum(values)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Return the sum of the values in each segment
+        """
+        return np.add.reduceat(values, offsets[:-1])
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Return the sum of the values in each cell of running statistics
+        """
+        return statistics.sum
+
 
 # noinspection PyPep8Naming
 class moments(AbstractDataOnlyKernel):
@@ -461,6 +901,45 @@ class moments(AbstractDataOnlyKernel):
 
         return np_mean(values), np_std(values, ddof=1), np.size(values)
 
+    def get_value_for_data_only_batch(self, values, offsets):
+        """
+        Returns the mean, standard deviation and number of values of each segment
+        """
+        return _segment_mean(values, offsets), _segment_stddev(values, offsets), np.diff(offsets)
+
+    def get_value_for_statistics(self, statistics):
+        """
+        Returns the mean, standard deviation and number of values of each cell of running statistics
+        """
+        return statistics.mean(), statistics.stddev(), statistics.count
+
+
+def _segment_mean(values, offsets):
+    """
+    Calculate the mean of each segment values[offsets[i]:offsets[i+1]] of a flat array of values. Every segment must
+    contain at least one value.
+
+    :param values: A flat numpy array of values, ordered by segment
+    :param offsets: The start index of each segment in values, followed by len(values)
+    :return: A numpy array of the mean of each segment
+    """
+    return np.add.reduceat(values, offsets[:-1]) / np.diff(offsets)
+
+
+def _segment_stddev(values, offsets):
+    """
+    Calculate the corrected sample standard deviation of each segment values[offsets[i]:offsets[i+1]] of a flat array
+    of values. Every segment must contain at least one value; segments with only one value give NaN, as np.std does.
+
+    :param values: A flat numpy array of values, ordered by segment
+    :param offsets: The start index of each segment in values, followed by len(values)
+    :return: A numpy array of the standard deviation of each segment
+    """
+    counts = np.diff(offsets)
+    deviations = values - np.repeat(_segment_mean(values, offsets), counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.sqrt(np.add.reduceat(deviations ** 2, offsets[:-1]) / (counts - 1))
+
 
 class nn_horizontal(Kernel):
     def get_value(self, point, data):
@@ -469,16 +948,19 @@ class nn_horizontal(Kernel):
               data are a list of HyperPoints. The default point is the first point.
         """
         from cis.collocation.kdtree import haversine
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if (haversine(point, nearest_point) > haversine(point, data_point)):
-                nearest_point = data_point
-        return nearest_point.vals
+        return _nearest_value(data, haversine(data[['latitude', 'longitude']].values,
+                                              np.array([point.latitude, point.longitude])))
+
+    def get_value_batch(self, points, data, offsets, indices):
+        """
+            Nearest neighbours along the face of the earth for many sample points at once, see
+              :func:`_nearest_values_batch`.
+        """
+        from cis.collocation.kdtree import haversine
+        sample_indices = _segment_owners(offsets)
+        distances = haversine(data[['latitude', 'longitude']].values[indices],
+                              points[['latitude', 'longitude']].values[sample_indices])
+        return _nearest_values_batch(data, offsets, indices, distances)
 
 
 class nn_horizontal_only(Kernel):
@@ -495,46 +977,32 @@ class nn_altitude(Kernel):
             Collocation using nearest neighbours in altitude, where both points and
               data are a list of HyperPoints. The default point is the first point.
         """
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if abs(point.altitude - nearest_point.altitude) > abs(point.altitude - data_point.altitude):
-                nearest_point = data_point
-        return nearest_point.vals
+        return _nearest_value(data, np.abs(data.altitude.values - point.altitude))
 
+    def get_value_batch(self, points, data, offsets, indices):
+        """
+            Nearest neighbours in altitude for many sample points at once, see :func:`_nearest_values_batch`.
+        """
+        distances = np.abs(data.altitude.values[indices] - points.altitude.values[_segment_owners(offsets)])
+        return _nearest_values_batch(data, offsets, indices, distances)
 
-class nn_pressure(Kernel):
 
+class nn_pressure(Kernel):
 
     def get_value(self, point, data):
         """
             Collocation using nearest neighbours in pressure, where both points and
               data are a list of HyperPoints. The default point is the first point.
         """
+        return _nearest_value(data, _pressure_ratio(data.air_pressure.values, point.air_pressure))
 
-        def pres_sep(point1, point2):
-            """
-                Computes the pressure ratio between two points, this is always >= 1.
-            """
-            if point1.air_pressure > point2.air_pressure:
-                return point1.air_pressure / point2.air_pressure
-            else:
-                return point2.air_pressure / point1.air_pressure
-
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if pres_sep(point, nearest_point) > pres_sep(point, data_point):
-                nearest_point = data_point
-        return nearest_point.vals
+    def get_value_batch(self, points, data, offsets, indices):
+        """
+            Nearest neighbours in pressure for many sample points at once, see :func:`_nearest_values_batch`.
+        """
+        distances = _pressure_ratio(data.air_pressure.values[indices],
+                                    points.air_pressure.values[_segment_owners(offsets)])
+        return _nearest_values_batch(data, offsets, indices, distances)
 
 
 class nn_time(Kernel):
@@ -543,16 +1011,68 @@ class nn_time(Kernel):
             Collocation using nearest neighbours in time, where both points and
               data are a list of HyperPoints. The default point is the first point.
         """
-        iterator = data.iterrows()
-        try:
-            nearest_point = next(iterator)[1]
-        except StopIteration:
-            # No points to check
-            raise ValueError
-        for idx, data_point in iterator:
-            if abs(point.time - nearest_point.time) > abs(point.time - data_point.time):
-                nearest_point = data_point
-        return nearest_point.vals
+        return _nearest_value(data, np.abs(data.time.values - point.time))
+
+    def get_value_batch(self, points, data, offsets, indices):
+        """
+            Nearest neighbours in time for many sample points at once, see :func:`_nearest_values_batch`.
+        """
+        distances = np.abs(data.time.values[indices] - points.time.values[_segment_owners(offsets)])
+        return _nearest_values_batch(data, offsets, indices, distances)
+
+
+def _pressure_ratio(pressure1, pressure2):
+    """
+    Computes the pressure ratio between two (arrays of) points, this is always >= 1.
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(pressure1 > pressure2, pressure1 / pressure2, pressure2 / pressure1)
+
+
+def _nearest_value(data, distances):
+    """
+    Finds the value of the data point nearest to a sample point. Of several equally near points the first is chosen.
+
+    :param data: A dataframe of the constrained data points
+    :param distances: A numpy array of the distance of each data point from the sample point
+    :return: The value of the nearest point
+    :raises ValueError: If there are no data points
+    """
+    if len(data) == 0:
+        # No points to check
+        raise ValueError
+    return data.vals.values[np.argmin(distances)]
+
+
+def _segment_owners(offsets):
+    """
+    Find the segment each element of a CSR-style array belongs to.
+
+    :param offsets: The start index of each segment, followed by the total length
+    :return: A numpy array of the segment number of each element
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _nearest_values_batch(data, offsets, indices, distances):
+    """
+    Finds the value of the data point nearest to each of many sample points. The data points constrained for sample
+    point i are ``data.iloc[indices[offsets[i]:offsets[i + 1]]]``, every sample point must have at least one, and of
+    several equally near points the first is chosen.
+
+    :param data: A dataframe of the data points
+    :param offsets: The start index of each sample point's data points in indices, followed by len(indices)
+    :param indices: The positions in data of the constrained data points
+    :param distances: A numpy array of the distance of each constrained data point from its sample point
+    :return: A numpy array of the value of the nearest point to each sample point
+    """
+    minima = np.fmin.reduceat(distances, offsets[:-1])
+    positions = np.flatnonzero(distances == np.repeat(minima, np.diff(offsets)))
+    segments, first = np.unique(_segment_owners(offsets)[positions], return_index=True)
+    # Segments where no distance could be calculated fall back to their first point
+    nearest = offsets[:-1].copy()
+    nearest[segments] = positions[first]
+    return data.vals.values[indices[nearest]]
 
 
 # These classes act as abbreviations for kernel classes above:
@@ -592,10 +1112,11 @@ class GriddedCollocator(Collocator):
     def _check_for_valid_kernel(kernel):
         from cis.exceptions import ClassNotFoundError
 
-        if not (isinstance(kernel, gridded_gridded_nn) or isinstance(kernel, gridded_gridded_li)):
+        if not isinstance(kernel, (gridded_gridded_nn, gridded_gridded_li, gridded_gridded_area)):
             raise ClassNotFoundError("Expected kernel of one of classes {}; found one of class {}".format(
                 str([cis.utils.get_class_name(gridded_gridded_nn),
-                     cis.utils.get_class_name(gridded_gridded_li)]),
+                     cis.utils.get_class_name(gridded_gridded_li),
+                     cis.utils.get_class_name(gridded_gridded_area)]),
                 cis.utils.get_class_name(type(kernel))))
 
     def collocate(self, points, data, constraint, kernel):
@@ -605,7 +1126,8 @@ class GriddedCollocator(Collocator):
         :param points: An Iris cube with the sampling grid to collocate onto.
         :param data: The Iris cube with the data to be collocated.
         :param constraint: None allowed yet, as this is unlikely to be required for gridded-gridded.
-        :param kernel: The kernel to use, current options are gridded_gridded_nn and gridded_gridded_li.
+        :param kernel: The kernel to use, current options are gridded_gridded_nn, gridded_gridded_li and
+         gridded_gridded_area.
         :return: An Iris cube with the collocated data.
         """
         self._check_for_valid_kernel(kernel)
@@ -681,9 +1203,9 @@ class GriddedCollocator(Collocator):
         # Use the new_data array to recreate points, without the DimCoords not in the data cube
         points = iris.cube.Cube(new_points_array, dim_coords_and_dims=new_dim_coord_list)
 
-        output_cube = self._iris_interpolate(coord_names_and_sizes_for_output_grid,
-                                             coord_names_and_sizes_for_sample_grid, data,
-                                             kernel, output_mask, points, self.extrapolate)
+        output_cube = self._interpolate(coord_names_and_sizes_for_output_grid,
+                                        coord_names_and_sizes_for_sample_grid, data,
+                                        kernel, output_mask, points, self.extrapolate)
 
         if not isinstance(output_cube, list):
             return GriddedDataList([output_cube])
@@ -715,21 +1237,37 @@ class GriddedCollocator(Collocator):
         return output_mask
 
     @staticmethod
-    def _iris_interpolate(coord_names_and_sizes_for_output_grid, coord_names_and_sizes_for_sample_grid, data, kernel,
-                          output_mask, points, extrapolate):
-        """ Collocates using iris.analysis.interpolate
+    def _interpolate_cube(cube, sample_coords, kernel, extrapolate):
+        """ Interpolates a single cube onto the sample coordinates, using a (cached) sparse regridding matrix if the
+        cube's grid allows it, or iris.analysis.interpolate otherwise
         """
-        coordinate_point_pairs = []
-        for j in range(0, len(coord_names_and_sizes_for_sample_grid)):
-            # For each coordinate make the list of tuple pair Iris requires, for example
-            # [('latitude', -90), ('longitude, 0')]
-            coordinate_point_pairs.append((coord_names_and_sizes_for_sample_grid[j][0],
-                                           points.dim_coords[j].points))
+        from cis.collocation.gridded_regridding import SparseRegridder
+        if SparseRegridder.can_regrid(cube, [coord.name() for coord in sample_coords]):
+            regridder = SparseRegridder(cube, sample_coords, kernel.method, extrapolate == 'extrapolate')
+            return make_from_cube(regridder(cube))
+        if kernel.interpolater is None:
+            raise ValueError("The {} kernel can only be used for data whose sample coordinates are all dimension "
+                             "coordinates, with no auxiliary coordinates over them".format(kernel.name))
+        # For each coordinate make the list of tuple pair Iris requires, for example
+        # [('latitude', -90), ('longitude, 0')]
+        coordinate_point_pairs = [(coord.name(), coord.points) for coord in sample_coords]
+        return make_from_cube(cube.interpolate(coordinate_point_pairs,
+                                               kernel.interpolater(extrapolation_mode=extrapolate)))
+
+    @staticmethod
+    def _interpolate(coord_names_and_sizes_for_output_grid, coord_names_and_sizes_for_sample_grid, data, kernel,
+                     output_mask, points, extrapolate):
+        """ Collocates each cube of the data onto the sample points
+        """
+        sample_coords = points.dim_coords[:len(coord_names_and_sizes_for_sample_grid)]
 
         # The result here will be a cube with the correct dimensions for the output, so interpolated over all points
         # in coord_names_and_sizes_for_output_grid.
-        output_cube = make_from_cube(data.interpolate(coordinate_point_pairs,
-                                                      kernel.interpolater(extrapolation_mode=extrapolate)))
+        if isinstance(data, list):
+            output_cube = GriddedDataList([GriddedCollocator._interpolate_cube(cube, sample_coords, kernel, extrapolate)
+                                           for cube in data])
+        else:
+            output_cube = GriddedCollocator._interpolate_cube(data, sample_coords, kernel, extrapolate)
 
         # Iris outputs interpolated cubes with the dimensions in the order of the data grid, not the sample grid,
         # so we need to rearrange the order of the dimensions.
@@ -751,6 +1289,7 @@ class gridded_gridded_nn(Kernel):
     def __init__(self):
         from iris.analysis import Nearest
         self.name = 'nearest'
+        self.method = 'nn'
         self.interpolater = Nearest
 
     def get_value(self, point, data):
@@ -763,6 +1302,7 @@ class gridded_gridded_li(Kernel):
     def __init__(self):
         from iris.analysis import Linear
         self.name = 'bilinear'
+        self.method = 'lin'
         self.interpolater = Linear
 
     def get_value(self, point, data):
@@ -771,6 +1311,19 @@ class gridded_gridded_li(Kernel):
         raise ValueError("gridded_gridded_li kernel selected for use with collocator other than GriddedCollocator")
 
 
+class gridded_gridded_area(Kernel):
+    def __init__(self):
+        self.name = 'area'
+        self.method = 'area'
+        # There is no Iris interpolation scheme for first order conservative regridding
+        self.interpolater = None
+
+    def get_value(self, point, data):
+        """Not needed for gridded/gridded collocation.
+        """
+        raise ValueError("gridded_gridded_area kernel selected for use with collocator other than GriddedCollocator")
+
+
 class GeneralGriddedCollocator(Collocator):
     """Performs collocation of data on to the points of a cube (ie onto a gridded dataset).
     """
@@ -847,7 +1400,17 @@ class GeneralGriddedCollocator(Collocator):
 
         logging.info("--> Co-locating...")
 
-        if hasattr(kernel, "get_value_for_data_only") and hasattr(constraint, "get_iterator_for_data_only"):
+        if _get_batch_method(kernel, "get_value_for_data_only_batch", "get_value_for_data_only") and \
+                hasattr(constraint, "get_cell_segments_for_data_only"):
+            # Reduce the data in every cell at once and scatter the results into the output arrays
+            out_indices, data_values, offsets = constraint.get_cell_segments_for_data_only(
+                self.missing_data_for_missing_sample, data_points, points)
+            if len(offsets) > 1:
+                kernel_vals = np.reshape(kernel.get_value_for_data_only_batch(data_values, offsets),
+                                         (kernel.return_size, -1))
+                for val, kernel_val in zip(values, kernel_vals):
+                    val[out_indices] = kernel_val
+        elif hasattr(kernel, "get_value_for_data_only") and hasattr(constraint, "get_iterator_for_data_only"):
             # Iterate over constrained cells
             iterator = constraint.get_iterator_for_data_only(
                 self.missing_data_for_missing_sample, coord_map, coords, data_points, shape, points, values)
@@ -874,7 +1437,23 @@ class GeneralGriddedCollocator(Collocator):
 
         log_memory_profile("GeneralGriddedCollocator Completed collocation")
 
-        # Construct an output cube containing the collocated data.
+        output = self._create_output(data, values, output_coords, coord_map, kernel)
+
+        log_memory_profile("GeneralGriddedCollocator Finished")
+
+        return output
+
+    def _create_output(self, data, values, output_coords, coord_map, kernel):
+        """
+        Construct the output cubes containing the collocated data.
+
+        :param data: the data which was collocated, giving the names and units of the output
+        :param values: list of masked arrays of collocated values, one per kernel return value
+        :param output_coords: the coordinates of the output cubes
+        :param coord_map: list of tuples relating index in HyperPoint to index in coords and in coords to be output
+        :param kernel: the kernel used in the collocation
+        :return: GriddedDataList of collocated data
+        """
         kernel_var_details = kernel.get_variable_details(self.var_name or data.var_name,
                                                          self.var_long_name or data.long_name,
                                                          data.standard_name,
@@ -900,9 +1479,6 @@ class GeneralGriddedCollocator(Collocator):
             transpose_order = [coord[2] for coord in coord_map]
             cube.transpose(transpose_order)
             output.append(cube)
-
-        log_memory_profile("GeneralGriddedCollocator Finished")
-
         return output
 
     def _set_multi_value_kernel(self, kernel_val, values, indices):
@@ -1044,6 +1620,31 @@ class BinnedCubeCellOnlyConstraint(Constraint):
                 data_slice = data_points_sorted[slice(*slice_start_end)]
                 yield out_indices, data_slice
 
+    def get_cell_segments_for_data_only(self, missing_data_for_missing_sample, data_points, points):
+        """
+        Get the data values in every cell at once. This is the vectorised equivalent of
+        :meth:`get_iterator_for_data_only`.
+
+        :param missing_data_for_missing_sample: If true anywhere there is missing data on the sample then final point is
+         missing; otherwise just use the sample
+        :param data_points: The (non-masked) data points
+        :param points: The original points object, these are the points to collocate
+        :return: Tuple of (out indices, values, offsets). Out indices is a tuple of arrays, one per output dimension,
+         giving the index of each cell with data in it. The data values in cell i are
+         ``values[offsets[i]:offsets[i+1]]``.
+        """
+        out_indices, offsets = self.grid_cell_bin_index_slices.get_cell_segments()
+        sort_order = self.grid_cell_bin_index_slices.sort_order[offsets[0]:offsets[-1]]
+        data_values = np.ma.getdata(data_points.data)[sort_order].astype(np.float64)
+        offsets = offsets - offsets[0]
+        if missing_data_for_missing_sample and len(offsets) > 1:
+            keep = ~np.ma.getmaskarray(points.data)[out_indices]
+            counts = np.diff(offsets)
+            data_values = data_values[np.repeat(keep, counts)]
+            offsets = np.concatenate(([0], np.cumsum(counts[keep])))
+            out_indices = tuple(index[keep] for index in out_indices)
+        return out_indices, data_values, offsets
+
 
 def make_coord_map(points, data):
     """
@@ -1,15 +1,120 @@
 """
 Indexes over data used for fast lookup when collocating.
 """
+from collections import OrderedDict
+import hashlib
 import logging
 import math
 import datetime
+import os
 
 import numpy as np
 import numpy.ma as ma
 
 from cis.collocation.haversinedistancekdtreeindex import HaversineDistanceKDTreeIndex
 from cis.time_util import convert_datetime_to_std_time
+from cis.utils import searchsorted
+
+
+def fingerprint(*items):
+    """
+    Create a fingerprint of some arrays and values, for use as a cache key. Two sets of items have the same fingerprint
+    only if they have the same types, shapes and values.
+
+    :param items: numpy arrays (or array-like), scalars, strings or None. Masks are ignored, so any masks should be
+     included as separate items.
+    :return: A hex digest string
+    """
+    digest = hashlib.sha1()
+    for item in items:
+        array = np.ascontiguousarray(np.asarray(item))
+        digest.update("{}{}".format(array.dtype, array.shape).encode('utf-8'))
+        if array.dtype.hasobject:
+            digest.update(repr(array.tolist()).encode('utf-8'))
+        else:
+            digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+class IndexCache(object):
+    """
+    Cache of computed indexes (sort orders, neighbour lists, etc.) as named numpy arrays, keyed on a
+    :func:`fingerprint` of the coordinates and parameters they were computed from. The most recently used indexes are
+    kept in memory, so that they can be reused when collocating many variables on the same coordinates. If a directory
+    is set the indexes are also stored there as compressed numpy files, so that repeat runs can skip indexing entirely.
+    """
+
+    def __init__(self, directory=None, max_entries=4):
+        """
+        :param str directory: Directory in which to store the indexes, or None to only cache them in memory
+        :param int max_entries: The maximum number of indexes to keep in memory
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npz')
+
+    def __contains__(self, key):
+        return key in self._entries or (self.directory is not None and os.path.isfile(self._path(key)))
+
+    def get(self, key):
+        """
+        Get a cached index.
+
+        :param str key: The fingerprint of the index
+        :return: dictionary of the arrays of the index, or None if it isn't cached
+        """
+        if key in self._entries:
+            arrays = self._entries.pop(key)
+        elif self.directory is not None and os.path.isfile(self._path(key)):
+            try:
+                with np.load(self._path(key)) as stored:
+                    arrays = dict((name, stored[name]) for name in stored.files)
+            except (IOError, ValueError) as e:
+                logging.warning("Unable to read cached index {}: {}".format(self._path(key), e))
+                return None
+            logging.info("--> Read cached index from {}".format(self._path(key)))
+        else:
+            return None
+        self._add(key, arrays)
+        return arrays
+
+    def put(self, key, **arrays):
+        """
+        Cache an index.
+
+        :param str key: The fingerprint of the index
+        :param arrays: The arrays of the index
+        """
+        self._add(key, arrays)
+        if self.directory is not None:
+            path = self._path(key)
+            temporary_path = "{}.{}.tmp.npz".format(path[:-4], os.getpid())
+            try:
+                if not os.path.isdir(self.directory):
+                    os.makedirs(self.directory)
+                np.savez_compressed(temporary_path, **arrays)
+                os.rename(temporary_path, path)
+            except (IOError, OSError) as e:
+                logging.warning("Unable to store cached index {}: {}".format(path, e))
+
+    def _add(self, key, arrays):
+        self._entries[key] = arrays
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all of the indexes cached in memory (but not any stored on disk).
+        """
+        self._entries.clear()
+
+
+#: The cache of indexes used when collocating and aggregating. Indexes are only stored on disk if its directory is set,
+#: which can also be done by setting the CIS_INDEX_CACHE_DIR environment variable.
+index_cache = IndexCache(directory=os.environ.get("CIS_INDEX_CACHE_DIR", None))
 
 
 class GridCellBinIndexInSlices(object):
@@ -30,7 +135,7 @@ class GridCellBinIndexInSlices(object):
         # hyper point cordinates list
         self.hp_coords = None
 
-    def index_data(self, coords, hyper_points, coord_map):
+    def index_data(self, coords, hyper_points, coord_map, use_cache=True):
         """
         Index the data that falls inside the grid cells
 
@@ -38,6 +143,8 @@ class GridCellBinIndexInSlices(object):
         :param hyper_points: list of HyperPoints to index
         :param coord_map: list of tuples relating index in HyperPoint to index in coords and in
                           coords to be iterated over
+        :param use_cache: whether to reuse (and store) the index in the index cache; points which will only be indexed
+                          once, such as chunks of a streaming aggregation, needn't be stored
         """
 
         # create bounds in correct order
@@ -67,7 +174,31 @@ class GridCellBinIndexInSlices(object):
             hp_coords.append(hp_coord)
 
         bounds_coords_max = list(zip(lower_bounds, hp_coords, max_bounds))
+        data_mask = ma.getmaskarray(hyper_points.data)
+
+        # Reuse the cell numbers and sort order if the same points have already been indexed on the same grid
+        key = fingerprint(self.__class__.__name__, coord_descreasing, coord_lengths, max_bounds, data_mask,
+                          *(lower_bounds + hp_coords))
+        cached = index_cache.get(key) if use_cache else None
+        if cached is not None:
+            self.cell_numbers = cached['cell_numbers']
+            self.sort_order = cached['sort_order']
+            self._indices = cached['indices']
+        else:
+            self._bin_points(bounds_coords_max, coord_descreasing, coord_lengths, data_mask)
+            if use_cache:
+                index_cache.put(key, cell_numbers=self.cell_numbers, sort_order=self.sort_order, indices=self._indices)
+        self.hp_coords = [hp_coord[self.sort_order] for hp_coord in hp_coords]
 
+    def _bin_points(self, bounds_coords_max, coord_descreasing, coord_lengths, data_mask):
+        """
+        Find the cell containing each point, and sort the points by cell.
+
+        :param bounds_coords_max: list of tuples of (lower bounds, point coordinates, maximum bound) for each dimension
+        :param coord_descreasing: list of whether each coordinate is decreasing
+        :param coord_lengths: list of the length of each coordinate
+        :param data_mask: mask of the points
+        """
         # stack for each coordinate
         #    where the coordinate is larger than the maximum set to -1
         #    otherwise search in the sorted coordinate to find all the index of the hyperpoints
@@ -79,7 +210,7 @@ class GridCellBinIndexInSlices(object):
         indices = np.vstack(
             np.where(
                 ci < max_coordinate_value,
-                np.searchsorted(bi, ci, side='right') - 1,
+                searchsorted(bi, ci, side='right') - 1,
                 -1)
             for bi, ci, max_coordinate_value in bounds_coords_max)
 
@@ -90,7 +221,7 @@ class GridCellBinIndexInSlices(object):
         # i.e. have indexes that are not -1 and are not masked data points
         grid_mask = np.all(
             (indices >= 0) &
-            (ma.getmaskarray(hyper_points.data) == False),
+            (data_mask == False),
             axis=0)
 
         # if the coordinate was decreasing then correct the indices for this cell
@@ -119,7 +250,24 @@ class GridCellBinIndexInSlices(object):
         self.sort_order = np.argsort(self.cell_numbers)
         self.cell_numbers = self.cell_numbers[self.sort_order]
         self._indices = indices[:, self.sort_order]
-        self.hp_coords = [hp_coord[self.sort_order] for hp_coord in hp_coords]
+
+    def get_cell_segments(self):
+        """
+        Get the points in every cell at once, as segments of the sorted list of points. This is the vectorised
+        equivalent of :meth:`get_iterator`.
+
+        :return: Tuple of (out indices, offsets). Out indices is a tuple of arrays, one per dimension of the grid,
+         giving the grid index of each cell with points in it. The points in cell i are
+         ``self.sort_order[offsets[i]:offsets[i + 1]]``.
+        """
+        # Points outside the grid have a cell number of -1, so are sorted before all of the others
+        first_in_grid = np.searchsorted(self.cell_numbers, 0)
+        starts = np.concatenate(([first_in_grid],
+                                 np.flatnonzero(np.diff(self.cell_numbers[first_in_grid:])) + first_in_grid + 1))
+        if first_in_grid == len(self.cell_numbers):
+            starts = starts[:0]
+        offsets = np.append(starts, len(self.cell_numbers))
+        return tuple(self._indices[:, starts]), offsets
 
     def get_iterator(self):
         """
@@ -249,11 +397,75 @@ class GridCellBinIndex(object):
         return self.index[tuple(indices)]
 
 
+class SortedCoordinatesIndex(object):
+    """
+    Index of data points sorted by their time, altitude and air pressure, used to find all of the points within a
+    window of one of those coordinates by binary search rather than by checking every point.
+    """
+
+    #: The coordinates which are indexed
+    coordinate_names = ('time', 'altitude', 'air_pressure')
+
+    def __init__(self):
+        # Order of the data points when sorted by each coordinate
+        self.sort_orders = {}
+
+        # Coordinate values in sorted order (the log of air pressure, so that a ratio window becomes a difference)
+        self.sorted_values = {}
+
+    def index_data(self, points, data, coord_map):
+        """
+        Sort the data points by each of the indexed coordinates which they have.
+
+        :param points: (not used) sample points
+        :param data: dataframe of the data points to index
+        :param coord_map: (not used) list of tuples relating index in HyperPoint to index in sample point coords and
+                          in coords to be output
+        """
+        for name in self.coordinate_names:
+            if name not in data:
+                continue
+            values = data[name].values
+            if name == 'air_pressure':
+                # Pressure separations are ratios, which are only meaningful for positive pressures
+                if not np.all(values > 0):
+                    continue
+                values = np.log(values)
+            sort_order = np.argsort(values, kind='mergesort')
+            self.sort_orders[name] = sort_order
+            self.sorted_values[name] = values[sort_order]
+
+    def find_windows(self, name, centres, separation):
+        """
+        Finds the data points within a separation of each of a set of values of an indexed coordinate. The windows
+        are widened slightly so that rounding can not exclude points right at the edge, so callers should still
+        apply the exact separation check to the points found.
+
+        :param name: The name of the coordinate
+        :param centres: Array of coordinate values at the centre of each window
+        :param separation: The separation from the centre, which for air pressure is a ratio
+        :return: Tuple of (starts, stops) arrays; the data points in window i are
+         ``data.iloc[sort_orders[name][starts[i]:stops[i]]]``
+        """
+        sorted_values = self.sorted_values[name]
+        centres = np.asarray(centres, dtype=float)
+        if name == 'air_pressure':
+            with np.errstate(divide='ignore', invalid='ignore'):
+                centres = np.log(centres)
+            separation = np.log(separation)
+        with np.errstate(invalid='ignore'):
+            half_width = separation + 8 * np.spacing(np.abs(centres) + separation)
+        starts = np.searchsorted(sorted_values, centres - half_width, side='left')
+        stops = np.searchsorted(sorted_values, centres + half_width, side='right')
+        return starts, np.maximum(starts, stops)
+
+
 # Map of names of attributes of a constraint or kernel to the class used to
 # create an index to which the attribute should be set
 _index_attributes = {'grid_cell_bin_index': GridCellBinIndex,
                      'grid_cell_bin_index_slices': GridCellBinIndexInSlices,
-                     'haversine_distance_kd_tree_index': HaversineDistanceKDTreeIndex}
+                     'haversine_distance_kd_tree_index': HaversineDistanceKDTreeIndex,
+                     'sorted_coordinates_index': SortedCoordinatesIndex}
 
 
 def create_indexes(operator, coords, data, coord_map):
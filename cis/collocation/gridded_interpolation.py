@@ -20,8 +20,18 @@
 #  interpolations of different datasets using the same points, and support for hybrid coordinates.
 # The two helper functions extend_circular_coord and _data are also taken from SciPy as the interpolate module is
 #  deprecated since Iris 1.10.
+import logging
+import os
+import zipfile
+
 import numpy as np
 
+#: The memory (in megabytes) which the interpolation weights of the sample points, and the intermediate arrays of
+#: evaluating them, may use. The sample points are interpolated in chunks which fit in it, in which case the weights are
+#: recalculated for each dataset interpolated rather than cached. It can be set by the CIS_INTERPOLATION_MEMORY_MB
+#: environment variable.
+interpolation_memory_mb = float(os.environ.get("CIS_INTERPOLATION_MEMORY_MB", 1024))
+
 
 def extend_circular_coord(coord, points):
     """
@@ -47,7 +57,8 @@ def extend_circular_data(data, coord_dim):
 
 class GriddedUngriddedInterpolator(object):
 
-    def __init__(self, _data, sample, method='lin', missing_data_for_missing_sample=False):
+    def __init__(self, _data, sample, method='lin', missing_data_for_missing_sample=False, memory_mb=None,
+                 weights_file=None):
         """
         Prepare an interpolation over the grid defined by a GriddedData source onto an UngriddedData sample.
 
@@ -57,6 +68,11 @@ class GriddedUngriddedInterpolator(object):
         :param GriddedData _data: The source data, only the coordinates are used from this at initialisation.
         :param UngriddedData sample: The points to sample the source data at.
         :param str method: The interpolation method to use (either 'linear' or 'nearest'). Default is 'linear'.
+        :param float memory_mb: The memory the interpolation weights may use, in megabytes. If the weights of every
+         sample point need more, they are calculated for chunks of the sample points each time the interpolator is
+         called. Default is :data:`interpolation_memory_mb`.
+        :param str weights_file: An (optional) numpy (.npz) file to store the interpolation weights in. If the file
+         already holds the weights for the same grid and sample points they are read from it rather than calculated.
         """
         from cis.utils import move_item_to_end
         coords = []
@@ -88,7 +104,7 @@ class GriddedUngriddedInterpolator(object):
                 decreasing = (coord_points.size > 1 and
                               coord_points[1] < coord_points[0])
                 if decreasing:
-                    self._decreasing_coord_dims.append(decreasing)
+                    self._decreasing_coord_dims.append(coord_dim)
                     coord_points = coord_points[::-1]
 
                 if getattr(coord, 'circular', False):
@@ -128,8 +144,28 @@ class GriddedUngriddedInterpolator(object):
         else:
             self.missing_mask = None
 
-        self._interp = _RegularGridInterpolator(grid_points, sample_points,
-                                                hybrid_coord=hybrid_coord, hybrid_dims=hybrid_dims, method=method)
+        if memory_mb is None:
+            memory_mb = interpolation_memory_mb
+        bytes_per_point = _RegularGridInterpolator.estimate_bytes_per_point(len(grid_points), hybrid_coord)
+        max_chunk_points = max(int(memory_mb * 2**20 / bytes_per_point), 1)
+
+        self._interp = None
+        if weights_file is not None:
+            from cis.collocation.data_index import fingerprint
+            key = fingerprint(method, self._data_transpose, self._circular_coord_dims, self._decreasing_coord_dims,
+                              self.missing_mask, hybrid_coord, hybrid_dims, *(grid_points + sample_points))
+            self._interp = _RegularGridInterpolator.load_weights(weights_file, key)
+
+        if self._interp is None:
+            self._interp = _RegularGridInterpolator(grid_points, sample_points,
+                                                    hybrid_coord=hybrid_coord, hybrid_dims=hybrid_dims, method=method,
+                                                    max_chunk_points=max_chunk_points)
+            if weights_file is not None:
+                self._interp.save_weights(weights_file, key)
+
+        # Only the hyperslab of the data around the sample points is read when interpolating. Circular dimensions are
+        #  read in full as the data is extended around them.
+        self._slab = self._interp.restrict_to_sampled_slab(fixed_dims=self._circular_coord_dims)
 
     def _get_dims_order(self, data, coords):
         """
@@ -146,9 +182,33 @@ class GriddedUngriddedInterpolator(object):
         dim_slices = [slice(None)] * data.ndim
         for dim in self._decreasing_coord_dims:
                 dim_slices[dim] = slice(-1, None, -1)
-        data = data[dim_slices]
+        data = data[tuple(dim_slices)]
         return data
 
+    def _read_slab(self, data):
+        """
+        Read the hyperslab of the data values which the sample points need, so that only that part of lazy data is
+        loaded.
+
+        :param GriddedData data: The data, with its dimensions in their original order
+        :return ndarray: The values in the hyperslab, with their dimensions in their original order
+        """
+        if self._slab is None:
+            return data.data
+        slices = [slice(None)] * data.ndim
+        for dim, dim_range in enumerate(self._slab):
+            if dim_range is None:
+                continue
+            start, stop = dim_range
+            if dim in self._decreasing_coord_dims:
+                # The indices are of the inverted dimension
+                length = data.shape[self._data_transpose[dim]]
+                start, stop = length - stop, length - start
+            slices[self._data_transpose[dim]] = slice(start, stop)
+        if data.has_lazy_data():
+            return data[tuple(slices)].data
+        return data.data[tuple(slices)]
+
     def __call__(self, data, fill_value=np.nan, extrapolate=False):
         """
          Perform the prepared interpolation over the given data GriddedData object - this assumes that the coordinates
@@ -164,18 +224,46 @@ class GriddedUngriddedInterpolator(object):
         if extrapolate:
             fill_value = None
 
+        result = self._interp(self._get_values(data), fill_value=fill_value)
+
+        return self._expand_missing(result, fill_value)
+
+    def interpolate_stacked(self, data_list, fill_value=np.nan, extrapolate=False):
+        """
+        Perform the prepared interpolation over several GriddedData objects on the same grid at once. The values are
+        stacked along a trailing dimension so that the weights are applied to all of them together.
+
+        :param list data_list: The GriddedData objects to interpolate, all on the coordinates used to initialise the
+         interpolator
+        :param float fill_value: The fill value to use for sample points outside of the bounds of the data
+        :param bool extrapolate: Extrapolate points outside the bounds of the data? Default False.
+        :return list: The interpolated values of each data object
+        """
+        if extrapolate:
+            fill_value = None
+
+        values = np.ma.stack([self._get_values(data) for data in data_list], axis=-1)
+        result = self._interp(values, fill_value=fill_value)
+
+        return [self._expand_missing(result[..., i], fill_value) for i in range(len(data_list))]
+
+    def _get_values(self, data):
+        """
+        Read the values of the data and arrange them on the grid the interpolator was initialised with.
+        """
         # Apply a transpose if we need to so that the indices line-up correctly
-        data_array = data.data.transpose(self._data_transpose)
+        data_array = self._read_slab(data).transpose(self._data_transpose)
         # Account for any circular coords present
         for dim in self._circular_coord_dims:
             data_array = extend_circular_data(data_array, dim)
 
-        data_array = self._account_for_inverted(data_array)
-
-        result = self._interp(data_array, fill_value=fill_value)
+        return self._account_for_inverted(data_array)
 
+    def _expand_missing(self, result, fill_value):
+        """
+        Pack the interpolated values back into the original shape of the sample, if any sample points were missing.
+        """
         if self.missing_mask is not None:
-            # Pack the interpolated values back into the original shape
             expanded_result = np.ma.masked_array(np.zeros(self.missing_mask.shape), mask=self.missing_mask.copy(),
                                                  fill_value=fill_value)
             expanded_result[~self.missing_mask] = result
@@ -224,7 +312,7 @@ class _RegularGridInterpolator(object):
     # this class is based on code originally programmed by Johannes Buchner,
     # see https://github.com/JohannesBuchner/regulargrid
 
-    def __init__(self, coords, points, hybrid_coord=None, hybrid_dims=None, method="lin"):
+    def __init__(self, coords, points, hybrid_coord=None, hybrid_dims=None, method="lin", max_chunk_points=None):
         """
         Initialise the itnerpolator - this will calculate and cache the indices of the interpolation. It will
         also interpolate the hybrid coordinate if needed to determine a unique vertical index.
@@ -235,13 +323,11 @@ class _RegularGridInterpolator(object):
         :param iterable hybrid_dims: The grid dimensions over which the hybrid coordinate is defined
         :param str method: The method of interpolation to perform. Supported are "linear" and "nearest". Default is
         "linear".
+        :param int max_chunk_points: The (optional) maximum number of points to interpolate at once. If there are more
+        points than this the indices aren't cached, but calculated for one chunk of points at a time whenever the
+        interpolator is called, so that the memory used doesn't depend on the number of points.
         """
-        if method == "lin":
-            self._interp = self._evaluate_linear
-        elif method == "nn":
-            self._interp = self._evaluate_nearest
-        else:
-            raise ValueError("Method '%s' is not defined" % method)
+        self._set_method(method)
 
         for i, c in enumerate(coords):
             if not np.all(np.diff(c) > 0.):
@@ -259,37 +345,171 @@ class _RegularGridInterpolator(object):
                 raise ValueError("The requested sample points have dimension "
                                  "%d, but the interpolation grid has "
                                  "dimension %d" % (points.shape[1], ndim))
+            points = points.T
         else:
             ndim = len(self.grid)
             points = _ndim_coords_from_arrays(points, ndim=ndim)
 
+        self._hybrid_coord = hybrid_coord
+        self._hybrid_dims = hybrid_dims
+        self.n_points = points.shape[1]
+
+        if max_chunk_points is None or self.n_points <= max_chunk_points:
+            self._points = None
+            self._max_chunk_points = None
+            self.indices, self.norm_distances, self.out_of_bounds = self._find_point_indices(points)
+        else:
+            # Keep the points and find the indices of a chunk at a time when the interpolator is called
+            self._points = points
+            self._max_chunk_points = max_chunk_points
+            self.indices, self.norm_distances, self.out_of_bounds = None, None, None
+
+    def _set_method(self, method):
+        if method == "lin":
+            self._interp = self._evaluate_linear
+        elif method == "nn":
+            self._interp = self._evaluate_nearest
+        else:
+            raise ValueError("Method '%s' is not defined" % method)
+        self.method = method
+
+    def save_weights(self, filename, key):
+        """
+        Store the cached indices, normalised distances and out of bounds flags in a numpy (.npz) file, so that they
+        can be read by :meth:`load_weights` rather than calculated again. The file is written to a temporary name and
+        then renamed, so an interrupted run never leaves a partial file. Nothing is stored if the indices aren't
+        cached (because the points are interpolated in chunks).
+
+        :param str filename: The file to store the weights in
+        :param str key: A fingerprint of the grid and points the weights were calculated for
+        """
+        if self._points is not None:
+            logging.warning("The interpolation weights of {} points are larger than the interpolation memory, so "
+                            "they are not stored in {}".format(self.n_points, filename))
+            return
+        arrays = {'key': np.array(key), 'method': np.array(self.method), 'out_of_bounds': self.out_of_bounds}
+        # There is one more set of indices than grid coordinates for a hybrid vertical coordinate
+        for i, grid in enumerate(self.grid):
+            arrays['grid_{}'.format(i)] = grid
+        for i, (indices, norm_distances) in enumerate(zip(self.indices, self.norm_distances)):
+            arrays['indices_{}'.format(i)] = indices
+            arrays['norm_distances_{}'.format(i)] = norm_distances
+        temporary_filename = "{}.{}.tmp".format(filename, os.getpid())
+        try:
+            with open(temporary_filename, 'wb') as f:
+                np.savez(f, **arrays)
+            os.rename(temporary_filename, filename)
+        except (IOError, OSError) as e:
+            logging.warning("Unable to store interpolation weights in {}: {}".format(filename, e))
+
+    @classmethod
+    def load_weights(cls, filename, key):
+        """
+        Create an interpolator from the weights stored by :meth:`save_weights`.
+
+        :param str filename: The file the weights are stored in
+        :param str key: The fingerprint of the grid and points the weights are needed for
+        :return: The interpolator, or None if the file doesn't exist, can't be read or holds the weights of a different
+         grid or points
+        """
+        if not os.path.isfile(filename):
+            return None
+        try:
+            with np.load(filename) as weights:
+                if str(weights['key']) != key:
+                    logging.info("The interpolation weights in {} are for different points, so they will be "
+                                 "recalculated".format(filename))
+                    return None
+                ndim = len([name for name in weights.files if name.startswith('grid_')])
+                nindices = len([name for name in weights.files if name.startswith('indices_')])
+                interpolator = cls.__new__(cls)
+                interpolator._set_method(str(weights['method']))
+                interpolator.grid = tuple(weights['grid_{}'.format(i)] for i in range(ndim))
+                interpolator.indices = [weights['indices_{}'.format(i)] for i in range(nindices)]
+                interpolator.norm_distances = [weights['norm_distances_{}'.format(i)] for i in range(nindices)]
+                interpolator.out_of_bounds = weights['out_of_bounds']
+        except (IOError, ValueError, KeyError, zipfile.BadZipfile) as e:
+            logging.warning("Unable to read the interpolation weights in {}, so they will be recalculated: {}"
+                            .format(filename, e))
+            return None
+        interpolator.n_points = interpolator.out_of_bounds.shape[0]
+        interpolator._hybrid_coord = None
+        interpolator._hybrid_dims = None
+        interpolator._points = None
+        interpolator._max_chunk_points = None
+        return interpolator
+
+    def restrict_to_sampled_slab(self, fixed_dims=()):
+        """
+        Restrict the interpolator to the hyperslab of the grid which its cached indices use, so that it is called with
+        only that part of the values. The indices are made relative to the start of the hyperslab.
+
+        :param iterable fixed_dims: Dimensions which are not restricted
+        :return: A list of the (start, stop) of the hyperslab in each dimension (None for the fixed dimensions), or
+         None if the indices aren't cached or there are no points
+        """
+        if self._points is not None or self.n_points == 0:
+            return None
+        slab = []
+        grid = list(self.grid)
+        for dim, indices in enumerate(self.indices):
+            if dim in fixed_dims or indices.min() < 0:
+                slab.append(None)
+                continue
+            # Both linear and nearest neighbour interpolation may use the next index along
+            start, stop = int(indices.min()), int(indices.max()) + 2
+            self.indices[dim] = indices - start
+            if dim < len(grid):
+                grid[dim] = grid[dim][start:stop]
+            slab.append((start, stop))
+        self.grid = tuple(grid)
+        return slab
+
+    @staticmethod
+    def estimate_bytes_per_point(ndim, hybrid_coord=None):
+        """
+        Estimate the memory needed for each point when finding the indices and interpolating. This is dominated by the
+        indices and distances in each dimension, the temporary arrays of evaluating the interpolation and, for hybrid
+        coordinates, the interpolated vertical columns.
+
+        :param int ndim: The number of dimensions of the grid
+        :param ndarray hybrid_coord: The (optional) hybrid vertical coordinate
+        :return int: The approximate number of bytes
+        """
+        bytes_per_point = 8 * (2 * ndim + 8)
         if hybrid_coord is not None:
+            bytes_per_point += 8 * 5 * np.shape(hybrid_coord)[-1]
+        return bytes_per_point
+
+    def _find_point_indices(self, points):
+        """
+        Find the indices, normalised distances and out of bounds flags of the given points.
+
+        :param ndarray points: The points, of shape (ndim, number of points)
+        :return: Tuple of the lists of indices and normalised distances in each dimension, and the out of bounds flags
+        """
+        if self._hybrid_coord is not None:
 
             # Firstly interpolate over all of the dimensions except the vertical (which will always be the last...)
-            self.indices, self.norm_distances, self.out_of_bounds = \
-                self._find_indices(points[:-1], self.grid)
+            indices, norm_distances, out_of_bounds = self._find_indices(points[:-1], self.grid)
 
             # Find the dims to interpolate over for the hybrid coord
-            hybrid_interp_dims = hybrid_dims[:-1]
-            hybrid_indices = [self.indices[i] for i in hybrid_interp_dims]
+            hybrid_interp_dims = self._hybrid_dims[:-1]
+            hybrid_indices = [indices[i] for i in hybrid_interp_dims]
 
             # Find all of the interpolated vertical columns (one for each point)
-            v_coords = self._interp(hybrid_coord, hybrid_indices, self.norm_distances)
-
-            self.indices.append(np.zeros(len(points.T), dtype=self.indices[0].dtype))
-            self.norm_distances.append(np.zeros(len(points.T)))
+            v_coords = self._interp(self._hybrid_coord, hybrid_indices, norm_distances)
 
             # Calculate and store the vertical index and weight for each point based on the interpolated vertical
             # column
-            # TODO: This loop could be a bottle-neck for many points, maybe move to Cython?
-            for i, p in enumerate(points.T):
-                vert_index, vert_norm_distance, vert_out_of_bounds = self._find_vertical_index(p[-1], v_coords[i])
-                self.indices[-1][i] = vert_index
-                self.norm_distances[-1][i] = vert_norm_distance
-                self.out_of_bounds[i] += vert_out_of_bounds
+            vert_indices, vert_norm_distances, vert_out_of_bounds = self._find_vertical_indices(points[-1], v_coords)
+            indices.append(vert_indices.astype(indices[0].dtype))
+            norm_distances.append(vert_norm_distances)
+            out_of_bounds += vert_out_of_bounds
 
         else:
-            self.indices, self.norm_distances, self.out_of_bounds = self._find_indices(points.T, self.grid)
+            indices, norm_distances, out_of_bounds = self._find_indices(points, self.grid)
+        return indices, norm_distances, out_of_bounds
 
     def __call__(self, values, fill_value=np.nan):
         """
@@ -325,13 +545,42 @@ class _RegularGridInterpolator(object):
                 raise ValueError("There are %d points and %d values in "
                                  "dimension %d" % (len(p), values.shape[i], i))
 
-        result = self._interp(values, self.indices, self.norm_distances)
+        if self._points is None:
+            result = self._interp(values, self.indices, self.norm_distances)
+            out_of_bounds = self.out_of_bounds
+        else:
+            result, out_of_bounds = self._interpolate_in_chunks(values)
 
         if fill_value is not None:
-            result = np.ma.array(result, mask=self.out_of_bounds, fill_value=fill_value)
+            # Mask the points out of bounds across any trailing dimensions of the values
+            out_of_bounds = out_of_bounds.reshape(out_of_bounds.shape + (1,) * (np.ndim(result) - 1))
+            result = np.ma.array(result, mask=np.broadcast_to(out_of_bounds, np.shape(result)),
+                                 fill_value=fill_value)
 
         return result
 
+    def _interpolate_in_chunks(self, values):
+        """
+        Interpolate the values onto the points one chunk of points at a time, finding the indices of each chunk as it
+        goes, and write the results into a single output array.
+
+        :param ndarray values: The data on the regular grid in n dimensions
+        :return: Tuple of the interpolated values (a masked array) and the out of bounds flags
+        """
+        out_of_bounds = np.zeros(self.n_points, dtype=bool)
+        result = None
+        for start in range(0, self.n_points, self._max_chunk_points):
+            stop = min(start + self._max_chunk_points, self.n_points)
+            indices, norm_distances, chunk_out_of_bounds = self._find_point_indices(self._points[:, start:stop])
+            chunk_result = np.ma.asarray(self._interp(values, indices, norm_distances))
+            if result is None:
+                shape = (self.n_points,) + chunk_result.shape[1:]
+                result = np.ma.masked_array(np.empty(shape, dtype=chunk_result.dtype),
+                                            mask=np.zeros(shape, dtype=bool))
+            result[start:stop] = chunk_result
+            out_of_bounds[start:stop] = chunk_out_of_bounds
+        return result, out_of_bounds
+
     @staticmethod
     def _evaluate_linear(values, indices, norm_distances):
         from itertools import product
@@ -354,10 +603,11 @@ class _RegularGridInterpolator(object):
         idx_res = []
         for i, yi in zip(indices, norm_distances):
             idx_res.append(np.where(yi <= .5, i, i + 1))
-        return values[idx_res]
+        return values[tuple(idx_res)]
 
     @staticmethod
     def _find_indices(points, coords):
+        from cis.utils import searchsorted
         # find relevant edges between which xi are situated
         indices = []
         # compute distance to lower edge in unity units
@@ -366,7 +616,7 @@ class _RegularGridInterpolator(object):
         out_of_bounds = np.zeros((points.shape[1]), dtype=bool) if isinstance(points, np.ndarray) else 0
         # iterate through dimensions
         for x, coord in zip(points, coords):
-            i = np.searchsorted(coord, x) - 1
+            i = searchsorted(coord, x) - 1
             i[i < 0] = 0
             i[i > coord.size - 2] = coord.size - 2
 
@@ -377,6 +627,42 @@ class _RegularGridInterpolator(object):
             out_of_bounds += x > coord[-1]
         return indices, norm_distances, out_of_bounds
 
+    @staticmethod
+    def _find_vertical_indices(points, coords):
+        """
+        Find the vertical index, normalised distance and whether it is out of bounds for every point at once, each in
+        its own vertical column. This gives the same results as calling :meth:`_find_vertical_index` for each point
+        and column in turn.
+
+        :param ndarray points: The vertical coordinate of each point
+        :param ndarray coords: The vertical column of each point, one row per point
+        :return: Tuple of arrays of the indices, normalised distances and out of bounds flags
+        """
+        points = np.asarray(points, dtype=float)
+        coords = np.ma.getdata(coords)
+        rows = np.arange(len(points))
+
+        # A binary search of every row at once; this follows the same steps as np.searchsorted for each row, including
+        # its ordering of NaNs after every number, so gives the same index even where a column is not monotonic.
+        lower = np.zeros(len(points), dtype=int)
+        upper = np.full(len(points), coords.shape[1], dtype=int)
+        searching = lower < upper
+        while searching.any():
+            middle = lower + (upper - lower) // 2
+            middle_values = coords[rows, np.minimum(middle, coords.shape[1] - 1)]
+            less = (middle_values < points) | (np.isnan(points) & ~np.isnan(middle_values))
+            lower = np.where(searching & less, middle + 1, lower)
+            upper = np.where(searching & ~less, middle, upper)
+            searching = lower < upper
+
+        i = np.clip(lower - 1, 0, coords.shape[1] - 2)
+        lower_coords = coords[rows, i]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            norm_distances = (points - lower_coords) / (coords[rows, i + 1] - lower_coords)
+
+        out_of_bounds = (points < coords[:, 0]) | (points > coords[:, -1])
+        return i, norm_distances, out_of_bounds
+
     @staticmethod
     def _find_vertical_index(point, coord):
         i = np.searchsorted(coord, point) - 1
@@ -0,0 +1,252 @@
+"""
+Regridding of gridded data onto another grid using a precomputed sparse matrix of weights.
+"""
+import numpy as np
+from scipy import sparse
+
+
+def _point_weights(coord, points, nearest=False):
+    """
+    Find the linear (or nearest neighbour) interpolation weights of the points of a coordinate at some sample points.
+    The indices, circular and decreasing coordinates and out of bounds points are handled in the same way as the Iris
+    linear and nearest interpolation schemes.
+
+    :param iris.coords.DimCoord coord: The source coordinate
+    :param ndarray points: The sample points
+    :param bool nearest: Use the nearest neighbour, rather than linear interpolation
+    :return: Tuple of the sparse matrix of weights, of shape (number of sample points, number of coordinate points), and
+     the out of bounds flags of the sample points
+    """
+    from iris.analysis.cartography import wrap_lons
+    from cis.collocation.gridded_interpolation import extend_circular_coord
+    from cis.utils import searchsorted
+
+    coord_points = coord.points
+    columns = np.arange(coord_points.size)
+    if coord_points[1] < coord_points[0]:
+        coord_points = coord_points[::-1]
+        columns = columns[::-1]
+
+    modulus = coord.units.modulus or 0
+    if getattr(coord, 'circular', False):
+        coord_points = extend_circular_coord(coord, coord_points)
+        columns = np.append(columns, columns[0])
+
+    x = np.asarray(points, dtype=float)
+    if modulus:
+        # Map the points into the range of the coordinate, centred over its centre
+        offset = 0.5 * (coord_points.max() + coord_points.min() - modulus)
+        x = wrap_lons(x, offset, modulus)
+
+    i = searchsorted(coord_points, x) - 1
+    i = np.clip(i, 0, coord_points.size - 2)
+    norm_distances = (x - coord_points[i]) / (coord_points[i + 1] - coord_points[i])
+    out_of_bounds = (x < coord_points[0]) | (x > coord_points[-1])
+
+    rows = np.arange(x.size)
+    shape = (x.size, coord.points.size)
+    if nearest:
+        nearest_indices = np.where(norm_distances <= .5, i, i + 1)
+        weights = sparse.coo_matrix((np.ones(x.size), (rows, columns[nearest_indices])), shape=shape)
+    else:
+        # Zero weights are kept so that NaN neighbours propagate as they do when interpolating with Iris
+        weights = sparse.coo_matrix((np.concatenate([1 - norm_distances, norm_distances]),
+                                     (np.concatenate([rows, rows]), np.concatenate([columns[i], columns[i + 1]]))),
+                                    shape=shape)
+    return weights.tocsr(), out_of_bounds
+
+
+def _get_bounds(coord):
+    if not coord.has_bounds():
+        coord = coord.copy()
+        coord.guess_bounds()
+    return coord.bounds
+
+
+def _area_weights(coord, sample_coord):
+    """
+    Find the first order conservative weights of the cells of a coordinate in the cells of a sample coordinate, the
+    fraction of each sample cell covered by each cell. Latitude cells are measured by area (the difference of the sine
+    of their bounds), others by length. Sample cells which are only partly covered are weighted by the covered part.
+
+    :param iris.coords.DimCoord coord: The source coordinate
+    :param iris.coords.DimCoord sample_coord: The sample coordinate
+    :return: Tuple of the sparse matrix of weights, of shape (number of sample cells, number of cells), and the out of
+     bounds flags of the sample cells which aren't covered at all
+    """
+    bounds, sample_bounds = _get_bounds(coord), _get_bounds(sample_coord)
+    if coord.name() == 'latitude':
+        def measure(b):
+            return np.sin(np.radians(np.clip(b, -90, 90)))
+    else:
+        def measure(b):
+            return b
+
+    lower, upper = bounds.min(axis=1), bounds.max(axis=1)
+    sample_lower, sample_upper = sample_bounds.min(axis=1)[:, np.newaxis], sample_bounds.max(axis=1)[:, np.newaxis]
+    modulus = coord.units.modulus or 0
+    overlap = np.zeros((sample_bounds.shape[0], bounds.shape[0]))
+    for shift in ([-modulus, 0, modulus] if modulus else [0]):
+        overlap_lower = np.maximum(sample_lower, lower + shift)
+        overlap_upper = np.minimum(sample_upper, upper + shift)
+        overlap += np.where(overlap_upper > overlap_lower, measure(overlap_upper) - measure(overlap_lower), 0)
+
+    covered = overlap.sum(axis=1)
+    out_of_bounds = covered == 0
+    weights = overlap / np.where(out_of_bounds, 1, covered)[:, np.newaxis]
+    return sparse.csr_matrix(weights), out_of_bounds
+
+
+class SparseRegridder(object):
+    """
+    Regrid cubes from their dimension coordinates onto sample coordinates using a sparse matrix of weights which maps
+    every source grid point onto every sample grid point. The matrix is the Kronecker product of the weights along each
+    regridded dimension and is applied to all the other dimensions of the data (time, levels etc.) in a single sparse
+    matrix multiplication. The matrices are cached, so that they are only calculated once for many variables on the same
+    grid (and, if the ``CIS_INDEX_CACHE_DIR`` environment variable is set, for later runs).
+    """
+
+    def __init__(self, cube, sample_coords, method='lin', extrapolate=False):
+        """
+        :param GriddedData cube: The source data, only the coordinates are used from this at initialisation.
+        :param list sample_coords: The DimCoords to regrid onto, each with the same name as a dimension coordinate of
+         the cube
+        :param str method: The regridding method, one of 'lin' (linear interpolation), 'nn' (nearest neighbour) or
+         'area' (first order area conservative)
+        :param bool extrapolate: Extrapolate sample points outside the source grid, rather than masking them? Points
+         outside the source grid are always masked for the area conservative method.
+        """
+        if method not in ['lin', 'nn', 'area']:
+            raise ValueError("Method '%s' is not defined" % method)
+        self.method = method
+        self.extrapolate = extrapolate and method != 'area'
+
+        coords_and_dims = sorted(((cube.coord(sample_coord.name(), dim_coords=True), sample_coord)
+                                  for sample_coord in sample_coords), key=lambda c: cube.coord_dims(c[0])[0])
+        self._interp_dims = [cube.coord_dims(coord)[0] for coord, _ in coords_and_dims]
+        self._sample_points = dict((dim, sample_coord.points)
+                                   for dim, (_, sample_coord) in zip(self._interp_dims, coords_and_dims))
+        self._matrix, self._out_of_bounds = self._get_weights(coords_and_dims)
+
+    @staticmethod
+    def can_regrid(cube, coord_names):
+        """
+        Can the cube be regridded over the named coordinates? They must all be dimension coordinates with at least two
+        points, and there must be no auxiliary coordinates (such as the surface pressure of a hybrid coordinate) over
+        the regridded dimensions, as these can't be interpolated.
+
+        :param GriddedData cube: The source data
+        :param list coord_names: The names of the coordinates to regrid over
+        :return bool:
+        """
+        interp_dims = set()
+        for name in coord_names:
+            coords = cube.coords(name, dim_coords=True)
+            if len(coords) == 0 or coords[0].points.size < 2:
+                return False
+            interp_dims.update(cube.coord_dims(coords[0]))
+        return not any(interp_dims.intersection(cube.coord_dims(coord)) for coord in cube.aux_coords)
+
+    def _get_weights(self, coords_and_dims):
+        """
+        Get the (cached) sparse matrix of weights and the out of bounds flags of the sample grid points.
+        """
+        from cis.collocation.data_index import fingerprint, index_cache
+        area = self.method == 'area'
+        items = []
+        for coord, sample_coord in coords_and_dims:
+            items.extend([coord.name(), coord.points, _get_bounds(coord) if area else None,
+                          getattr(coord, 'circular', False), coord.units.modulus or 0,
+                          sample_coord.points, _get_bounds(sample_coord) if area else None])
+        key = fingerprint('sparse_regrid', self.method, self.extrapolate, *items)
+
+        cached = index_cache.get(key)
+        if cached is not None:
+            matrix = sparse.csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                       shape=tuple(cached['shape']))
+            return matrix, cached['out_of_bounds']
+
+        matrix, out_of_bounds = None, None
+        for coord, sample_coord in coords_and_dims:
+            if area:
+                weights, dim_out_of_bounds = _area_weights(coord, sample_coord)
+            else:
+                weights, dim_out_of_bounds = _point_weights(coord, sample_coord.points, nearest=self.method == 'nn')
+            if matrix is None:
+                matrix, out_of_bounds = weights, dim_out_of_bounds
+            else:
+                matrix = sparse.kron(matrix, weights, format='csr')
+                out_of_bounds = (out_of_bounds[:, np.newaxis] | dim_out_of_bounds[np.newaxis, :]).ravel()
+
+        index_cache.put(key, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                        shape=np.array(matrix.shape), out_of_bounds=out_of_bounds)
+        return matrix, out_of_bounds
+
+    def _regrid_data(self, data):
+        """
+        Regrid a data array, with its regridded dimensions first and the others flattened into one.
+        """
+        result = self._matrix.dot(np.ma.getdata(data))
+
+        mask = None
+        if np.ma.is_masked(data):
+            # As with Iris, the mask is interpolated in the same way as the data, and any sample point with a
+            #  (positive) fraction of masked source points is masked
+            mask = self._matrix.dot(np.ma.getmaskarray(data).astype(np.float64)) > 0
+        if not self.extrapolate and self._out_of_bounds.any():
+            out_of_bounds = np.broadcast_to(self._out_of_bounds[:, np.newaxis], result.shape)
+            mask = out_of_bounds if mask is None else mask | out_of_bounds
+        return result, mask
+
+    def __call__(self, cube):
+        """
+        Regrid a cube on the same grid as the one the regridder was initialised with.
+
+        :param GriddedData cube: The data to regrid
+        :return iris.cube.Cube: The regridded data, with its dimensions in the same order as the source
+        """
+        import iris.cube
+        from iris.coords import AuxCoord, DimCoord
+
+        data = cube.data
+        other_dims = [dim for dim in range(cube.ndim) if dim not in self._interp_dims]
+        order = self._interp_dims + other_dims
+        values = np.transpose(data, order)
+        other_shape = values.shape[len(self._interp_dims):]
+
+        result, mask = self._regrid_data(values.reshape(self._matrix.shape[1], -1))
+
+        dtype = data.dtype if self.method == 'nn' else np.result_type(np.float16, data.dtype)
+        if mask is not None and np.issubdtype(dtype, np.inexact):
+            result[mask] = np.nan
+        result = result.astype(dtype)
+        if np.ma.isMaskedArray(data) or (mask is not None and mask.any()):
+            result = np.ma.masked_array(result, mask=mask if mask is not None else False)
+
+        sample_shape = tuple(self._sample_points[dim].size for dim in self._interp_dims)
+        result = np.transpose(result.reshape(sample_shape + other_shape), np.argsort(order))
+
+        new_cube = iris.cube.Cube(result)
+        new_cube.metadata = cube.metadata
+        coord_mapping = {}
+        dims_with_dim_coords = []
+        for coord in cube.dim_coords + cube.aux_coords:
+            dims = cube.coord_dims(coord)
+            if len(dims) > 0 and dims[0] in self._sample_points:
+                try:
+                    new_coord = coord.copy(self._sample_points[dims[0]])
+                except ValueError:
+                    new_coord = AuxCoord.from_coord(coord).copy(self._sample_points[dims[0]])
+            else:
+                new_coord = coord.copy()
+            if isinstance(new_coord, DimCoord) and len(dims) > 0 and dims[0] not in dims_with_dim_coords:
+                new_cube.add_dim_coord(new_coord, dims)
+                dims_with_dim_coords.append(dims[0])
+            else:
+                new_cube.add_aux_coord(new_coord, dims)
+            coord_mapping[id(coord)] = new_coord
+
+        for factory in cube.aux_factories:
+            new_cube.add_aux_factory(factory.updated(coord_mapping))
+
+        return new_cube
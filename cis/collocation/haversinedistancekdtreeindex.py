@@ -1,8 +1,15 @@
+import os
+
 import numpy as np
 
-from cis.collocation.kdtree import HaversineDistanceKDTree
+from cis.collocation.kdtree import HaversineDistanceKDTree, HaversineDistanceCKDTree
 from cis.data_io.hyperpoint import HyperPoint
 
+#: Use the (much slower) pure-Python HaversineDistanceKDTree rather than the compiled HaversineDistanceCKDTree. The two
+#: give the same neighbours, so this is only useful for validation. It can also be switched on by setting the
+#: CIS_PURE_PYTHON_KDTREE environment variable to 'true'.
+use_pure_python_kdtree = os.environ.get("CIS_PURE_PYTHON_KDTREE", "").lower() == 'true'
+
 
 def create_index(data, leafsize=10):
     """
@@ -15,7 +22,8 @@ def create_index(data, leafsize=10):
         mask = np.ma.getmask(data.data).ravel()
     else:
         mask = None
-    return HaversineDistanceKDTree(spatial_points, mask=mask, leafsize=leafsize)
+    tree_cls = HaversineDistanceKDTree if use_pure_python_kdtree else HaversineDistanceCKDTree
+    return tree_cls(spatial_points, mask=mask, leafsize=leafsize)
 
 
 class HaversineDistanceKDTreeIndex(object):
@@ -56,12 +64,31 @@ class HaversineDistanceKDTreeIndex(object):
         query_pt = [[point.latitude, point.longitude]]
         return self.index.query_ball_point(query_pt, distance)[0]
 
-    def find_points_within_distance_sample(self, sample, distance):
+    def find_points_within_distance_sample(self, sample, distance, sample_index=None):
         """Finds the points within a specified distance of a specified point.
         :param sample: the sample points
         :param distance: distance in kilometres
+        :param sample_index: the k-D tree index of the sample points (see :func:`create_index`), if it has already
+         been created
         :return list of lists:
         For each element ``self.data[i]`` of this tree, ``results[i]`` is a
             list of the indices of its neighbors in ``other.data``.
         """
-        return create_index(sample).query_ball_tree(self.index, distance)
+        if sample_index is None:
+            sample_index = create_index(sample)
+        return sample_index.query_ball_tree(self.index, distance)
+
+    def count_points_within_distance_sample(self, sample, distance, sample_index=None):
+        """Estimates the number of pairs of sample and indexed points within a specified distance of each other,
+        without finding them.
+        :param sample: the sample points
+        :param distance: distance in kilometres
+        :param sample_index: the k-D tree index of the sample points (see :func:`create_index`), if it has already
+         been created
+        :return: the number of pairs, or None if the index can't count them any faster than finding them
+        """
+        if not hasattr(self.index, 'count_neighbours'):
+            return None
+        if sample_index is None:
+            sample_index = create_index(sample)
+        return sample_index.count_neighbours(self.index, distance)
@@ -7,6 +7,7 @@
 
 import sys
 from heapq import heappush, heappop
+import itertools
 import math
 
 import numpy as np
@@ -1346,6 +1347,217 @@ class HaversineDistanceKDTree(KDTree):
         return traverse_checking(self.tree, R)
 
 
+def lat_lon_to_unit_vectors(x):
+    """Converts points on the Earth's surface to Cartesian position vectors on the unit sphere
+    :param x: array of points, each as array of latitude, longitude in degrees
+    :return: array of points, each as array of x, y, z
+    """
+    lat = np.radians(x[..., 0])
+    lon = np.radians(x[..., 1])
+    cos_lat = np.cos(lat)
+    return np.stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+def distance_to_chord(distance):
+    """Converts a distance along the Earth's surface into the length of the chord through the unit sphere between the
+    same points
+    :param distance: distance in kilometres
+    :return: chord length on the unit sphere
+    """
+    return 2.0 * np.sin(np.minimum(np.asarray(distance, dtype=float) / RADIUS_EARTH, PI) / 2.0)
+
+
+def chord_to_distance(chord):
+    """Converts the length of a chord through the unit sphere into the distance along the Earth's surface between the
+    same points
+    :param chord: chord length on the unit sphere
+    :return: distance in kilometres (infinite chords give infinite distances)
+    """
+    chord = np.asarray(chord, dtype=float)
+    with np.errstate(invalid='ignore'):
+        distance = 2.0 * RADIUS_EARTH * np.arcsin(np.clip(chord / 2.0, 0.0, 1.0))
+    return np.where(np.isinf(chord), np.inf, distance)
+
+
+class HaversineDistanceCKDTree(object):
+    """Compiled alternative to HaversineDistanceKDTree, with the same query interface, built on
+    scipy.spatial.cKDTree.
+
+    The points are indexed by their position vectors on the unit sphere. Since the chord length between two points
+    increases monotonically with the distance along the Earth's surface between them, distances are converted to chord
+    lengths to query the tree and candidate neighbours are then checked using the haversine distance, so that exactly
+    the same neighbours as HaversineDistanceKDTree are returned.
+    """
+
+    #: Relative tolerance added to chord lengths so that rounding can't exclude points which should be checked
+    chord_tolerance = 1e-9
+
+    #: Number of candidates compared when looking for a single nearest neighbour, to resolve equidistant points
+    nearest_tie_candidates = 4
+
+    def __init__(self, data, leafsize=10, mask=None):
+        from scipy.spatial import cKDTree
+        self.data = np.asarray(data, dtype=float)
+        self.n, self.m = np.shape(self.data)
+        self.leafsize = int(leafsize)
+        if self.leafsize < 1:
+            raise ValueError("leafsize must be at least 1")
+
+        # Only non-masked points are indexed; self.indices maps from tree indices back to those in data
+        if mask is not None:
+            self.indices = np.flatnonzero(~np.broadcast_to(np.asarray(mask, dtype=bool), (self.n,)))
+        else:
+            self.indices = np.arange(self.n)
+        self.points = self.data[self.indices]
+        self.tree = cKDTree(lat_lon_to_unit_vectors(self.points), leafsize=self.leafsize)
+
+    def _search_chord(self, r):
+        return distance_to_chord(r) * (1.0 + self.chord_tolerance)
+
+    @staticmethod
+    def _exact_neighbours(query_points, candidates, candidate_points, candidate_indices, r):
+        """Removes candidate neighbours which are further than r along the Earth's surface from their query point.
+        :param query_points: array of query points, each as array of latitude, longitude in degrees
+        :param candidates: list (one per query point) of lists of candidate indices into candidate_points
+        :param candidate_points: array of candidate points, each as array of latitude, longitude in degrees
+        :param candidate_indices: array mapping candidate indices onto the indices to return
+        :param r: maximum distance in kilometres
+        :return: list (one per query point) of sorted lists of indices of neighbours
+        """
+        if len(candidates) == 0:
+            return []
+        counts = np.fromiter((len(c) for c in candidates), dtype=np.intp, count=len(candidates))
+        flat = np.fromiter(itertools.chain.from_iterable(candidates), dtype=np.intp, count=counts.sum())
+        owners = np.repeat(np.arange(len(candidates)), counts)
+        if flat.size:
+            keep = haversine(candidate_points[flat], query_points[owners]) <= r
+            flat, owners = flat[keep], owners[keep]
+        order = np.lexsort((flat, owners))
+        neighbours = candidate_indices[flat[order]]
+        splits = np.cumsum(np.bincount(owners, minlength=len(candidates)))[:-1]
+        return [n.tolist() for n in np.split(neighbours, splits)]
+
+    def query(self, x, k=1, eps=0, p=2, distance_upper_bound=np.inf):
+        """
+        Query the tree for nearest neighbours
+
+        :param x: array_like, last dimension self.m
+            An array of points to query, each as latitude, longitude in degrees.
+        :param k: integer
+            The number of nearest neighbors to return.
+        :param eps: nonnegative float
+            Return approximate nearest neighbors.
+        :param p: float (NOT USED)
+        :param distance_upper_bound: nonnegative float
+            Return only neighbors within this distance (in kilometres).
+
+        :returns :
+            d : array of floats
+                The distances in kilometres to the nearest neighbors. Missing neighbors are indicated with infinite
+                distances.
+            i : array of integers
+                The locations of the neighbors in self.data. Missing neighbors are indicated with self.n.
+        """
+        x = np.asarray(x, dtype=float)
+        if np.shape(x)[-1] != self.m:
+            raise ValueError("x must consist of vectors of length %d but has shape %s" % (self.m, np.shape(x)))
+        chord_upper_bound = np.inf if distance_upper_bound == np.inf else self._search_chord(distance_upper_bound)
+        if k == 1:
+            return self._query_nearest(x, eps, distance_upper_bound, chord_upper_bound)
+        chords, tree_indices = self.tree.query(lat_lon_to_unit_vectors(x), k=k, eps=eps,
+                                               distance_upper_bound=chord_upper_bound)
+        tree_indices = np.asarray(tree_indices)
+        missing = tree_indices == self.tree.n
+        indices = np.where(missing, self.n, self.indices[np.where(missing, 0, tree_indices)])
+        distances = np.where(missing, np.inf, chord_to_distance(chords))
+        return distances, indices
+
+    def _query_nearest(self, x, eps, distance_upper_bound, chord_upper_bound):
+        """Finds the single nearest neighbour of each point. The few nearest candidates from the tree are compared
+        using the haversine distance, so that of several equidistant points the first is always chosen.
+        """
+        k = min(self.nearest_tie_candidates, self.tree.n) or 1
+        chords, tree_indices = self.tree.query(lat_lon_to_unit_vectors(x), k=k, eps=eps,
+                                               distance_upper_bound=chord_upper_bound)
+        tree_indices = np.asarray(tree_indices).reshape(np.shape(x)[:-1] + (k,))
+        missing = tree_indices == self.tree.n
+        indices = np.where(missing, self.n, self.indices[np.where(missing, 0, tree_indices)])
+        distances = haversine(self.data[np.where(missing, 0, indices)].reshape(-1, self.m),
+                              np.repeat(x.reshape(-1, self.m), k, axis=0)).reshape(indices.shape)
+        distances[missing | (distances >= distance_upper_bound)] = np.inf
+
+        nearest_distances = np.min(distances, axis=-1)
+        nearest_indices = np.min(np.where((distances == nearest_distances[..., np.newaxis]) &
+                                          np.isfinite(distances), indices, self.n), axis=-1)
+        if nearest_indices.ndim == 0:
+            return nearest_distances.item(), nearest_indices.item()
+        return nearest_distances, nearest_indices
+
+    def query_ball_point(self, x, r, p=2., eps=0):
+        """Find all points within distance r of point(s) x.
+
+        :param x: array_like, shape tuple + (self.m,)
+            The point or points to search for neighbors of, each as latitude, longitude in degrees.
+        :param r: positive float
+            The radius in kilometres of points to return.
+        :param p: float (NOT USED)
+        :param eps: nonnegative float, optional
+            Approximate search.
+
+        :returns: list or array of lists
+            If `x` is a single point, returns a sorted list of the indices of the neighbors of `x`. If `x` is an array
+            of points, returns an object array of shape tuple containing lists of neighbors.
+        """
+        x = np.asarray(x, dtype=float)
+        if x.shape[-1] != self.m:
+            raise ValueError("Searching for a %d-dimensional point in a "
+                             "%d-dimensional KDTree" % (x.shape[-1], self.m))
+        query_points = x.reshape(-1, self.m)
+        candidates = self.tree.query_ball_point(lat_lon_to_unit_vectors(query_points), self._search_chord(r),
+                                                eps=eps)
+        neighbours = self._exact_neighbours(query_points, candidates, self.points, self.indices, r)
+        if len(x.shape) == 1:
+            return neighbours[0]
+        result = np.empty(len(neighbours), dtype=object)
+        result[:] = neighbours
+        return result.reshape(x.shape[:-1])
+
+    def query_ball_tree(self, other, r, p=2., eps=0):
+        """Find all pairs of points whose distance is at most r
+
+        :param other: HaversineDistanceCKDTree instance
+            The tree containing points to search against.
+        :param r: float
+            The maximum distance in kilometres, has to be positive.
+        :param p: float (NOT USED)
+        :param eps: float, optional
+            Approximate search.
+
+        :returns:  list of lists
+            For each element ``self.data[i]`` of this tree, ``results[i]`` is a
+            sorted list of the indices of its neighbors in ``other.data``.
+        """
+        candidates = self.tree.query_ball_tree(other.tree, self._search_chord(r), eps=eps)
+        neighbours = self._exact_neighbours(self.points, candidates, other.points, other.indices, r)
+        results = [[] for i in range(self.n)]
+        for i, n in zip(self.indices, neighbours):
+            results[i] = n
+        return results
+
+    def count_neighbours(self, other, r):
+        """Estimate the number of pairs of points whose distance is at most r, without finding them. Pairs lying
+        within a rounding tolerance beyond r may be counted too.
+
+        :param other: HaversineDistanceCKDTree instance
+            The tree containing points to search against.
+        :param r: float
+            The maximum distance in kilometres, has to be positive.
+        :returns: int
+            The number of pairs.
+        """
+        return int(self.tree.count_neighbors(other.tree, self._search_chord(r)))
+
+
 def distance_matrix(x, y, p=2, threshold=1000000):
     """
     Compute the distance matrix.
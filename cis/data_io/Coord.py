@@ -1,7 +1,7 @@
 import numpy
 from cis.data_io.hyperpoint import HyperPoint
 from cis.data_io.hyperpoint_view import UngriddedHyperPointView
-from cis.data_io.ungridded_data import LazyData
+from cis.data_io.ungridded_data import LazyData, _copy_of_item
 from cis.utils import fix_longitude_range
 
 
@@ -44,7 +44,7 @@ class Coord(LazyData):
         #  data, and will lead to post-processing before slicing.
         # TODO: We could be cleverer and figure out the right slice across the various data managers to only read the
         #  right data from disk.
-        return Coord(self.data[keys].copy(), metadata=deepcopy(self.metadata), axis=self.axis)
+        return Coord(_copy_of_item(self.data, keys), metadata=deepcopy(self.metadata), axis=self.axis)
 
     @property
     def points(self):
@@ -137,6 +137,10 @@ class CoordList(list):
         if not all([isinstance(coord, Coord) for coord in self]):
             raise ValueError('All items in list_of_coords must be Coord instances.')
 
+        # The (flattened) points removed from the coordinates because they were missing values, so that data sharing
+        #  the coordinates can remove the same points
+        self.removed_points = None
+
     def append(self, other):
         """
         Safely add a new coordinate object to the list, this checks for a unique :attr:`axis` and :attr:`standard_name`.
@@ -125,16 +125,15 @@ def get_aeronet_file_variables(filename, version=None):
 
 
 def load_multiple_aeronet(filenames, variables=None):
-    from cis.utils import add_element_to_list_in_dict, concatenate
+    from functools import partial
+    from cis.utils import add_element_to_list_in_dict, concatenate, map_files
 
     adata = {}
 
-    for filename in filenames:
-        logging.debug("reading file: " + filename)
-
-        # reading in all variables into a dictionary:
-        # a_dict, key: variable name, value: list of masked arrays
-        a_dict = load_aeronet(filename, variables)
+    # reading in all variables into a dictionary:
+    # a_dict, key: variable name, value: list of masked arrays
+    # Parsing the files is mostly Python, so they are read by separate processes
+    for a_dict in map_files(partial(load_aeronet, variables=variables), filenames, processes=True):
         for var in list(a_dict.keys()):
             add_element_to_list_in_dict(adata, var, a_dict[var])
 
@@ -157,6 +156,7 @@ def load_aeronet(filename, variables=None):
     from numpy.ma import masked_invalid
     from pandas import read_csv, to_datetime
 
+    logging.debug("reading file: " + filename)
     version = get_aeronet_version(filename)
     ordered_vars = get_aeronet_file_variables(filename, version)
     if len(ordered_vars) == 0:
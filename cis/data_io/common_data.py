@@ -139,7 +139,7 @@ class CommonData(object):
 
     @abstractmethod
     def sampled_from(self, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                     var_name='', var_long_name='', var_units='', **kwargs):
+                     var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -151,13 +151,14 @@ class CommonData(object):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :param kwargs: Constraint arguments such as h_sep, a_sep, etc.
         :return CommonData: The collocated dataset
         """
         pass
 
     def collocated_onto(self, sample, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                        var_name='', var_long_name='', var_units='', **kwargs):
+                        var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel.
 
@@ -169,13 +170,14 @@ class CommonData(object):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :param kwargs: Constraint arguments such as h_sep, a_sep, etc.
         :return CommonData: The collocated dataset
         """
         return sample.sampled_from(self, how=how, kernel=kernel,
                                    missing_data_for_missing_sample=missing_data_for_missing_sample,
                                    fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
-                                   var_units=var_units, **kwargs)
+                                   var_units=var_units, workers=workers, **kwargs)
 
     def plot(self, *args, **kwargs):
         """
@@ -401,7 +403,7 @@ class CommonDataList(list):
         pass
 
     def collocated_onto(self, sample, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                        var_name='', var_long_name='', var_units='', **kwargs):
+                        var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel.
 
@@ -413,13 +415,14 @@ class CommonDataList(list):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :param kwargs: Constraint arguments such as h_sep, a_sep, etc.
         :return CommonData: The collocated dataset
         """
         return sample.sampled_from(self, how=how, kernel=kernel,
                                    missing_data_for_missing_sample=missing_data_for_missing_sample,
                                    fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
-                                   var_units=var_units, **kwargs)
+                                   var_units=var_units, workers=workers, **kwargs)
 
     def plot(self, *args, **kwargs):
         """
@@ -3,7 +3,7 @@ import logging
 
 from cis.data_io.gridded_data import GriddedDataList
 from cis.data_io.ungridded_data import UngriddedDataList
-from cis.data_io.products.AProduct import get_data, get_coordinates, get_variables
+from cis.data_io.products.AProduct import get_data_list, get_coordinates, get_variables
 from cis.utils import listify
 
 
@@ -11,13 +11,15 @@ def expand_filelist(filelist):
     """
     :param filelist: A single element, or list, or comma seperated string of filenames, wildcarded filenames or
      directories
-    :return: A flat list of files which exist - with no duplicates
+    :return: A flat list of files which exist - with no duplicates. File catalogs (see
+     :mod:`cis.data_io.file_catalog`) matched by wildcards or in directories are left out.
     :raises ValueError: if any of the files in the list do not exist.
     """
     import os
     import six
     from glob import glob
     from cis.utils import OrderedSet
+    from cis.data_io.file_catalog import CATALOG_FILENAME
 
     if isinstance(filelist, six.string_types):
         input_list = filelist.split(',')
@@ -31,13 +33,14 @@ def expand_filelist(filelist):
             filelist = glob(element)
             filelist.sort()
             for filename in filelist:
-                file_set.add(filename)
+                if os.path.basename(filename) != CATALOG_FILENAME:
+                    file_set.add(filename)
         elif os.path.isdir(element):
             filelist = os.listdir(element)
             filelist.sort()
             for a_file in filelist:
                 full_file = os.path.join(element, a_file)
-                if os.path.isfile(full_file):
+                if os.path.isfile(full_file) and a_file != CATALOG_FILENAME:
                     file_set.add(full_file)
         elif os.path.isfile(element):
             file_set.add(element)
@@ -52,19 +55,24 @@ class DataReader(object):
     Principally, manages operations between one or multiple variables, and gridded or un-gridded data.
     """
 
-    def __init__(self, get_data_func=get_data, get_coords_func=get_coordinates, get_variables_func=get_variables):
+    def __init__(self, get_data_func=None, get_coords_func=get_coordinates, get_variables_func=get_variables,
+                 get_data_list_func=get_data_list):
         """
         Construct a new DataReader object
 
-        :param get_data_func: Function to read data from file and return a CommonDataList
+        :param get_data_func: Function to read a variable from file and return a CommonData object. If given, this is
+         called for each variable in turn rather than using get_data_list_func
         :param get_coords_func: Function to read data from a file and return a CoordList
         :param get_variables_func: Function to read variables from a file and return a list of variable strings
+        :param get_data_list_func: Function to read several variables from file and return a list of CommonData
+         objects, which by default reads any coordinates the variables share only once
         """
         self._get_data_func = get_data_func
         self._get_coords_func = get_coords_func
         self._get_vars_func = get_variables_func
+        self._get_data_list_func = get_data_list_func
 
-    def read_data_list(self, filenames, variables, product=None, aliases=None):
+    def read_data_list(self, filenames, variables, product=None, aliases=None, read_region=None):
         """
         Read multiple data objects. Files can be either gridded or ungridded but not a mix of both.
 
@@ -75,6 +83,9 @@ class DataReader(object):
         :param str product: Name of data product to use (optional)
         :param aliases: List of variable aliases to put on each variables
          data object as an alternative means of identifying them. (Optional)
+        :param dict read_region: A hint of the [minimum, maximum] time (in CIS standard time), latitude and longitude of
+         the data which will be used, so that products which support it only read the part of each variable covering
+         it. Data outside of the region may still be returned. (Optional)
         :return:  A list of the data read out (either a GriddedDataList or UngriddedDataList depending on the
          type of data contained in the files)
         """
@@ -85,9 +96,14 @@ class DataReader(object):
 
         variables = self._expand_wildcards(variables, filenames, product)
 
+        if self._get_data_func is not None:
+            all_var_data = [self._get_data_func(filenames, variable, product, read_region=read_region)
+                            for variable in variables]
+        else:
+            all_var_data = self._get_data_list_func(filenames, variables, product, read_region=read_region)
+
         data_list = None
-        for idx, variable in enumerate(variables):
-            var_data = self._get_data_func(filenames, variable, product)
+        for idx, var_data in enumerate(all_var_data):
             var_data.filenames = filenames
             if aliases:
                 try:
@@ -153,7 +169,7 @@ class DataReader(object):
             data_list.extend(self.read_single_datagroup(datagroup))
         return data_list
 
-    def read_single_datagroup(self, datagroup):
+    def read_single_datagroup(self, datagroup, read_region=None):
         """
         Read data from a set of datagroups
 
@@ -172,11 +188,13 @@ class DataReader(object):
                    'variables': ['variable1', 'variable2'],
                    'product' : 'Aerosol_CCI_L2'}
 
+        :param dict read_region: An optional hint of the region of the data which will be used (see
+         :meth:`read_data_list`)
         :return CommonDataList: Either a GriddedDataLise or an UngriddedDataList
         """
         aliases = datagroup.get('aliases', None)
         data = self.read_data_list(datagroup['filenames'], datagroup['variables'],
-                                   datagroup.get('product', None), aliases)
+                                   datagroup.get('product', None), aliases, read_region)
         return data
 
     def read_coordinates(self, filenames, product=None):
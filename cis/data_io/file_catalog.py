@@ -0,0 +1,306 @@
+"""
+A catalog of the extents of data files, which is used to skip files which can't contribute to a command before reading
+them.
+
+The catalog is a small JSON file (``cis_index.json``) written alongside the files it describes, holding for each file
+its product, variables, time range (in CIS standard time) and latitude and longitude bounding box, together with the
+size and modification time of the file when it was indexed. Files which aren't in the catalog, or which have changed
+since they were indexed, are never skipped.
+"""
+import json
+import logging
+import os
+
+import numpy as np
+
+CATALOG_FILENAME = 'cis_index.json'
+CATALOG_VERSION = 1
+
+EXTENT_COORDS = ['time', 'latitude', 'longitude']
+
+_coord_aliases = {'t': 'time', 'time': 'time',
+                  'y': 'latitude', 'lat': 'latitude', 'latitude': 'latitude',
+                  'x': 'longitude', 'lon': 'longitude', 'longitude': 'longitude'}
+
+
+def _coord_range(data, standard_name):
+    """
+    Get the minimum and maximum of a coordinate, including any cell bounds, with times in CIS standard time.
+
+    :param CommonData data: The data (or coordinates) to get the range of
+    :param str standard_name: The standard name of the coordinate
+    :return: A [minimum, maximum] list, or None if there is no such coordinate or no valid values
+    """
+    from cf_units import Unit
+    from cis.time_util import convert_time_since_to_std_time
+
+    coords = data.coords(standard_name=standard_name)
+    if len(coords) == 0:
+        return None
+    coord = coords[0]
+
+    bounds = coord.bounds if getattr(coord, 'has_bounds', lambda: False)() else None
+    values = np.ma.masked_invalid(coord.points if bounds is None else bounds).compressed()
+    if values.size == 0:
+        return None
+    extent = np.array([values.min(), values.max()], dtype=float)
+
+    if standard_name == 'time':
+        # Ungridded times are converted to standard time when they are read, gridded ones keep the units of the file
+        try:
+            units = coord.units if isinstance(coord.units, Unit) else Unit(coord.units)
+        except ValueError:
+            units = None
+        if units is not None and units.is_time_reference():
+            try:
+                extent = convert_time_since_to_std_time(extent, units)
+            except (ValueError, TypeError):
+                # For example a 360 day calendar, which can't be compared with standard times
+                return None
+    return [float(extent[0]), float(extent[1])]
+
+
+def get_extent(data):
+    """
+    Get the time range and latitude and longitude bounding box of some data, using only its coordinates.
+
+    :param CommonData data: The data (or coordinates) to get the extent of
+    :return dict: The [minimum, maximum] of each of the time, latitude and longitude coordinates the data has
+    """
+    extent = {}
+    for standard_name in EXTENT_COORDS:
+        coord_range = _coord_range(data, standard_name)
+        if coord_range is not None:
+            extent[standard_name] = coord_range
+    return extent
+
+
+def _file_stamp(filename):
+    stat = os.stat(filename)
+    return {'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def _index_file(filename, product=None):
+    """
+    Read the coordinates and variables of a single file and make its catalog entry.
+    """
+    from cis.data_io.products.AProduct import get_coordinates, get_variables, get_product_full_name
+
+    entry = _file_stamp(filename)
+    entry['product'] = get_product_full_name([filename], product).split('/')[1]
+    entry['variables'] = sorted(get_variables([filename], product))
+    entry.update(get_extent(get_coordinates([filename], product)))
+    return entry
+
+
+def _catalog_path(directory):
+    return os.path.join(directory, CATALOG_FILENAME)
+
+
+def read_catalog(directory):
+    """
+    Read the catalog of the files in a directory.
+
+    :param str directory: The directory holding the catalog
+    :return dict: The entry of each file, by file name (without the directory), which is empty if there is no catalog
+    """
+    try:
+        with open(_catalog_path(directory)) as catalog_file:
+            catalog = json.load(catalog_file)
+    except (IOError, OSError, ValueError):
+        return {}
+    if catalog.get('version') != CATALOG_VERSION:
+        return {}
+    return catalog.get('files', {})
+
+
+def write_catalog(directory, entries):
+    """
+    Add entries to the catalog of the files in a directory, replacing any existing entries for the same files.
+
+    :param str directory: The directory holding the catalog
+    :param dict entries: The entry of each file, by file name (without the directory)
+    """
+    files = read_catalog(directory)
+    files.update(entries)
+    path = _catalog_path(directory)
+    # Write to a temporary file first, so that the catalog is never left half written
+    temporary_path = path + '.tmp'
+    with open(temporary_path, 'w') as catalog_file:
+        json.dump({'version': CATALOG_VERSION, 'files': files}, catalog_file, sort_keys=True)
+    os.rename(temporary_path, path)
+
+
+def index_files(filenames, product=None):
+    """
+    Index the extents of files, writing (or updating) the catalog in each of their directories. The files are read
+    with :func:`cis.utils.map_files`, so many can be read at once, except for HDF4 files which are always read one at a
+    time.
+
+    :param list filenames: The files to index
+    :param str product: The product to read the files with, if none is given it is guessed from each file name
+    :return dict: The catalog entry of each file, by its full file name
+    """
+    from functools import partial
+    from cis.data_io.hdf import is_hdf4_file
+    from cis.utils import map_files
+
+    filenames = [f for f in filenames if os.path.basename(f) != CATALOG_FILENAME]
+    hdf4_filenames = [f for f in filenames if is_hdf4_file(f)]
+    other_filenames = [f for f in filenames if f not in hdf4_filenames]
+    entries = dict(zip(other_filenames, map_files(partial(_index_file, product=product), other_filenames)))
+    entries.update((f, _index_file(f, product)) for f in hdf4_filenames)
+
+    by_directory = {}
+    for filename, entry in entries.items():
+        directory, basename = os.path.split(os.path.abspath(filename))
+        by_directory.setdefault(directory, {})[basename] = entry
+    for directory, directory_entries in by_directory.items():
+        write_catalog(directory, directory_entries)
+        logging.info("Indexed {} files in {}".format(len(directory_entries), _catalog_path(directory)))
+    return entries
+
+
+def _ranges_overlap(file_range, limits, modulus=None):
+    """
+    Could a file with the given range of a coordinate hold any values between the limits? Longitudes are compared
+    modulo 360 degrees.
+    """
+    lower, upper = limits
+    if modulus is not None and file_range[1] - file_range[0] >= modulus:
+        return True
+    shifts = [-modulus, 0, modulus] if modulus is not None else [0]
+    return any(file_range[0] + shift <= upper and file_range[1] + shift >= lower for shift in shifts)
+
+
+def _entry_may_contribute(entry, extent):
+    for name, limits in extent.items():
+        if name in entry and not _ranges_overlap(entry[name], limits, 360 if name == 'longitude' else None):
+            return False
+    return True
+
+
+def prune_files(filenames, extent, product=None):
+    """
+    Remove the files which, according to their catalogs, have no values within an extent. Files which aren't in a
+    catalog, have changed since they were indexed or were indexed with a different product are kept. The first file is
+    kept if no others are, so that there is always some data to read (and give the output its metadata).
+
+    :param list filenames: The files to prune
+    :param dict extent: The [minimum, maximum] of any of the time (in CIS standard time), latitude and longitude
+     coordinates to keep
+    :param str product: The product the files will be read with, if any
+    :return list: The files which may have values within the extent, in their original order
+    """
+    if not extent:
+        return filenames
+
+    catalogs = {}
+    kept = []
+    for filename in filenames:
+        directory, basename = os.path.split(os.path.abspath(filename))
+        if directory not in catalogs:
+            catalogs[directory] = read_catalog(directory)
+        entry = catalogs[directory].get(basename)
+        if entry is None or (product is not None and entry.get('product') != product) or \
+                _file_stamp(filename) != {'size': entry.get('size'), 'mtime': entry.get('mtime')} or \
+                _entry_may_contribute(entry, extent):
+            kept.append(filename)
+
+    if len(kept) < len(filenames):
+        logging.info("Skipping {} of {} files which are outside of {}, according to their catalogs".format(
+            len(filenames) - len(kept), len(filenames), extent))
+    return kept or filenames[:1]
+
+
+def _to_std_time(value):
+    from datetime import datetime
+    from cis.time_util import convert_datetime_to_std_time
+    if isinstance(value, datetime):
+        return convert_datetime_to_std_time(value)
+    return None
+
+
+def get_subset_extent(limits):
+    """
+    Get the extent of the data kept by a subset.
+
+    :param dict limits: The subset limits, as given to :meth:`CommonData.subset`
+    :return dict: The [minimum, maximum] of any of the time (in CIS standard time), latitude and longitude coordinates
+     which are limited
+    """
+    from cis.time_util import PartialDateTime
+    extent = {}
+    for dim_name, limit in limits.items():
+        if dim_name == 'shape':
+            if not hasattr(limit, 'bounds'):
+                from shapely.wkt import loads
+                limit = loads(limit)
+            lon_min, lat_min, lon_max, lat_max = limit.bounds
+            extent['longitude'], extent['latitude'] = [lon_min, lon_max], [lat_min, lat_max]
+            continue
+
+        name = _coord_aliases.get(dim_name.lower())
+        if name is None:
+            continue
+        if all(hasattr(limit, att) for att in ('start', 'stop')):
+            limit = [limit.start, limit.stop]
+        elif isinstance(limit, PartialDateTime):
+            limit = [limit.min(), limit.max()]
+        elif len(limit) == 1 and isinstance(limit[0], PartialDateTime):
+            limit = [limit[0].min(), limit[0].max()]
+        if len(limit) != 2:
+            continue
+        if name == 'time':
+            limit = [_to_std_time(l) for l in limit]
+        if any(l is None for l in limit):
+            continue
+        extent[name] = [float(limit[0]), float(limit[1])]
+    return extent
+
+
+def get_aggregation_extent(grid):
+    """
+    Get the extent of the data which may fall within an aggregation grid. The grid is widened by a step at each end, so
+    that data in the outer cells is always kept.
+
+    :param dict grid: The grid slice of each dimension, as given to :meth:`UngriddedData.aggregate`
+    :return dict: The [minimum, maximum] of any of the time (in CIS standard time), latitude and longitude coordinates
+     covered by the grid
+    """
+    from datetime import timedelta
+    extent = {}
+    for dim_name, dim_grid in grid.items():
+        if not hasattr(dim_grid, 'start') or dim_grid.step is None:
+            continue
+        step = dim_grid.step
+        if isinstance(step, timedelta):
+            step = step.total_seconds() / (24 * 60 * 60)
+        dim_extent = get_subset_extent({dim_name: [dim_grid.start, dim_grid.stop]})
+        for name, (lower, upper) in dim_extent.items():
+            extent[name] = [lower - abs(step), upper + abs(step)]
+    return extent
+
+
+def get_collocation_extent(sample_data, t_sep=None):
+    """
+    Get the extent of the data which may be within the time separation of some sample points, when collocating with
+    the box collocator.
+
+    :param CommonData sample_data: The sample points
+    :param str t_sep: The time separation of the box, as given to the collocator
+    :return dict: The [minimum, maximum] time (in CIS standard time) of the data which may be within the box, or an
+     empty dictionary if there is no time separation (or sample times)
+    """
+    from cis.parse_datetime import parse_datetimestr_delta_to_float_days
+    if t_sep is None:
+        return {}
+    try:
+        t_sep = parse_datetimestr_delta_to_float_days(t_sep)
+    except ValueError:
+        # The collocator reports this
+        return {}
+    time_range = _coord_range(sample_data, 'time')
+    if time_range is None:
+        return {}
+    return {'time': [time_range[0] - t_sep, time_range[1] + t_sep]}
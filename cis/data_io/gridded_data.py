@@ -191,10 +191,13 @@ class GriddedData(iris.cube.Cube, CommonData):
         range_start <= longitude < range_start + 360
 
         The data array is rotated correspondingly around the dimension
-        corresponding to the longitude coordinate.
+        corresponding to the longitude coordinate. The rotation is lazy, so the data isn't copied until it is realised,
+        and only the parts of it which are read (e.g. the hyperslab needed for an interpolation) are ever rotated.
 
         :param range_start: starting value of required longitude range
         """
+        import dask.array as da
+        from cis.utils import searchsorted
         lon_coord = self.coords(standard_name="longitude")
         if len(lon_coord) == 0:
             return
@@ -202,8 +205,8 @@ class GriddedData(iris.cube.Cube, CommonData):
         lon_idx = self.dim_coords.index(lon_coord)
         # Check if there are bounds which we will need to wrap as well
         roll_bounds = (lon_coord.bounds is not None) and (lon_coord.bounds.size != 0)
-        idx1 = np.searchsorted(lon_coord.points, range_start)
-        idx2 = np.searchsorted(lon_coord.points, range_start + 360.)
+        idx1 = searchsorted(lon_coord.points, range_start)
+        idx2 = searchsorted(lon_coord.points, range_start + 360.)
         shift = 0
         new_lon_points = None
         new_lon_bounds = None
@@ -242,11 +245,12 @@ class GriddedData(iris.cube.Cube, CommonData):
                 if lon_idx in dims:
                     # Now roll the axis of the auxiliary coordinate which is associated with the longitude data
                     # dimension: dims.index(lon_idx)
-                    new_points = np.roll(aux_coord.points, shift, dims.index(lon_idx))
-                    aux_coord.points = new_points
-            # Now roll the data itself
-            new_data = np.roll(self.data, shift, lon_idx)
-            self.data = new_data
+                    if aux_coord.has_lazy_points():
+                        aux_coord.points = da.roll(aux_coord.lazy_points(), shift, dims.index(lon_idx))
+                    else:
+                        aux_coord.points = np.roll(aux_coord.points, shift, dims.index(lon_idx))
+            # Now roll the data itself, lazily
+            self.data = da.roll(self.lazy_data(), shift, lon_idx)
             # Put the new coordinates back in their relevant places
             self.dim_coords[lon_idx].points = new_lon_points
             if roll_bounds:
@@ -334,8 +338,8 @@ class GriddedData(iris.cube.Cube, CommonData):
 
         A shape keyword can also be supplied as a WKT string or shapely object to subset in lat/lon by an arbitrary
         shape. In this case the lat/lon bounds are taken as the bounding box of the shape. Note that the shape of the
-        output remains the same, but a mask is applied to the data over the relevant coordinates. Only 2-dimensional
-        datasets are supported at this time.
+        output remains the same, but a mask is applied to the data over the relevant coordinates (and broadcast over
+        any others).
 
         :param kwargs: The constraints for each coordinate dimension
         :return CommonData:
@@ -344,18 +348,19 @@ class GriddedData(iris.cube.Cube, CommonData):
         return subset(self, GriddedSubsetConstraint, **kwargs)
 
     def sampled_from(self, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                     var_name='', var_long_name='', var_units='', **kwargs):
+                     var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
         :param CommonData or CommonDataList data: The data to resample
-        :param str how: Collocation method (e.g. lin, nn, bin or box)
+        :param str how: Collocation method (e.g. lin, nn, area, bin or box)
         :param str or cis.collocation.col_framework.Kernel kernel:
         :param bool missing_data_for_missing_sample: Should missing values in sample data be ignored for collocation?
         :param float fill_value: Value to use for missing data
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :return CommonData: The collocated dataset
         """
         from cis.collocation import col_implementations as ci
@@ -378,18 +383,23 @@ class GriddedData(iris.cube.Cube, CommonData):
             col_cls = ci.GriddedCollocator
             con = None
             if kernel is not None:
-                raise ValueError("Cannot specify kernel when method is 'lin' or 'nn'")
+                raise ValueError("Cannot specify kernel when method is 'lin', 'nn' or 'area'")
 
             # Lin is the default for gridded -> gridded
             if how == '' or how == 'lin':
                 kernel = ci.gridded_gridded_li()
             elif how == 'nn':
                 kernel = ci.gridded_gridded_nn()
+            elif how == 'area':
+                kernel = ci.gridded_gridded_area()
             else:
                 raise ValueError("Invalid method specified for gridded -> gridded collocation: " + how)
         else:
             raise ValueError("Invalid argument, data must be either GriddedData or UngriddedData")
 
+        if workers > 1:
+            logging.warning("Collocation onto gridded sample points is performed in a single process, ignoring workers")
+
         col = col_cls(missing_data_for_missing_sample=missing_data_for_missing_sample, fill_value=fill_value,
                       var_name=var_name, var_long_name=var_long_name, var_units=var_units)
 
@@ -3,6 +3,25 @@ import cis.utils as utils
 import logging
 
 
+#: The signature at the start of every HDF4 file
+HDF4_SIGNATURE = b'\x0e\x03\x13\x01'
+
+
+def is_hdf4_file(filename):
+    """
+    Check whether a file is an HDF4 file. The HDF4 library can't be built thread-safe, so these files are always read
+    one at a time, whatever the number of read workers.
+
+    :param str filename: The file to check
+    :return bool: True if the file starts with the HDF4 signature
+    """
+    try:
+        with open(filename, 'rb') as f:
+            return f.read(len(HDF4_SIGNATURE)) == HDF4_SIGNATURE
+    except (IOError, OSError):
+        return False
+
+
 def get_hdf4_file_variables(filename, data_type=None):
     """
     Get all variables from a file containing ungridded data.
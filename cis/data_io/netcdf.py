@@ -144,15 +144,14 @@ def read_many_files_individually(filenames, usr_variables):
     :return: A dictionary of lists of variable instances constructed from all of the input files with the fully
       qualified variable name as the key
     """
-    from cis.utils import add_element_to_list_in_dict
+    from functools import partial
+    from cis.utils import add_element_to_list_in_dict, map_files
 
     usr_variables = listify(usr_variables)
 
     var_data = {}
 
-    for filename in filenames:
-
-        var_dict = read(filename, usr_variables)
+    for var_dict in map_files(partial(read, usr_variables=usr_variables), filenames):
         for var in list(var_dict.keys()):
             add_element_to_list_in_dict(var_data, var, var_dict[var])
 
@@ -195,6 +194,35 @@ def read(filename, usr_variables):
     return data
 
 
+class VariableHyperslab(object):
+    """
+    A NetCDF Variable of which only a hyperslab is read. This can be used in place of the Variable (e.g. as the data
+    manager of lazily read data) so that :func:`get_data` reads only that part of it from the file.
+    """
+
+    def __init__(self, variable, index):
+        """
+        :param variable: The NetCDF Variable instance
+        :param tuple index: The slices of the hyperslab along the first (or all) dimensions of the variable
+        """
+        self._variable = variable
+        self._index = tuple(index)
+
+    def __getattr__(self, name):
+        # Everything apart from the shape and the data, such as the attributes, comes from the Variable
+        if name.startswith('__') or name in ('_variable', '_index'):
+            raise AttributeError(name)
+        return getattr(self._variable, name)
+
+    @property
+    def shape(self):
+        shape = self._variable.shape
+        return tuple(len(range(*s.indices(n))) for s, n in zip(self._index, shape)) + shape[len(self._index):]
+
+    def __getitem__(self, item):
+        return self._variable[self._index][item]
+
+
 def get_metadata(var):
     """
     Retrieves all metadata
@@ -254,7 +282,7 @@ def get_data(var):
     """
     Reads raw data from a NetCDF.Variable instance. Also applies CF-compliant valid max, min and ranges.
 
-    :param var: The specific Variable instance to read
+    :param var: The specific Variable (or :class:`VariableHyperslab`) instance to read
     :return:  A numpy maskedarray. Missing values are False in the mask.
     """
     import numpy as np
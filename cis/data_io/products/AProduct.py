@@ -21,6 +21,12 @@ class AProduct(object):
     # Contains a list of valid spatiotemporal variable names
     valid_dimensions = None
 
+    # An optional hint of the region of the data which will be used, as a dictionary of the [minimum, maximum] of any
+    #  of the time (in CIS standard time), latitude and longitude. Products may use it to read only the part of each
+    #  variable which covers the region (see :meth:`_get_read_region_slice`), but must still return all of the data
+    #  within it.
+    read_region = None
+
     @abstractmethod
     def create_data_object(self, filenames, variable):
         """
@@ -34,6 +40,70 @@ class AProduct(object):
         :raise InvalidVariableError: Variable not present in file
         """
 
+    def create_data_objects(self, filenames, variables):
+        """
+        Create and return :class:`.CommonData` objects for several variables from the same files. By default this calls
+        :meth:`create_data_object` for each variable using this product instance, so that coordinates shared by the
+        variables can be read only once (see :meth:`_get_shared_coords`).
+
+        :param list filenames: List of filenames of files to read
+        :param list variables: Variables to read from the files
+        :return: A list of :class:`.CommonData` objects, one for each variable
+
+        :raise FileIOError: Unable to read a file
+        :raise InvalidVariableError: Variable not present in file
+        """
+        return [self.create_data_object(filenames, variable) for variable in variables]
+
+    def _get_shared_coords(self, key, create_coords):
+        """
+        Get the coordinates shared by all of the variables this product instance reads with the same key, creating
+        them only the first time. The same coordinate objects (not copies) are returned each time.
+
+        :param key: A hashable key identifying the coordinates, e.g. the filenames and any options they are read with
+        :param callable create_coords: A function (of no arguments) to create the coordinates
+        :return: The coordinates
+        """
+        shared_coords = self.__dict__.setdefault('_shared_coords', {})
+        if key not in shared_coords:
+            shared_coords[key] = create_coords()
+        return shared_coords[key]
+
+    def _get_read_region_slice(self, points, margin=0):
+        """
+        Get the slice of a dimension which covers the points of its coordinates within the :attr:`read_region`.
+        Longitudes are compared modulo 360 degrees. If no points are within the region the first is kept, so that the
+        data read is never empty.
+
+        :param dict points: The points of one or more coordinates along the dimension, by standard name (with times in
+         CIS standard time)
+        :param int margin: The number of extra points to include at each end, e.g. so that cells whose bounds overlap
+         the region or the points either side of it for interpolation are kept
+        :return slice: The slice of the dimension to read, which is the whole dimension if there is no read region
+        """
+        import numpy as np
+        if not self.read_region:
+            return slice(None)
+
+        inside = None
+        for name, limits in self.read_region.items():
+            if name not in points:
+                continue
+            coord_points = np.ma.filled(np.ma.masked_invalid(points[name]).astype(float), np.nan)
+            lower, upper = limits
+            if name == 'longitude':
+                within = ((coord_points - lower) % 360 <= upper - lower) if upper - lower < 360 else \
+                    np.isfinite(coord_points)
+            else:
+                within = (coord_points >= lower) & (coord_points <= upper)
+            inside = within if inside is None else inside & within
+        if inside is None:
+            return slice(None)
+
+        indices = np.flatnonzero(inside)
+        first, last = (indices[0], indices[-1]) if indices.size else (0, 0)
+        return slice(max(first - margin, 0), min(last + 1 + margin, inside.size))
+
     @abstractmethod
     def create_coords(self, filenames):
         """
@@ -180,7 +250,13 @@ def __get_class(filename, product=None):
     raise ClassNotFoundError(error_message)
 
 
-def get_data(filenames, variable, product=None):
+def _create_product(product_cls, read_region=None):
+    product = product_cls()
+    product.read_region = read_region
+    return product
+
+
+def get_data(filenames, variable, product=None, read_region=None):
     """
     Top level routine for calling the correct product's :meth:`create_data_object` routine.
 
@@ -188,13 +264,15 @@ def get_data(filenames, variable, product=None):
     :param str variable: The variable to create the :class:`.CommonData` object from
     :param str product: The product to read data with - this should be a string which matches the name of one of the
      subclasses of :class:`.AProduct`. If none is supplied it is guessed from the filename signature.
+    :param dict read_region: An optional hint of the region of the data which will be used (see
+     :attr:`AProduct.read_region`)
     :return: A :class:`.CommonData` variable
     """
     product_cls = __get_class(filenames[0], product)
 
     logging.info("Retrieving data using product " + product_cls.__name__ + "...")
     try:
-        data = product_cls().create_data_object(filenames, variable)
+        data = _create_product(product_cls, read_region).create_data_object(filenames, variable)
         return data
     except Exception as e:
         logging.debug("Error in product plugin %s:\n%s" % (product_cls.__name__, traceback.format_exc()))
@@ -203,6 +281,31 @@ def get_data(filenames, variable, product=None):
                                      % (product_cls.__name__, type(e).__name__, e.args[0]), e)
 
 
+def get_data_list(filenames, variables, product=None, read_region=None):
+    """
+    Top level routine for calling the correct product's :meth:`create_data_objects` routine, which reads any coordinates
+    the variables share only once.
+
+    :param list filenames: A list of filenames to read data from
+    :param list variables: The variables to create the :class:`.CommonData` objects from
+    :param str product: The product to read data with - this should be a string which matches the name of one of the
+     subclasses of :class:`.AProduct`. If none is supplied it is guessed from the filename signature.
+    :param dict read_region: An optional hint of the region of the data which will be used (see
+     :attr:`AProduct.read_region`)
+    :return: A list of :class:`.CommonData` variables
+    """
+    product_cls = __get_class(filenames[0], product)
+
+    logging.info("Retrieving data using product " + product_cls.__name__ + "...")
+    try:
+        return _create_product(product_cls, read_region).create_data_objects(filenames, variables)
+    except Exception as e:
+        logging.debug("Error in product plugin %s:\n%s" % (product_cls.__name__, traceback.format_exc()))
+        raise ProductPluginException("An error occurred retrieving data using the product %s. Check that this "
+                                     "is the correct product plugin for your chosen data. Exception was %s: %s."
+                                     % (product_cls.__name__, type(e).__name__, e.args[0]), e)
+
+
 def get_coordinates(filenames, product=None):
     """
     Top level routine for calling the correct product's :meth:`create_coords` routine.
@@ -49,7 +49,7 @@ class CCI_L2(object):
     def create_data_object(self, filenames, variable):
         from cis.data_io.netcdf import get_metadata, read_many_files_individually
 
-        coords = self._create_coord_list(filenames)
+        coords = self._get_shared_coords(tuple(filenames), lambda: self._create_coord_list(filenames))
         var = read_many_files_individually(filenames, [variable])
         metadata = get_metadata(var[variable][0])
 
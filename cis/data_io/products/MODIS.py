@@ -126,7 +126,7 @@ class MODIS_L3(AProduct):
         from iris.cube import Cube, CubeList
         from iris.coords import DimCoord, AuxCoord
         from cis.time_util import calculate_mid_time, cis_standard_time_unit
-        from cis.data_io.hdf_sd import get_metadata
+        from cis.data_io.hdf_sd import get_metadata, HDF_SDS
         from cf_units import Unit
 
         variables = ['XDim', 'YDim', variable]
@@ -137,8 +137,13 @@ class MODIS_L3(AProduct):
         for f in filenames:
             sdata, vdata = _read_hdf4(f, variables)
 
-            lat_coord = DimCoord(_get_MODIS_SDS_data(sdata['YDim']), standard_name='latitude', units='degrees')
-            lon_coord = DimCoord(_get_MODIS_SDS_data(sdata['XDim']), standard_name='longitude', units='degrees')
+            # Only read the part of the grid covering the read region (if any), with an extra cell at each edge
+            lat_points, lon_points = _get_MODIS_SDS_data(sdata['YDim']), _get_MODIS_SDS_data(sdata['XDim'])
+            lat_slice = self._get_read_region_slice({'latitude': lat_points}, margin=1)
+            lon_slice = self._get_read_region_slice({'longitude': lon_points}, margin=1)
+
+            lat_coord = DimCoord(lat_points[lat_slice], standard_name='latitude', units='degrees')
+            lon_coord = DimCoord(lon_points[lon_slice], standard_name='longitude', units='degrees')
 
             # create time coordinate using the midpoint of the time delta between the start date and the end date
             start_datetime = self._get_start_date(f)
@@ -157,7 +162,13 @@ class MODIS_L3(AProduct):
                 logging.warning("Unable to parse units '{}' in {} for {}.".format(metadata.units, f, variable))
                 units = None
 
-            cube = Cube(_get_MODIS_SDS_data(sdata[variable]),
+            if lat_slice != slice(None) or lon_slice != slice(None):
+                lat_start, lat_end, _ = lat_slice.indices(lat_points.size)
+                lon_start, lon_end, _ = lon_slice.indices(lon_points.size)
+                var = HDF_SDS(f, variable, start=(lat_start, lon_start),
+                              count=(lat_end - lat_start, lon_end - lon_start))
+
+            cube = Cube(_get_MODIS_SDS_data(var),
                         dim_coords_and_dims=[(lon_coord, 1), (lat_coord, 0)],
                         aux_coords_and_dims=[(time_coord, None)],
                         var_name=metadata._name, long_name=metadata.long_name, units=units)
@@ -301,8 +312,11 @@ class MODIS_L2(AProduct):
         logging.debug("Creating data object for variable " + variable)
 
         # reading coordinates
-        # the variable here is needed to work out whether to apply interpolation to the lat/lon data or not
-        coords = self._create_coord_list(filenames, variable)
+        # the variable here is needed to work out whether to apply interpolation to the lat/lon data or not, so
+        #  coordinates are only shared between variables at the same scale
+        scale = self.__get_data_scale(filenames[0], variable)
+        coords = self._get_shared_coords((tuple(filenames), scale == "1km"),
+                                         lambda: self._create_coord_list(filenames, variable))
 
         # reading of variables
         sdata, vdata = hdf.read(filenames, variable)
@@ -382,7 +382,7 @@ class NCAR_NetCDF_RAF(AProduct):
         Open the file and find the correct variables to load in
         :param filenames: the filenames to load
         :param variable: an extra variable to load
-        :return: a list of load data and the variable selector used to load name it
+        :return: a list of load data, the variable selector used to load name it and the slice of each file to read
         """
 
         variable_selector = self._load_data_definition(filenames)
@@ -398,7 +398,50 @@ class NCAR_NetCDF_RAF(AProduct):
 
         data_variables = read_many_files_individually(filenames, variables_list)
 
-        return data_variables, variable_selector
+        read_slices = self._get_read_slices(data_variables, variable_selector)
+        data_variables = self._get_hyperslabs(data_variables, read_slices)
+
+        return data_variables, variable_selector, read_slices
+
+    def _get_read_slices(self, data_variables, variable_selector):
+        """
+        Find the part of the time dimension of each file which covers the read region, so that only that part of each
+        variable is read. All of the variables (coordinates and data) have the time dimension first.
+        :param data_variables: the data variables of the coordinates
+        :param variable_selector: the variable selector for the data
+        :return: a list of the slice of each file to read
+        """
+        points_counts = [np.product(var.shape) for var in data_variables[variable_selector.time_variable_name]]
+        if not self.read_region:
+            return [slice(None)] * len(points_counts)
+
+        time_coord = self._create_time_coord(variable_selector.time_stamp_info, variable_selector.time_variable_name,
+                                             data_variables)
+        lat_coord, lon_coord = self._create_lat_lon_coords(data_variables, variable_selector, points_counts)
+
+        file_starts = np.cumsum([0] + points_counts)
+        read_slices = []
+        for start, end in zip(file_starts[:-1], file_starts[1:]):
+            points = {'time': time_coord.points[start:end], 'latitude': lat_coord.points[start:end],
+                      'longitude': lon_coord.points[start:end]}
+            read_slices.append(self._get_read_region_slice(points))
+        logging.info("Reading {} of {} points within the read region".format(
+            sum(len(range(*s.indices(n))) for s, n in zip(read_slices, points_counts)), sum(points_counts)))
+        return read_slices
+
+    @staticmethod
+    def _get_hyperslabs(data_variables, read_slices):
+        """
+        Restrict the variables of each file to the part of the time dimension which is read
+        :param data_variables: a dictionary of the list of variables (one for each file) by name
+        :param read_slices: the slice of each file to read
+        :return: a dictionary of the list of variables or hyperslabs by name
+        """
+        from cis.data_io.netcdf import VariableHyperslab
+        if all(s == slice(None) for s in read_slices):
+            return data_variables
+        return {name: [VariableHyperslab(var, (s,)) for var, s in zip(variables, read_slices)]
+                for name, variables in data_variables.items()}
 
     def _create_coordinates_list(self, data_variables, variable_selector):
         """
@@ -417,16 +460,7 @@ class NCAR_NetCDF_RAF(AProduct):
         # Lat and Lon
         # Multiple points counts for multiple files
         points_count = [np.product(var.shape) for var in data_variables[variable_selector.time_variable_name]]
-        if variable_selector.station:
-            lat_coord = self._create_fixed_value_coord("Y", variable_selector.station_latitude, "degrees_north",
-                                                       points_count, "latitude")
-            lon_coord = self._create_fixed_value_coord("X", variable_selector.station_longitude, "degrees_east",
-                                                       points_count, "longitude")
-        else:
-            lat_coord = self._create_coord("Y", variable_selector.latitude_variable_name, data_variables, "latitude")
-            lon_coord = self._create_coord("X", variable_selector.longitude_variable_name, data_variables, "longitude")
-        coords.append(lat_coord)
-        coords.append(lon_coord)
+        coords.extend(self._create_lat_lon_coords(data_variables, variable_selector, points_count))
 
         # Altitude
         if variable_selector.altitude is None:
@@ -443,6 +477,24 @@ class NCAR_NetCDF_RAF(AProduct):
                 self._create_coord("P", variable_selector.pressure_variable_name, data_variables, "air_pressure"))
         return coords
 
+    def _create_lat_lon_coords(self, data_variables, variable_selector, points_count):
+        """
+        Create the latitude and longitude coordinates, which are fixed for a station
+        :param data_variables: the load data
+        :param variable_selector: the variable selector for the data
+        :param points_count: the number of points in each file
+        :return: the latitude and longitude coordinates
+        """
+        if variable_selector.station:
+            lat_coord = self._create_fixed_value_coord("Y", variable_selector.station_latitude, "degrees_north",
+                                                       points_count, "latitude")
+            lon_coord = self._create_fixed_value_coord("X", variable_selector.station_longitude, "degrees_east",
+                                                       points_count, "longitude")
+        else:
+            lat_coord = self._create_coord("Y", variable_selector.latitude_variable_name, data_variables, "latitude")
+            lon_coord = self._create_coord("X", variable_selector.longitude_variable_name, data_variables, "longitude")
+        return lat_coord, lon_coord
+
     @staticmethod
     def _add_aux_coordinate(dim_coords, filename, aux_coord_name, length):
         """
@@ -479,20 +531,25 @@ class NCAR_NetCDF_RAF(AProduct):
         :param variable: load a variable for the data
         :return: Coordinates
         """
-        data_variables, variable_selector = self._load_data(filenames, variable)
-
-        dim_coords = self._create_coordinates_list(data_variables, variable_selector)
-
         if variable is None:
-            return UngriddedCoordinates(dim_coords)
+            data_variables, variable_selector, _ = self._load_data(filenames, variable)
+            return UngriddedCoordinates(self._create_coordinates_list(data_variables, variable_selector))
+
+        # The coordinate variables are only read once for all of the variables read from the same files
+        data_variables, variable_selector, read_slices = self._get_shared_coords(
+            (tuple(filenames), 'variables'), lambda: self._load_data(filenames, None))
+        var = self._get_hyperslabs(read_many_files_individually(filenames, [variable]), read_slices)[variable]
+
+        aux_coord_name = variable_selector.find_auxiliary_coordinate(variable)
+        if aux_coord_name is not None:
+            # The coordinates are reshaped to add the auxiliary coordinate, so they can't be shared
+            dim_coords = self._create_coordinates_list(data_variables, variable_selector)
+            all_coords = self._add_aux_coordinate(dim_coords, filenames[0], aux_coord_name,
+                                                  dim_coords.get_coord(standard_name='time').data.size)
         else:
-            aux_coord_name = variable_selector.find_auxiliary_coordinate(variable)
-            if aux_coord_name is not None:
-                all_coords = self._add_aux_coordinate(dim_coords, filenames[0], aux_coord_name,
-                                                      dim_coords.get_coord(standard_name='time').data.size)
-            else:
-                all_coords = dim_coords
-            return UngriddedData(data_variables[variable], get_metadata(data_variables[variable][0]), all_coords)
+            all_coords = self._get_shared_coords(
+                (tuple(filenames), 'coords'), lambda: self._create_coordinates_list(data_variables, variable_selector))
+        return UngriddedData(var, get_metadata(var[0]), all_coords)
 
     def create_data_object(self, filenames, variable):
         """
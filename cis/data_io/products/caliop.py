@@ -296,11 +296,14 @@ class Caliop_L2(abstract_Caliop):
     def create_data_object(self, filenames, variable):
         logging.debug("Creating data object for variable " + variable)
 
-        # reading coordinates
+        # reading coordinates, which are shared with the other (column or profile) variables from the same files
         if variable.startswith('Column'):
-            coords = self._create_one_dimensional_coord_list(filenames, index_offset=1)
+            coords = self._get_shared_coords(
+                (tuple(filenames), 'Column'),
+                lambda: self._create_one_dimensional_coord_list(filenames, index_offset=1))
         else:
-            coords = self._create_coord_list(filenames, index_offset=1)
+            coords = self._get_shared_coords(
+                (tuple(filenames), 'Profile'), lambda: self._create_coord_list(filenames, index_offset=1))
 
         # reading of variables
         sdata, vdata = hdf.read(filenames, variable)
@@ -336,9 +339,8 @@ class Caliop_L1(abstract_Caliop):
     def create_data_object(self, filenames, variable):
         logging.debug("Creating data object for variable " + variable)
 
-        # reading coordinates
-        # the variable here is needed to work out whether to apply interpolation to the lat/lon data or not
-        coords = self._create_coord_list(filenames)
+        # reading coordinates, which are shared with the other variables from the same files
+        coords = self._get_shared_coords(tuple(filenames), lambda: self._create_coord_list(filenames))
 
         # reading of variables
         sdata, vdata = hdf.read(filenames, variable)
@@ -12,7 +12,7 @@ from cis.data_io.hdf_sd import get_data as hdf_sd_get_data
 from cis.data_io.common_data import CommonData, CommonDataList
 from cis.data_io.hyperpoint_view import UngriddedHyperPointView
 from cis.data_io.write_netcdf import add_data_to_file, write_coordinates
-from cis.utils import listify
+from cis.utils import listify, get_read_workers
 import cis.maths
 
 
@@ -166,7 +166,12 @@ static_mappings = {"SDS": hdf_sd_get_data,
                    "HDF_SDS": hdf_sd_get_data,
                    "VDS": hdf_vd_get_data,
                    "Variable": netcdf_get_data,
-                   "_Variable": netcdf_get_data}
+                   "_Variable": netcdf_get_data,
+                   "VariableHyperslab": netcdf_get_data}
+
+#: The data managers which may be read from many files at once. HDF4 files are always read one at a time, as the HDF4
+#: library can't be built thread-safe.
+parallel_data_managers = ["Variable", "_Variable", "VariableHyperslab"]
 
 
 class LazyData(object):
@@ -204,6 +209,8 @@ class LazyData(object):
             # Although the data can be a list or a single item it's useful to cast it
             #  to a list here to make accessing it consistent
             self._data_manager = listify(data)
+            # Remember how many files to read at once, as the data isn't read until it's needed
+            self._read_workers = 1
 
             if data_retrieval_callback is not None:
                 # Use the given data retrieval method
@@ -214,6 +221,8 @@ class LazyData(object):
 
                 # Set the retrieve_raw_data method to it's mapped function name
                 self.retrieve_raw_data = static_mappings[type(self._data_manager[0]).__name__]
+                if type(self._data_manager[0]).__name__ in parallel_data_managers:
+                    self._read_workers = get_read_workers()
             else:
                 raise InvalidDataTypeError
 
@@ -271,14 +280,16 @@ class LazyData(object):
         This is a getter for the data property. It caches the raw data if it has not already been read.
         Throws a MemoryError when reading for the first time if the data is too large.
         """
-        import numpy.ma as ma
+        from cis.utils import concatenate, map_files, read_workers
         if self._data is None:
             try:
-                # If we were given a list of data managers then we need to concatenate them now...
-                self._data = self.retrieve_raw_data(self._data_manager[0])
+                # If we were given a list of data managers then we need to concatenate them now, in one go so that
+                #  the data is only copied once
+                with read_workers(self._read_workers):
+                    self._data = concatenate(map_files(self.retrieve_raw_data, self._data_manager))
                 if len(self._data_manager) > 1:
-                    for manager in self._data_manager[1:]:
-                        self._data = ma.concatenate((self._data, self.retrieve_raw_data(manager)), axis=0)
+                    # Data concatenated from many files has always been masked
+                    self._data = numpy.ma.asarray(self._data)
                 self._post_process()
             except MemoryError:
                 raise MemoryError(
@@ -443,10 +454,11 @@ class UngriddedData(LazyData, CommonData):
         """
         from cis.data_io.Coord import CoordList, Coord
 
-        if isinstance(coords, list):
-            self._coords = CoordList(coords)
-        elif isinstance(coords, CoordList):
+        if isinstance(coords, CoordList):
+            # Use the same coordinates, which may be shared with other data read from the same files
             self._coords = coords
+        elif isinstance(coords, list):
+            self._coords = CoordList(coords)
         elif isinstance(coords, Coord):
             self._coords = CoordList([coords])
         else:
@@ -473,32 +485,45 @@ class UngriddedData(LazyData, CommonData):
         if self._data is None:
             data = self.data
         else:
-            # Remove any points with missing coordinate values:
-            combined_mask = numpy.zeros(self._data.shape, dtype=bool).flatten()
-            for coord in self._coords:
-                combined_mask |= numpy.ma.getmaskarray(coord.data).flatten()
-                if coord.data.dtype != 'object':
-                    combined_mask |= numpy.isnan(coord.data).flatten()
-                coord.update_shape()
-                coord.update_range()
-            if combined_mask.any():
-                n_points = numpy.count_nonzero(combined_mask)
-                logging.warning(
-                    "Identified {n_points} point(s) which were missing values for some or all coordinates - "
-                    "these points have been removed from the data.".format(n_points=n_points))
+            removed_points = getattr(self._coords, 'removed_points', None)
+            if removed_points is not None and removed_points.size == self._data.size != self._coords[0].data.size:
+                # These coordinates are shared with other data, which has already removed the points with missing
+                #  coordinate values from them, so just remove the same points from this data
+                self._remove_points(removed_points)
+            else:
+                # Remove any points with missing coordinate values:
+                combined_mask = numpy.zeros(self._data.shape, dtype=bool).flatten()
                 for coord in self._coords:
-                    coord.data = numpy.ma.masked_array(coord.data.flatten(), mask=combined_mask).compressed()
+                    combined_mask |= numpy.ma.getmaskarray(coord.data).flatten()
+                    if coord.data.dtype != 'object':
+                        combined_mask |= numpy.isnan(coord.data).flatten()
                     coord.update_shape()
                     coord.update_range()
-                if numpy.ma.is_masked(self._data):
-                    new_data_mask = numpy.ma.masked_array(self._data.mask.flatten(), mask=combined_mask).compressed()
-                    new_data = numpy.ma.masked_array(self._data.data.flatten(), mask=combined_mask).compressed()
-                    self._data = numpy.ma.masked_array(new_data, mask=new_data_mask)
-                else:
-                    self._data = numpy.ma.masked_array(self._data.flatten(), mask=combined_mask).compressed()
+                if combined_mask.any():
+                    n_points = numpy.count_nonzero(combined_mask)
+                    logging.warning(
+                        "Identified {n_points} point(s) which were missing values for some or all coordinates - "
+                        "these points have been removed from the data.".format(n_points=n_points))
+                    for coord in self._coords:
+                        coord.data = numpy.ma.masked_array(coord.data.flatten(), mask=combined_mask).compressed()
+                        coord.update_shape()
+                        coord.update_range()
+                    self._coords.removed_points = combined_mask
+                    self._remove_points(combined_mask)
             self.update_shape()
             self.update_range()
 
+    def _remove_points(self, mask):
+        """
+        Remove the points of the (flattened) data where the mask is true.
+        """
+        if numpy.ma.is_masked(self._data):
+            new_data_mask = numpy.ma.masked_array(self._data.mask.flatten(), mask=mask).compressed()
+            new_data = numpy.ma.masked_array(self._data.data.flatten(), mask=mask).compressed()
+            self._data = numpy.ma.masked_array(new_data, mask=new_data_mask)
+        else:
+            self._data = numpy.ma.masked_array(self._data.flatten(), mask=mask).compressed()
+
     def make_new_with_same_coordinates(self, data=None, var_name=None, standard_name=None,
                                        long_name=None, history=None, units=None, flatten=False):
         """
@@ -544,7 +569,7 @@ class UngriddedData(LazyData, CommonData):
         #  data, and will lead to post-processing before slicing.
         # TODO: We could be cleverer and figure out the right slice across the various data managers to only read the
         #  right data from disk.
-        return UngriddedData(data=self.data[keys].copy(), metadata=deepcopy(self.metadata), coords=new_coords)
+        return UngriddedData(data=_copy_of_item(self.data, keys), metadata=deepcopy(self.metadata), coords=new_coords)
 
     def copy(self, data=None):
         """
@@ -811,7 +836,7 @@ class UngriddedData(LazyData, CommonData):
         return agg
 
     def sampled_from(self, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                     var_name='', var_long_name='', var_units='', **kwargs):
+                     var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -823,12 +848,13 @@ class UngriddedData(LazyData, CommonData):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :return CommonData: The collocated dataset
         """
         return _ungridded_sampled_from(self, data, how=how, kernel=kernel,
                                        missing_data_for_missing_sample=missing_data_for_missing_sample,
                                        fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
-                                       var_units=var_units, **kwargs)
+                                       var_units=var_units, workers=workers, **kwargs)
 
     def _get_default_plot_type(self, lat_lon=False):
         if lat_lon:
@@ -1002,7 +1028,7 @@ class UngriddedCoordinates(CommonData):
         raise NotImplementedError("UngriddedCoordinates objects cannot be used as sources of data for collocation.")
 
     def sampled_from(self, data, how='', kernel=None, missing_data_for_missing_sample=False, fill_value=None,
-                     var_name='', var_long_name='', var_units='', **kwargs):
+                     var_name='', var_long_name='', var_units='', workers=1, **kwargs):
         """
         Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -1017,12 +1043,13 @@ class UngriddedCoordinates(CommonData):
         :param str var_name: The output variable name
         :param str var_long_name: The output variable's long name
         :param str var_units: The output variable's units
+        :param int workers: The number of processes to use when collocating onto ungridded sample points
         :return CommonData: The collocated dataset
         """
         return _ungridded_sampled_from(self, data, how=how, kernel=kernel,
                                        missing_data_for_missing_sample=missing_data_for_missing_sample,
                                        fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
-                                       var_units=var_units, **kwargs)
+                                       var_units=var_units, workers=workers, **kwargs)
 
     def _get_default_plot_type(self, lat_lon=False):
         raise NotImplementedError("UngriddedCoordinates have no default plot type")
@@ -1210,8 +1237,23 @@ def _to_flat_ndarray(data, copy=True):
     return ndarr
 
 
+def _copy_of_item(data, keys):
+    """
+    Index an array, copying the result only if it's a view onto the array (indexing with arrays of indices or booleans
+    already creates a copy).
+
+    :param ndarray data: The array to index
+    :param keys: The indices
+    :return: A copy of the indexed part of the array
+    """
+    item = data[keys]
+    if numpy.may_share_memory(item, data):
+        item = item.copy()
+    return item
+
+
 def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_missing_sample=True, fill_value=None,
-                            var_name='', var_long_name='', var_units='', **kwargs):
+                            var_name='', var_long_name='', var_units='', workers=1, **kwargs):
     """
     Collocate the CommonData object with another CommonData object using the specified collocator and kernel
 
@@ -1223,6 +1265,9 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
     :param str var_name: The output variable name
     :param str var_long_name: The output variable's long name
     :param str var_units: The output variable's units
+    :param int workers: The number of processes to use when collocating onto ungridded sample points
+    :param kwargs: Constraint arguments such as h_sep, a_sep, etc. for ungridded data, or 'weights' - a file to store
+     and reuse the interpolation weights in - for gridded data
     :return CommonData: The collocated dataset
     """
     from cis.collocation import col_implementations as ci
@@ -1232,7 +1277,8 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
     if isinstance(data, UngriddedData) or isinstance(data, UngriddedDataList):
         col = ci.GeneralUngriddedCollocator(fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
                                             var_units=var_units,
-                                            missing_data_for_missing_sample=missing_data_for_missing_sample)
+                                            missing_data_for_missing_sample=missing_data_for_missing_sample,
+                                            workers=workers)
 
         # Box is the default, and only option for ungridded -> ungridded collocation
         if how not in ['', 'box']:
@@ -1243,9 +1289,12 @@ def _ungridded_sampled_from(sample, data, how='', kernel=None, missing_data_for_
     elif isinstance(data, GriddedData) or isinstance(data, GriddedDataList):
         col = ci.GriddedUngriddedCollocator(fill_value=fill_value, var_name=var_name, var_long_name=var_long_name,
                                             var_units=var_units,
-                                            missing_data_for_missing_sample=missing_data_for_missing_sample)
+                                            missing_data_for_missing_sample=missing_data_for_missing_sample,
+                                            weights_file=kwargs.pop('weights', None))
         con = None
         kernel = 'lin'
+        if workers > 1:
+            logging.warning("Interpolation of gridded data is performed in a single process, ignoring workers")
     else:
         raise ValueError("Invalid argument, data must be either GriddedData or UngriddedData")
 
@@ -1262,13 +1311,98 @@ def _aggregate_ungridded(data, how, **kwargs):
     """
     from cis.aggregation.ungridded_aggregator import UngriddedAggregator
     from cis.collocation.col import get_kernel
+
+    kernel = get_kernel(how)
+    grid_spec = _get_aggregation_grid_spec(data, kwargs)
+
+    # We have to make the history before doing the aggregation as the grid dims get popped-off during the operation
+    history = _get_aggregation_history(getattr(data, "var_name", "Unknown"), getattr(data, "filenames", "Unknown"),
+                                       grid_spec, kernel)
+
+    aggregator = UngriddedAggregator(grid_spec)
+    data = aggregator.aggregate(data, kernel)
+
+    data.add_history(history)
+
+    return data
+
+
+def aggregate_chunks(chunks, how='', **kwargs):
+    """
+    Aggregate ungridded data which is supplied in chunks, for example one per file, based on the specified grids.
+    Only one chunk is held in memory at a time, so the memory needed depends on the size of the grid rather than the
+    amount of data. Only kernels which can be calculated from running statistics (mean, stddev, min, max, sum and
+    moments) can be used, and the start and end of each grid must be given.
+
+    :param chunks: An iterable of UngriddedData or UngriddedDataList with the same variables and coordinates
+    :param str how: The kernel to use in the aggregation
+    :param kwargs: The grid specifications for each coordinate dimension
+    :return GriddedDataList: The aggregated data
+    """
+    from itertools import chain
+    from cis.aggregation.ungridded_aggregator import UngriddedAggregator
+    from cis.collocation.col import get_kernel
+    from cis.exceptions import UserPrintableException
+
+    kernel = get_kernel(how)
+    chunks = iter(chunks)
+    try:
+        first_chunk = next(chunks)
+    except StopIteration:
+        raise UserPrintableException("There is no data to aggregate")
+    if not isinstance(first_chunk, (UngriddedData, UngriddedDataList)):
+        raise UserPrintableException("Only ungridded data can be aggregated in chunks")
+    # Coordinates without a grid are collapsed completely
+    kwargs = {dim_name: grid for dim_name, grid in kwargs.items() if grid is not None}
+    for grid in kwargs.values():
+        if getattr(grid, 'start', 0) is None or getattr(grid, 'stop', 0) is None:
+            raise UserPrintableException("The start and end of every grid must be given to aggregate data in chunks")
+
+    grid_spec = _get_aggregation_grid_spec(first_chunk, kwargs)
+    filenames = []
+
+    def _record_filenames(chunk_iterator):
+        for chunk in chunk_iterator:
+            filenames.extend(name for name in chunk.filenames if name not in filenames)
+            yield chunk
+
+    data = UngriddedAggregator(dict(grid_spec)).aggregate_chunks(
+        _record_filenames(chain([first_chunk], chunks)), kernel)
+
+    data.add_history(_get_aggregation_history(getattr(first_chunk, "var_name", "Unknown"), filenames, grid_spec,
+                                              kernel))
+
+    return data
+
+
+def partially_aggregate_chunks(chunks, **kwargs):
+    """
+    Aggregate ungridded data which is supplied in chunks into a partial aggregate, which holds the number, sum, sum of
+    squared deviations, minimum and maximum of the values in each cell. Partial aggregates of different data on the
+    same grid can be merged, and any of the kernels which :func:`aggregate_chunks` supports calculated from them, using
+    :func:`cis.aggregation.ungridded_aggregator.merge_partial_aggregates`.
+
+    :param chunks: An iterable of UngriddedData or UngriddedDataList with the same variables and coordinates
+    :param kwargs: The grid specifications for each coordinate dimension
+    :return GriddedDataList: The statistics of each variable
+    """
+    from cis.aggregation.ungridded_aggregator import PartialAggregateKernel
+    return aggregate_chunks(chunks, how=PartialAggregateKernel(), **kwargs)
+
+
+def _get_aggregation_grid_spec(data, grids):
+    """
+    Turn the grid specifications for aggregation into slices of numbers in the units of the data's coordinates,
+    filling in any missing start or end with the extent of the data
+    :param UngriddedData or UngriddedDataList data: The data to aggregate
+    :param dict grids: The grid specifications for each coordinate dimension
+    :return dict: The slice for each coordinate name
+    """
     from cis.time_util import PartialDateTime
     from datetime import datetime, timedelta
-    from cis import __version__
 
-    kernel = get_kernel(how)
     grid_spec = {}
-    for dim_name, grid in kwargs.items():
+    for dim_name, grid in grids.items():
         c = data._get_coord(dim_name)
         if all(hasattr(grid, att) for att in ('start', 'stop', 'step')):
             g = grid
@@ -1298,17 +1432,16 @@ def _aggregate_ungridded(data, how, **kwargs):
             grid_step = grid_step.total_seconds() / (24*60*60)
 
         grid_spec[c.name()] = slice(grid_start, grid_end, grid_step)
+    return grid_spec
 
-    # We have to make the history before doing the aggregation as the grid dims get popped-off during the operation
-    history = "Aggregated using CIS version " + __version__ + \
-              "\n variables: " + str(getattr(data, "var_name", "Unknown")) + \
-              "\n from files: " + str(getattr(data, "filenames", "Unknown")) + \
-              "\n using new grid: " + str(grid_spec) + \
-              "\n with kernel: " + str(kernel) + "."
-
-    aggregator = UngriddedAggregator(grid_spec)
-    data = aggregator.aggregate(data, kernel)
-
-    data.add_history(history)
 
-    return data
+def _get_aggregation_history(var_name, filenames, grid_spec, kernel):
+    """
+    Make the history entry for an aggregation
+    """
+    from cis import __version__
+    return "Aggregated using CIS version " + __version__ + \
+           "\n variables: " + str(var_name) + \
+           "\n from files: " + str(filenames) + \
+           "\n using new grid: " + str(grid_spec) + \
+           "\n with kernel: " + str(kernel) + "."
@@ -61,6 +61,11 @@ def initialise_top_parser():
     global_options.add_argument("--force-overwrite", action='store_true',
                                 help="Do not prompt when an output file already exists - always overwrite. This can "
                                      "also be set by setting the 'CIS_FORCE_OVERWRITE' environment variable to 'TRUE'")
+    global_options.add_argument("--read-workers", metavar="Number of files", type=int, default=None,
+                                help="The number of input files to read at once, which can be faster on parallel file "
+                                     "systems. This can also be set by setting the 'CIS_READ_WORKERS' environment "
+                                     "variable. Only netCDF and Aeronet files are read in parallel, HDF4 files are "
+                                     "always read one at a time. By default files are read one at a time.")
 
     parser = argparse.ArgumentParser("cis", parents=[global_options])
     parser.register('action', 'parsers', AliasedSubParsersAction)
@@ -83,6 +88,10 @@ def initialise_top_parser():
     collapse_parser = subparsers.add_parser("collapse", help="Collapse a gridded dataset over specified dimensions",
                                             parents=[global_options])
     add_collapse_parser_arguments(collapse_parser)
+    index_parser = subparsers.add_parser("index", help="Catalog the extents of files, so that files outside of the "
+                                                       "limits of a command can be skipped without reading them",
+                                         parents=[global_options])
+    add_index_parser_arguments(index_parser)
     subparsers.add_parser("version", help="Display the CIS version number")
     return parser
 
@@ -211,6 +220,9 @@ def add_col_parser_arguments(parser):
                         help="The filename of the output file containing the collocated data. The name specified will"
                              " be suffixed with \".nc\". For ungridded output, it will be prefixed with \"cis-\" and "
                              "so that cis can recognise it when using the file for further operations.")
+    parser.add_argument("--workers", metavar="Number of processes", default=1, type=int,
+                        help="The number of processes to use when collocating onto ungridded sample points. The sample"
+                             " points are split into chunks which are collocated in parallel.")
     return parser
 
 
@@ -219,12 +231,25 @@ def add_aggregate_parser_arguments(parser):
                         help="Variables to aggregate with filenames, and optional arguments seperated by colon(s). "
                              "Optional arguments are product and kernel, which are entered as keyword=value in a "
                              "comma separated list. Example: var:filename:product=MODIS_L3,kernel=mean")
-    parser.add_argument("aggregategrid", metavar="AggregateGrid",
+    parser.add_argument("aggregategrid", metavar="AggregateGrid", nargs="?",
                         help="Grid for new aggregation, e.g. t,x=[-180,90,5] would collapse time completely and "
                              "aggregate longitude onto a new grid, which would start at -180 and then proceed in 5 "
-                             "degree increments up to 90")
+                             "degree increments up to 90. Not used when merging partial aggregates.")
     parser.add_argument("-o", "--output", metavar="Output filename", default="out", nargs="?",
                         help="The filename of the output file")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Read and aggregate ungridded data one file at a time, so that the memory needed depends "
+                             "on the size of the grid rather than the amount of data. Only the mean, stddev, min, max, "
+                             "sum and moments kernels can be used, and the start and end of each grid must be given.")
+    parser.add_argument("--partial", action="store_true",
+                        help="Output a partial aggregate, holding the number, sum, sum of squared deviations, minimum "
+                             "and maximum of the values in each cell, rather than applying the kernel. The files are "
+                             "read one at a time, as with --streaming. Partial aggregates of different files on the "
+                             "same grid can be combined using --merge.")
+    parser.add_argument("--merge", action="store_true",
+                        help="Merge the partial aggregate files in the datagroup and apply the kernel to the result, "
+                             "or output the merged partial aggregate if --partial is also given. The grid is read "
+                             "from the partial aggregates so should not be given.")
     return parser
 
 
@@ -268,6 +293,13 @@ def add_stats_parser_arguments(parser):
                         help="The filename of the output file (if outputting to file")
 
 
+def add_index_parser_arguments(parser):
+    parser.add_argument("datagroups", metavar="DataGroups", nargs="+",
+                        help="Files to catalog, which needs to be entered in the format filename[:product=], with "
+                             "multiple datagroups separated by spaces.")
+    return parser
+
+
 def expand_file_list(filenames, parser):
     """
 
@@ -437,6 +469,20 @@ def get_eval_datagroups(datagroups, parser):
     return datagroups
 
 
+def get_index_datagroups(datagroups, parser):
+    """
+    :param datagroups:    A list of datagroups (possibly containing colons)
+    :param parser:       The parser used to report errors
+    :return: The parsed datagroups as a list of dictionaries
+    """
+    from collections import namedtuple
+
+    DatagroupOptions = namedtuple('DatagroupOptions', ["filenames", "product"])
+    datagroup_options = DatagroupOptions(expand_file_list, check_product)
+
+    return parse_colon_and_comma_separated_arguments(datagroups, parser, datagroup_options, compulsory_args=1)
+
+
 def get_aggregate_grid(aggregategrid, parser):
     """
     :param aggregategrid: List of aggregate grid specifications
@@ -912,13 +958,23 @@ def validate_col_args(arguments, parser):
     arguments.sampleproduct = arguments.samplegroup.get("product", None)
     arguments.datagroups = get_basic_datagroups(arguments.datagroups, parser)
     _validate_output_file(arguments, parser)
+    if arguments.workers < 1:
+        parser.error("The number of workers must be at least one")
 
     return arguments
 
 
 def validate_aggregate_args(arguments, parser):
     arguments.datagroups = get_aggregate_datagroups(arguments.datagroups, parser)
-    arguments.grid = get_aggregate_grid(arguments.aggregategrid, parser)
+    if arguments.merge:
+        if arguments.aggregategrid is not None:
+            parser.error("A grid can not be given when merging partial aggregates, the grid of the partial aggregates "
+                         "is used")
+        arguments.grid = None
+    elif arguments.aggregategrid is None:
+        parser.error("A grid must be given for aggregation")
+    else:
+        arguments.grid = get_aggregate_grid(arguments.aggregategrid, parser)
     _validate_output_file(arguments, parser)
     return arguments
 
@@ -958,6 +1014,11 @@ def validate_stats_args(arguments, parser):
     return arguments
 
 
+def validate_index_args(arguments, parser):
+    arguments.datagroups = get_index_datagroups(arguments.datagroups, parser)
+    return arguments
+
+
 def validate_version_args(arguments, parser):
     # no arguments accepted
     return arguments
@@ -971,6 +1032,7 @@ validators = {'plot': validate_plot_args,
               'subset': validate_subset_args,
               'eval': validate_eval_args,
               'stats': validate_stats_args,
+              'index': validate_index_args,
               'version': validate_version_args}
 
 aliases = {'col': 'collocate',
@@ -1001,6 +1063,9 @@ def parse_args(arguments=None):
     elif main_args.verbose == 2:
         logging.getLogger().handlers[0].setLevel(logging.DEBUG)
 
+    if getattr(main_args, 'read_workers', None) is not None and main_args.read_workers < 1:
+        parser.error("The number of read workers must be at least one")
+
     main_args = validators[main_args.command](main_args, parser)
 
     return main_args
@@ -132,14 +132,16 @@ class GriddedSubsetConstraint(SubsetConstraint):
                 return None
 
         if _shape is not None:
-            if data.ndim > 2:
-                raise NotImplementedError("Unable to perform shape subset for multidimensional gridded datasets")
-            mask = np.ones(data.shape, dtype=bool)
-            mask[np.unravel_index(_get_gridded_subset_region_indices(data, _shape), data.shape)] = False
-            if isinstance(data.data, np.ma.MaskedArray):
-                data.data.mask &= mask
-            else:
-                data.data = np.ma.masked_array(data.data, mask)
+            # Broadcast the (Y, X) mask of points outside the shape over any other dimensions
+            x_dim, = data.coord_dims(data.coord(axis='X'))
+            y_dim, = data.coord_dims(data.coord(axis='Y'))
+            mask = ~_get_gridded_subset_region_mask(data, _shape)
+            if x_dim < y_dim:
+                mask = mask.T
+            mask_shape = [1] * data.ndim
+            mask_shape[y_dim], mask_shape[x_dim] = data.shape[y_dim], data.shape[x_dim]
+            mask = np.broadcast_to(mask.reshape(mask_shape), data.shape)
+            data.data = np.ma.masked_array(np.ma.getdata(data.data), np.ma.getmaskarray(data.data) | mask)
         return gridded_data.make_from_cube(data)
 
     def _make_extract_and_intersection_constraints(self, data):
@@ -180,11 +182,13 @@ class UngriddedSubsetConstraint(SubsetConstraint):
     """
     def __init__(self, limits):
         super(UngriddedSubsetConstraint, self).__init__(limits)
-        self._shape_indices = None
-        self._combined_mask = None
+        self._shape = self._limits.pop('shape', None)
+        self._indices = None
+        self._longitude_ranges = None
 
     def constrain(self, data):
-        """Subsets the supplied data.
+        """Subsets the supplied data. The points to keep are found from the original coordinates and only those points
+        are copied from the data, so that the original is not altered.
 
         :param data: data to be subsetted
         :return: subsetted data
@@ -192,6 +196,7 @@ class UngriddedSubsetConstraint(SubsetConstraint):
         import numpy as np
         from datetime import datetime
         from cis.data_io.ungridded_data import UngriddedDataList
+        from cis.utils import fix_longitude_range
 
         if isinstance(data, list):
             # Calculating masks and indices will only take place on the first iteration,
@@ -201,53 +206,59 @@ class UngriddedSubsetConstraint(SubsetConstraint):
                 output.append(self.constrain(var))
             return output
 
-        _data = self._create_data_for_subset(data)
+        if self._indices is None:
+            self._longitude_ranges = self._get_longitude_ranges(data)
 
-        _shape = self._limits.pop('shape', None)
+            def get_points(coord):
+                points = coord.data
+                if coord.name() in self._longitude_ranges:
+                    points = fix_longitude_range(points, self._longitude_ranges[coord.name()])
+                return points
 
-        if self._combined_mask is None:
             # Create the combined mask across all limits
-            shape = _data.coords()[0].data.shape  # This assumes they are all the same shape
+            shape = data.coords()[0].data.shape  # This assumes they are all the same shape
             combined_mask = np.ones(shape, dtype=bool)
             for coord, limit in self._limits.items():
                 # Convert the points to datetimes if the limit is a datetime
                 if isinstance(limit.start, datetime):
-                    points = _data.coord(coord).units.num2date(_data.coord(coord).data)
+                    points = data.coord(coord).units.num2date(data.coord(coord).data)
                 else:
-                    points = _data.coord(coord).data
+                    points = get_points(data.coord(coord))
                 # Select any points which are <= to the stop limit AND >= to the start limit
-                mask = (np.less_equal(points, limit.stop) & np.greater_equal(points, limit.start))
-                combined_mask &= mask
-            self._combined_mask = combined_mask
-
-        _data = _data[self._combined_mask]
-
-        if _shape is not None:
-            if self._shape_indices is None:
-                self._shape_indices = _get_ungridded_subset_region_indices(_data, _shape)
-            _data = _data[np.unravel_index(self._shape_indices, _data.shape)]
-
-        if _data.size == 0:
-            _data = None
-
+                combined_mask &= np.less_equal(points, limit.stop) & np.greater_equal(points, limit.start)
+            indices = np.flatnonzero(combined_mask)
+
+            if self._shape is not None:
+                # Only the points within the limits (and so the bounding box of the shape) are tested
+                lons = get_points(data.lon).ravel()[indices]
+                lats = get_points(data.lat).ravel()[indices]
+                indices = indices[_get_indices_for_lat_lon_points(lons, lats, self._shape)]
+            self._indices = np.unravel_index(indices, shape)
+
+        if self._indices[0].size == 0:
+            return None
+
+        # Gather the selected points (which copies them) and then map the longitudes onto the requested domain
+        _data = data[self._indices]
+        for coord_name, range_start in self._longitude_ranges.items():
+            _data.coord(coord_name).set_longitude_range(range_start)
         return _data
 
-    def _create_data_for_subset(self, data):
+    def _get_longitude_ranges(self, data):
         """
-        Produce a copy of the data so that the original is not altered,
-        with longitudes mapped onto the right domain for the requested limits
+        Find the longitude coordinates which must be mapped onto a different domain to compare them with the
+        requested limits, and the start of the domain to map them onto.
+
         :param data: Data being subsetted
-        :return:
+        :return dict: The starts of the longitude ranges, keyed on the coordinate names
         """
         from cis.exceptions import CoordinateNotFoundError
-        # We need a copy with new data and coordinates
-        data = data.copy()
+        longitude_ranges = {}
         # Check for longitude coordinate in the limits
         for dim_name, limit in self._limits.items():
             try:
                 coord = data.coord(dim_name)
             except CoordinateNotFoundError:
-                # E.g. shape...
                 continue
             if coord.standard_name == 'longitude':
                 coord_min = coord.points.min()
@@ -262,34 +273,142 @@ class UngriddedSubsetConstraint(SubsetConstraint):
                     # Only convert the data if the limits are above 180:
                     if limits_above_180 and not limits_below_zero:
                         # Convert data from -180 -> 180 to 0 -> 360
-                        range_start = 0
-                        coord.set_longitude_range(range_start)
+                        longitude_ranges[coord.name()] = 0
                 elif data_above_180 and not data_below_zero:
                     # i.e. data is in the range 0 -> 360
                     if limits_below_zero and not limits_above_180:
                         # Convert data from 0 -> 360 to -180 -> 180
-                        range_start = -180
-                        coord.set_longitude_range(range_start)
-        return data
+                        longitude_ranges[coord.name()] = -180
+        return longitude_ranges
 
 
-def _get_indices_for_lat_lon_points(lats, lons, region):
-    from shapely.geometry import MultiPoint
+def _get_indices_for_lat_lon_points(x, y, region):
+    """
+    Find the (flat) indices of the points which lie within a region. Only the points within the bounding box of the
+    region are tested, against the prepared (spatially indexed) region. They are tested all at once using the
+    vectorized predicates of shapely 2 where they are available, or otherwise one by one.
+
+    :param x: The x (longitude) coordinates of the points
+    :param y: The y (latitude) coordinates of the points
+    :param region: The shapely geometry to find the points within
+    :return ndarray: The indices of the points which the region contains
+    """
+    x = np.asarray(x, dtype=float).ravel()
+    y = np.asarray(y, dtype=float).ravel()
+
+    min_x, min_y, max_x, max_y = region.bounds
+    candidates = np.flatnonzero((x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y))
+
+    try:
+        from shapely import contains_xy, prepare
+    except ImportError:
+        # Shapely < 2 doesn't have vectorized predicates
+        from shapely.geometry import Point
+        from shapely.prepared import prep
+        prepared_region = prep(region)
+        inside = np.array([prepared_region.contains(Point(x[i], y[i])) for i in candidates], dtype=bool)
+    else:
+        # Preparing the region builds a spatial index of its edges, which is much faster for detailed shapes
+        prepare(region)
+        inside = contains_xy(region, x[candidates], y[candidates])
+    return candidates[inside]
+
+
+def _get_gridded_subset_region_mask(gridded_data, region):
+    """
+    Find which points of the grid of some gridded data lie within a region. The mask is cached, keyed on the X and Y
+    coordinates and the region, so that it is only calculated once when subsetting many variables or files on the
+    same grid.
+
+    :param GriddedData gridded_data: The data whose grid to mask
+    :param region: The shapely geometry to find the grid points within
+    :return ndarray: Boolean array of shape (number of Y points, number of X points), true within the region
+    """
+    from cis.collocation.data_index import fingerprint, index_cache
+    # Using X and Y is a bit more general than lat and lon - the shapefiles needn't actually represent lat/lon
+    x = gridded_data.coord(axis='X').points
+    y = gridded_data.coord(axis='Y').points
 
-    lat_lon_points = np.vstack([lats, lons])
-    points = MultiPoint(lat_lon_points.T)
+    key = fingerprint('shape_mask', x, y, region.wkb)
+    cached = index_cache.get(key)
+    if cached is not None:
+        return cached['mask']
 
-    # Performance in this loop might be an issue, but I think it's essentially how GeoPandas does it. If I want to
-    #  improve it I might need to look at using something like rtree.
-    return [i for i, p in enumerate(points) if region.contains(p)]
+    mask = _rasterize_region(x, y, region)
+    index_cache.put(key, mask=mask)
+    return mask
 
 
-def _get_ungridded_subset_region_indices(ungridded_data, region):
-    # We have to use flatten rather than flat, GEOS creates a copy of the data if it's a view anyway.
-    return _get_indices_for_lat_lon_points(ungridded_data.lon.data.flatten(), ungridded_data.lat.data.flatten(), region)
+def _get_rings(region):
+    """
+    Get the coordinates of the exterior and interior rings of a (multi-)polygon, or None for any other geometry.
+    """
+    if region.geom_type == 'Polygon':
+        return [np.asarray(ring.coords)[:, :2] for ring in [region.exterior] + list(region.interiors)]
+    elif region.geom_type == 'MultiPolygon':
+        return [ring for polygon in region.geoms for ring in _get_rings(polygon)]
+    return None
 
 
-def _get_gridded_subset_region_indices(gridded_data, region):
-    # Using X and Y is a bit more general than lat and lon - the shapefiles needn't actually represent lat/lon
-    x, y = np.meshgrid(gridded_data.coord(axis='X').points, gridded_data.coord(axis='Y').points)
-    return _get_indices_for_lat_lon_points(x.flat, y.flat, region)
+def _rasterize_region(x, y, region):
+    """
+    Find which points of a grid lie within a region, scanline style: the crossings of every row of the grid by the
+    edges of the region are found and the points between alternate crossings are within the region. Points on (or
+    within rounding error of) an edge, or in a row through a vertex, are tested individually so that the result is
+    exactly that of region.contains.
+
+    :param ndarray x: The 1-D X coordinate of the grid
+    :param ndarray y: The 1-D Y coordinate of the grid
+    :param region: The shapely geometry to find the grid points within
+    :return ndarray: Boolean array of shape (len(y), len(x)), true within the region
+    """
+    rings = _get_rings(region)
+    if rings is None:
+        # Not a polygon, so test each point
+        grid_x, grid_y = np.meshgrid(x, y)
+        mask = np.zeros(grid_x.size, dtype=bool)
+        mask[_get_indices_for_lat_lon_points(grid_x.flat, grid_y.flat, region)] = True
+        return mask.reshape(grid_x.shape)
+
+    x_order, y_order = np.argsort(x), np.argsort(y)
+    sorted_x, sorted_y = x[x_order], y[y_order]
+    edges = np.concatenate([np.hstack([ring[:-1], ring[1:]]) for ring in rings])
+    x0, y0, x1, y1 = edges.T
+    edges = y0 != y1
+    x0, y0, x1, y1 = x0[edges], y0[edges], x1[edges], y1[edges]
+
+    # The (sorted) rows crossed by each edge, counting a row through a vertex as crossed by the edge above it
+    first_rows = np.searchsorted(sorted_y, np.minimum(y0, y1), 'left')
+    num_rows = np.searchsorted(sorted_y, np.maximum(y0, y1), 'left') - first_rows
+    edge_index = np.repeat(np.arange(x0.size), num_rows)
+    rows = np.arange(num_rows.sum()) - np.repeat(np.cumsum(num_rows) - num_rows - first_rows, num_rows)
+    row_y = sorted_y[rows]
+    slopes = ((x1 - x0) / (y1 - y0))[edge_index]
+    crossings = x0[edge_index] + (row_y - y0[edge_index]) * slopes
+    # A generous bound on the rounding error of each crossing, within which a point may be on either side of the edge
+    tolerances = 1e-10 * (np.abs(x0[edge_index]) + np.abs(x1 - x0)[edge_index] +
+                          (np.abs(row_y) + np.abs(y0[edge_index])) * np.abs(slopes))
+
+    # Toggle the points to the right of each crossing; those toggled an odd number of times are inside
+    columns = np.searchsorted(sorted_x, crossings, 'right')
+    toggles = np.zeros((sorted_y.size, sorted_x.size + 1), dtype=np.int64)
+    np.add.at(toggles, (rows, columns), 1)
+    inside = np.cumsum(toggles[:, :-1], axis=1) % 2 == 1
+
+    # Check the ambiguous points - those on (or within rounding error of) an edge, or in a row through a vertex. Only
+    # the points either side of each crossing can be that close to it.
+    ambiguous = np.zeros(inside.shape, dtype=bool)
+    for neighbours in (columns - 1, columns):
+        near_edge = (neighbours >= 0) & (neighbours < sorted_x.size)
+        near_edge[near_edge] = np.abs(sorted_x[neighbours[near_edge]] - crossings[near_edge]) <= tolerances[near_edge]
+        ambiguous[rows[near_edge], neighbours[near_edge]] = True
+    ambiguous[np.in1d(sorted_y, np.concatenate(rings)[:, 1]), :] = True
+    ambiguous_rows, ambiguous_columns = np.nonzero(ambiguous)
+    inside[ambiguous] = False
+    contained = _get_indices_for_lat_lon_points(sorted_x[ambiguous_columns], sorted_y[ambiguous_rows], region)
+    inside[ambiguous_rows[contained], ambiguous_columns[contained]] = True
+
+    # Put the rows and columns back in the order of the coordinates
+    mask = np.empty_like(inside)
+    mask[np.ix_(y_order, x_order)] = inside
+    return mask
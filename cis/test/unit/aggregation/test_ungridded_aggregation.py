@@ -458,3 +458,142 @@ class TestUngriddedListAggregation(TestCase):
         assert len(cube_out) == 2
         compare_masked_arrays(cube_out[0].data, result_0)
         compare_masked_arrays(cube_out[1].data, result_1)
+
+
+def _make_random_ungridded_data(seed, n=900, mean=1000.0, name='rain', points=slice(None)):
+    from cis.data_io.Coord import CoordList, Coord
+    from cis.data_io.ungridded_data import UngriddedData, Metadata
+    from cis.time_util import cis_standard_time_unit
+
+    rng = numpy.random.RandomState(seed)
+    lat, lon, time = rng.uniform(-30, 30, n), rng.uniform(-60, 60, n), rng.uniform(30000, 30010, n)
+    data = numpy.ma.masked_array(rng.normal(mean, 1.0, n), mask=rng.uniform(size=n) < 0.1)
+    coords = CoordList([Coord(lat[points], Metadata(standard_name='latitude', units='degrees')),
+                        Coord(lon[points], Metadata(standard_name='longitude', units='degrees')),
+                        Coord(time[points], Metadata(standard_name='time', units=cis_standard_time_unit))])
+    return UngriddedData(data[points], Metadata(name=name, standard_name='rainfall_flux', units="kg m-2 s-1"),
+                         coords)
+
+
+class TestUngriddedChunkAggregation(TestCase):
+    def setUp(self):
+        self.grid = {'x': slice(-60, 60, 20), 'y': slice(-30, 30, 10)}
+        self.all_data = _make_random_ungridded_data(0)
+        self.chunks = [_make_random_ungridded_data(0, points=slice(start, start + 300)) for start in (0, 300, 600)]
+
+    def _check_same_as_aggregating_all_data(self, kernel):
+        from cis.data_io.ungridded_data import aggregate_chunks
+        expected = self.all_data.aggregate(how=kernel, **self.grid)
+        if not isinstance(expected, GriddedDataList):
+            expected = GriddedDataList([expected])
+        streamed = aggregate_chunks(iter(self.chunks), how=kernel, **self.grid)
+        assert len(streamed) == len(expected)
+        for streamed_var, expected_var in zip(streamed, expected):
+            assert numpy.array_equal(streamed_var.data.mask, expected_var.data.mask)
+            assert numpy.allclose(streamed_var.data, expected_var.data, rtol=1e-9)
+            assert streamed_var.var_name == expected_var.var_name
+        return streamed, expected
+
+    @istest
+    def test_chunked_moments_are_the_same_as_aggregating_all_data(self):
+        self._check_same_as_aggregating_all_data('moments')
+
+    @istest
+    def test_chunked_min_max_and_sum_are_the_same_as_aggregating_all_data(self):
+        for kernel in ['min', 'max', 'sum']:
+            self._check_same_as_aggregating_all_data(kernel)
+
+    @istest
+    def test_chunked_aggregation_bounds_collapsed_coordinates_by_all_the_data(self):
+        streamed, expected = self._check_same_as_aggregating_all_data('mean')
+        time = streamed[0].coord('time')
+        assert numpy.allclose(time.bounds, expected[0].coord('time').bounds)
+        assert numpy.allclose(time.points, expected[0].coord('time').points)
+
+    @istest
+    def test_chunked_aggregation_of_lists_of_variables(self):
+        from cis.data_io.ungridded_data import aggregate_chunks
+        chunks = [UngriddedDataList([chunk, _make_random_ungridded_data(0, mean=-5.0, name='snow',
+                                                                         points=slice(start, start + 300))])
+                  for start, chunk in zip((0, 300, 600), self.chunks)]
+        streamed = aggregate_chunks(chunks, how='mean', **self.grid)
+        assert [d.var_name for d in streamed] == ['rain', 'snow']
+        compare_masked_arrays(streamed[0].data, aggregate_chunks(self.chunks, how='mean', **self.grid)[0].data)
+
+    @istest
+    def test_chunked_aggregation_needs_a_kernel_using_statistics(self):
+        from cis.data_io.ungridded_data import aggregate_chunks
+        from cis.exceptions import UserPrintableException
+        with self.assertRaises(UserPrintableException):
+            aggregate_chunks(self.chunks, how='nn_horizontal', **self.grid)
+
+    @istest
+    def test_chunked_aggregation_needs_the_grid_limits(self):
+        from cis.data_io.ungridded_data import aggregate_chunks
+        from cis.exceptions import UserPrintableException
+        with self.assertRaises(UserPrintableException):
+            aggregate_chunks(self.chunks, how='mean', x=slice(None, 60, 20))
+
+
+class TestPartialAggregation(TestCase):
+    def setUp(self):
+        from cis.data_io.ungridded_data import partially_aggregate_chunks
+        self.grid = {'x': slice(-60, 60, 20), 'y': slice(-30, 30, 10)}
+        self.all_data = _make_random_ungridded_data(0)
+        self.partials = [partially_aggregate_chunks([_make_random_ungridded_data(0, points=slice(start, start + 300))],
+                                                    **self.grid) for start in (0, 300, 600)]
+
+    def _check_same_as_aggregating_all_data(self, merged, kernel):
+        expected = self.all_data.aggregate(how=kernel, **self.grid)
+        if not isinstance(expected, GriddedDataList):
+            expected = GriddedDataList([expected])
+        assert len(merged) == len(expected)
+        for merged_var, expected_var in zip(merged, expected):
+            assert numpy.array_equal(merged_var.data.mask, expected_var.data.mask)
+            assert numpy.allclose(merged_var.data, expected_var.data, rtol=1e-9)
+            assert merged_var.var_name == expected_var.var_name
+            assert merged_var.units == expected_var.units
+            for coord in expected_var.coords():
+                assert numpy.allclose(merged_var.coord(coord.name()).bounds, coord.bounds)
+
+    @istest
+    def test_merged_partial_aggregates_are_the_same_as_aggregating_all_data(self):
+        from cis.aggregation.ungridded_aggregator import merge_partial_aggregates
+        from cis.collocation.col import get_kernel
+        for kernel in ['moments', 'min', 'max', 'sum']:
+            self._check_same_as_aggregating_all_data(merge_partial_aggregates(self.partials, get_kernel(kernel)),
+                                                     kernel)
+
+    @istest
+    def test_merged_partial_aggregates_can_be_merged_again(self):
+        from cis.aggregation.ungridded_aggregator import merge_partial_aggregates
+        merged = merge_partial_aggregates([merge_partial_aggregates(self.partials[:2]), self.partials[2]], moments())
+        self._check_same_as_aggregating_all_data(merged, 'moments')
+
+    @istest
+    def test_partial_aggregates_can_be_saved_and_merged(self):
+        import os
+        import shutil
+        import tempfile
+        from cis.aggregation.ungridded_aggregator import merge_partial_aggregates, read_partial_aggregate
+        directory = tempfile.mkdtemp()
+        try:
+            filenames = [os.path.join(directory, 'partial%d.nc' % i) for i in range(len(self.partials))]
+            for partial, filename in zip(self.partials, filenames):
+                partial.save_data(filename)
+            merged = merge_partial_aggregates([read_partial_aggregate(filename, ['rain']) for filename in filenames],
+                                              moments())
+            self._check_same_as_aggregating_all_data(merged, 'moments')
+            assert merged[0].standard_name == 'rainfall_flux'
+            assert read_partial_aggregate(filenames[0], ['snow']) == []
+        finally:
+            shutil.rmtree(directory)
+
+    @istest
+    def test_partial_aggregates_on_different_grids_can_not_be_merged(self):
+        from cis.aggregation.ungridded_aggregator import merge_partial_aggregates
+        from cis.data_io.ungridded_data import partially_aggregate_chunks
+        from cis.exceptions import UserPrintableException
+        other = partially_aggregate_chunks([self.all_data], x=slice(-60, 60, 30), y=slice(-30, 30, 10))
+        with self.assertRaises(UserPrintableException):
+            merge_partial_aggregates([self.partials[0], other], moments())
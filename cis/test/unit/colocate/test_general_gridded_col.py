@@ -8,7 +8,7 @@ from cis.exceptions import UserPrintableException
 from cis.data_io.gridded_data import GriddedDataList
 from cis.data_io.ungridded_data import UngriddedDataList
 from cis.collocation.col_implementations import GeneralGriddedCollocator, mean, CubeCellConstraint, \
-    BinningCubeCellConstraint, moments, BinnedCubeCellOnlyConstraint
+    BinningCubeCellConstraint, moments, BinnedCubeCellOnlyConstraint, stddev, sum, max, min
 from cis.test.util.mock import make_mock_cube, make_dummy_ungridded_data_single_point, \
     make_dummy_ungridded_data_two_points_with_different_values, make_dummy_1d_ungridded_data, \
     make_dummy_1d_ungridded_data_with_invalid_standard_name, make_square_5x3_2d_cube_with_time, \
@@ -1061,3 +1061,76 @@ class TestGeneralGriddedCollocator(unittest.TestCase):
         kernel = mean()
         out_cube = col.collocate(points=sample, data=data, constraint=constraint, kernel=kernel)
         assert out_cube[0].shape == (5, 3)
+
+
+class PerCellKernel(object):
+    """
+    Wraps a data only kernel so that it is called once per cell, rather than once for all the cells
+    """
+
+    def __init__(self, kernel):
+        self.kernel = kernel
+        self.return_size = kernel.return_size
+
+    def get_value_for_data_only(self, data):
+        return self.kernel.get_value_for_data_only(data)
+
+    def get_variable_details(self, var_name, var_long_name, var_standard_name, var_units):
+        return self.kernel.get_variable_details(var_name, var_long_name, var_standard_name, var_units)
+
+
+class TestBinnedBatchAggregation(unittest.TestCase):
+    """
+    Checks that reducing every cell at once gives the same result as reducing each cell in turn
+    """
+
+    def _check_batch_matches_per_cell(self, kernel, missing_data_for_missing_sample=False):
+        from cis.data_io.Coord import Coord, CoordList
+        from cis.data_io.ungridded_data import UngriddedData, Metadata
+
+        rng = numpy.random.RandomState(0)
+        lat = Coord(rng.uniform(-12, 12, 200), Metadata(standard_name='latitude', units='degrees'))
+        lon = Coord(rng.uniform(-7, 7, 200), Metadata(standard_name='longitude', units='degrees'))
+        values = numpy.ma.masked_array(rng.uniform(0, 10, 200), mask=rng.uniform(size=200) < 0.1)
+        data = UngriddedData(values, Metadata(name='rain', units='kg m-2 s-1'), CoordList([lat, lon]))
+
+        sample = make_square_5x3_2d_cube()
+        sample.data = numpy.ma.masked_array(sample.data, mask=numpy.zeros((5, 3)))
+        sample.data[1, 1] = numpy.ma.masked
+
+        col = GeneralGriddedCollocator(missing_data_for_missing_sample=missing_data_for_missing_sample)
+        batch = col.collocate(sample, data, BinnedCubeCellOnlyConstraint(), kernel)
+        per_cell = col.collocate(sample, data, BinnedCubeCellOnlyConstraint(), PerCellKernel(kernel))
+
+        assert len(batch) == kernel.return_size
+        for batch_var, per_cell_var in zip(batch, per_cell):
+            assert_arrays_equal(batch_var.data.mask, per_cell_var.data.mask)
+            assert_arrays_almost_equal(batch_var.data.compressed(), per_cell_var.data.compressed())
+        return batch
+
+    def test_mean(self):
+        self._check_batch_matches_per_cell(mean())
+
+    def test_stddev(self):
+        self._check_batch_matches_per_cell(stddev())
+
+    def test_min_max_and_sum(self):
+        for kernel in (min(), max(), sum()):
+            self._check_batch_matches_per_cell(kernel)
+
+    def test_moments(self):
+        self._check_batch_matches_per_cell(moments())
+
+    def test_moments_with_missing_data_for_missing_sample(self):
+        output = self._check_batch_matches_per_cell(moments(), missing_data_for_missing_sample=True)
+        assert all(var.data.mask[1, 1] for var in output)
+
+    def test_subclass_overriding_only_get_value_for_data_only_is_not_batched(self):
+        class double_mean(mean):
+            def get_value_for_data_only(self, values):
+                return 2 * numpy.mean(values)
+
+        means = self._check_batch_matches_per_cell(mean())[0]
+        doubled = self._check_batch_matches_per_cell(double_mean())[0]
+        assert_arrays_equal(doubled.data.mask, means.data.mask)
+        assert_arrays_almost_equal(doubled.data.compressed(), 2 * means.data.compressed())
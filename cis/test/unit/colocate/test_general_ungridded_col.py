@@ -127,6 +127,42 @@ class TestGeneralUngriddedCollocator(unittest.TestCase):
         assert all(output[4].data.mask)
         assert np.allclose(output[5].data, expected_n)
 
+    def test_parallel_collocation_gives_same_result_as_serial(self):
+        data = mock.make_regular_2d_ungridded_data()
+        sample = mock.make_regular_2d_ungridded_data(data_offset=3)
+        sample.data[1, 1] = np.ma.masked
+
+        serial = GeneralUngriddedCollocator(missing_data_for_missing_sample=True).collocate(
+            sample, data, SepConstraintKdtree('500km'), moments())
+        parallel = GeneralUngriddedCollocator(missing_data_for_missing_sample=True, workers=2).collocate(
+            sample, data, SepConstraintKdtree('500km'), moments())
+
+        eq_(len(parallel), len(serial))
+        for parallel_var, serial_var in zip(parallel, serial):
+            assert np.array_equal(parallel_var.data.mask, serial_var.data.mask)
+            assert np.ma.allclose(parallel_var.data, serial_var.data)
+        assert parallel[0].data.mask[4]
+
+    def test_parallel_collocation_caches_the_constrained_points_once(self):
+        from cis.collocation import data_index
+        data = mock.make_regular_2d_ungridded_data()
+        sample = mock.make_regular_2d_ungridded_data(data_offset=3)
+        data_index.index_cache.clear()
+
+        first = GeneralUngriddedCollocator(workers=2).collocate(sample, data, SepConstraintKdtree('500km'), moments())
+        # The workers' constrained points are cached together, under the key of all of the sample points
+        eq_(len(data_index.index_cache._entries), 1)
+
+        # So collocating again needs no indexes, and the workers use the cached points
+        constraint = SepConstraintKdtree('500km')
+        second = GeneralUngriddedCollocator(workers=2).collocate(sample, data, constraint, moments())
+        assert constraint.haversine_distance_kd_tree_index is None
+        for first_var, second_var in zip(first, second):
+            assert np.array_equal(first_var.data.mask, second_var.data.mask)
+            assert np.ma.allclose(first_var.data, second_var.data)
+        data_index.index_cache.clear()
+
+
 if __name__ == '__main__':
     import nose
     nose.runmodule()
@@ -23,7 +23,7 @@ from __future__ import division, print_function, absolute_import
 import itertools
 import numpy as np
 from numpy.testing import (assert_array_almost_equal, assert_raises,
-                           TestCase, assert_allclose)
+                           TestCase, assert_allclose, assert_array_equal)
 
 from cis.collocation.gridded_interpolation import _RegularGridInterpolator, GriddedUngriddedInterpolator
 from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
@@ -387,6 +387,158 @@ class TestRegularGridInterpolator(TestCase):
         interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin')
         assert_array_almost_equal(interpolator(cube, extrapolate=True), wanted)
 
+    def test_vertical_indices_match_searching_each_column(self):
+        rng = np.random.RandomState(0)
+        columns = np.cumsum(rng.uniform(0.1, 1.0, (200, 6)), axis=1)
+        # Include columns which aren't monotonic or contain NaNs, and points on, between and outside the levels
+        columns[:20] = columns[:20, ::-1]
+        columns[20:30, 2] = np.nan
+        points = rng.uniform(-1.0, 7.0, 200)
+        points[30:40] = columns[30:40, 3]
+        points[40:45] = np.nan
+
+        indices, norm_distances, out_of_bounds = _RegularGridInterpolator._find_vertical_indices(points, columns)
+        for i, (point, column) in enumerate(zip(points, columns)):
+            index, norm_distance, point_out_of_bounds = _RegularGridInterpolator._find_vertical_index(point, column)
+            assert indices[i] == index
+            assert_allclose(norm_distances[i], norm_distance)
+            assert out_of_bounds[i] == point_out_of_bounds
+
+    def test_interpolating_in_chunks_gives_the_same_values(self):
+        rng = np.random.RandomState(1)
+        grid = [np.linspace(0, 1, 5), np.linspace(-1, 1, 7), np.cumsum(rng.uniform(0.1, 1.0, 4))]
+        values = np.ma.masked_array(rng.uniform(size=(5, 7, 4)), mask=rng.uniform(size=(5, 7, 4)) < 0.1)
+        points = [rng.uniform(-0.1, 1.1, 50), rng.uniform(-1.1, 1.1, 50), rng.uniform(0, 3, 50)]
+
+        for method in ['lin', 'nn']:
+            interpolator = _RegularGridInterpolator(grid, points, method=method)
+            chunked_interpolator = _RegularGridInterpolator(grid, points, method=method, max_chunk_points=7)
+            assert chunked_interpolator.indices is None
+            for fill_value in [np.nan, None]:
+                expected = np.ma.asarray(interpolator(values, fill_value=fill_value))
+                result = chunked_interpolator(values, fill_value=fill_value)
+                assert_array_equal(np.ma.getmaskarray(result), np.ma.getmaskarray(expected))
+                assert_allclose(result.compressed(), expected.compressed())
+
+    def test_interpolating_hybrid_coordinates_in_chunks_gives_the_same_values(self):
+        rng = np.random.RandomState(2)
+        grid = [np.linspace(0, 1, 5), np.linspace(-1, 1, 7), np.arange(6.0)]
+        hybrid_coord = np.cumsum(rng.uniform(0.1, 1.0, (5, 7, 6)), axis=-1)
+        values = rng.uniform(size=(5, 7, 6))
+        points = [rng.uniform(0, 1, 40), rng.uniform(-1, 1, 40), rng.uniform(0, 5, 40)]
+
+        interpolator = _RegularGridInterpolator(grid, points, hybrid_coord=hybrid_coord, hybrid_dims=(0, 1, 2))
+        chunked_interpolator = _RegularGridInterpolator(grid, points, hybrid_coord=hybrid_coord, hybrid_dims=(0, 1, 2),
+                                                        max_chunk_points=6)
+        expected = interpolator(values)
+        result = chunked_interpolator(values)
+        assert_array_equal(result.mask, expected.mask)
+        assert_allclose(result.compressed(), expected.compressed())
+
+    def _make_hybrid_cube_and_sample(self, pressures):
+        from cis.test.util.mock import make_mock_cube
+        from cis.data_io.ungridded_data import UngriddedData
+        from cis.data_io.hyperpoint import HyperPoint
+        import datetime as dt
+        cube = make_mock_cube(time_dim_length=3, hybrid_pr_len=10)
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=0.0, lon=0.0, pres=pressures[0], t=dt.datetime(1984, 8, 28, 0, 0, 0)),
+             HyperPoint(lat=5.0, lon=2.5, pres=pressures[1], t=dt.datetime(1984, 8, 28, 0, 0, 0)),
+             HyperPoint(lat=-4.0, lon=-4.0, pres=pressures[2], t=dt.datetime(1984, 8, 27))])
+        return cube, sample_points
+
+    def test_stored_weights_give_the_same_values(self):
+        import os
+        import tempfile
+        cube, sample_points = self._make_hybrid_cube_and_sample([111100040.5, 177125044.5, 166600039.0])
+        expected = GriddedUngriddedInterpolator(cube, sample_points, 'lin')(cube)
+
+        weights_file = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+        assert os.path.isfile(weights_file)
+
+        interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+        # The weights were read from the file, so the hybrid coordinate wasn't needed to find the vertical indices
+        assert interpolator._interp._hybrid_coord is None
+        result = interpolator(cube)
+        assert_array_equal(np.ma.getmaskarray(result), np.ma.getmaskarray(expected))
+        assert_allclose(result.compressed(), expected.compressed())
+
+    def test_stored_weights_for_different_points_are_recalculated(self):
+        import os
+        import tempfile
+        cube, sample_points = self._make_hybrid_cube_and_sample([111100040.5, 177125044.5, 166600039.0])
+        _, other_sample_points = self._make_hybrid_cube_and_sample([113625040.5, 150000000.0, 166600039.0])
+
+        weights_file = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+
+        interpolator = GriddedUngriddedInterpolator(cube, other_sample_points, 'lin', weights_file=weights_file)
+        assert interpolator._interp._hybrid_coord is not None
+        expected = GriddedUngriddedInterpolator(cube, other_sample_points, 'lin')(cube)
+        assert_allclose(interpolator(cube).compressed(), expected.compressed())
+
+    def test_corrupt_stored_weights_are_recalculated_and_rewritten(self):
+        import os
+        import tempfile
+        cube, sample_points = self._make_hybrid_cube_and_sample([111100040.5, 177125044.5, 166600039.0])
+        expected = GriddedUngriddedInterpolator(cube, sample_points, 'lin')(cube)
+
+        weights_file = os.path.join(tempfile.mkdtemp(), 'weights.npz')
+        GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+        with open(weights_file, 'rb') as f:
+            truncated = f.read()[:100]
+        for contents in [truncated, b'not a weights file']:
+            with open(weights_file, 'wb') as f:
+                f.write(contents)
+
+            interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+            assert interpolator._interp._hybrid_coord is not None
+            assert_allclose(interpolator(cube).compressed(), expected.compressed())
+            # The weights were stored again, so are read from the file next time
+            interpolator = GriddedUngriddedInterpolator(cube, sample_points, 'lin', weights_file=weights_file)
+            assert interpolator._interp._hybrid_coord is None
+
+    def test_only_the_sampled_hyperslab_of_lazy_data_is_read(self):
+        from cis.test.util.mock import make_mock_cube
+        from cis.data_io.ungridded_data import UngriddedData
+        from cis.data_io.hyperpoint import HyperPoint
+        import dask.array as da
+        import datetime as dt
+        cube = make_mock_cube(lat_dim_length=10, lon_dim_length=6, time_dim_length=20)
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=-2.0, lon=1.0, t=dt.datetime(1984, 8, 29, 6, 0, 0)),
+             HyperPoint(lat=3.0, lon=-1.0, t=dt.datetime(1984, 8, 30, 18, 0, 0))])
+        expected = GriddedUngriddedInterpolator(cube, sample_points, 'lin')(cube)
+
+        lazy_cube = cube.copy(data=da.from_array(cube.data, chunks=1))
+        interpolator = GriddedUngriddedInterpolator(lazy_cube, sample_points, 'lin')
+        time_start, time_stop = interpolator._slab[2]
+        assert time_stop - time_start < 20
+        result = interpolator(lazy_cube)
+        assert lazy_cube.has_lazy_data()
+        assert_allclose(result, expected)
+
+    def test_interpolating_stacked_variables_gives_the_same_values(self):
+        from cis.test.util.mock import make_mock_cube
+        from cis.data_io.ungridded_data import UngriddedData
+        from cis.data_io.hyperpoint import HyperPoint
+        import datetime as dt
+        cube = make_mock_cube(time_dim_length=3, hybrid_pr_len=10)
+        other_cube = make_mock_cube(time_dim_length=3, hybrid_pr_len=10, data_offset=10, mask=True)
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=0.0, lon=0.0, pres=111100040.5, t=dt.datetime(1984, 8, 28, 0, 0, 0)),
+             HyperPoint(lat=5.0, lon=2.5, pres=177125044.5, t=dt.datetime(1984, 8, 28, 0, 0, 0)),
+             HyperPoint(lat=-4.0, lon=-4.0, pres=166600039.0, t=dt.datetime(1984, 8, 27))])
+
+        for method in ['lin', 'nn']:
+            interpolator = GriddedUngriddedInterpolator(cube, sample_points, method)
+            results = interpolator.interpolate_stacked([cube, other_cube])
+            for data, result in zip([cube, other_cube], results):
+                expected = interpolator(data)
+                assert_array_equal(np.ma.getmaskarray(result), np.ma.getmaskarray(expected))
+                assert_allclose(result.compressed(), expected.compressed())
+
 
 class MyValue(object):
     """
@@ -0,0 +1,92 @@
+from unittest import TestCase
+
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+
+from cis.collocation.gridded_regridding import SparseRegridder
+
+
+def _make_cube(lats, lons, times=3, circular=False, mask_fraction=0, seed=0):
+    from iris.cube import Cube
+    from iris.coords import DimCoord
+    rng = np.random.RandomState(seed)
+    data = rng.uniform(size=(len(lats), len(lons), times))
+    if mask_fraction:
+        data = np.ma.masked_array(data, mask=rng.uniform(size=data.shape) < mask_fraction)
+    lat = DimCoord(lats, standard_name='latitude', units='degrees')
+    lon = DimCoord(lons, standard_name='longitude', units='degrees', circular=circular)
+    time = DimCoord(np.arange(times, dtype=float), standard_name='time', units='days since 2000-01-01')
+    return Cube(data, var_name='rain', units='kg m-2 s-1', dim_coords_and_dims=[(lat, 0), (lon, 1), (time, 2)])
+
+
+def _make_sample_coords(lats, lons):
+    from iris.coords import DimCoord
+    return [DimCoord(lats, standard_name='latitude', units='degrees'),
+            DimCoord(lons, standard_name='longitude', units='degrees')]
+
+
+class TestSparseRegridder(TestCase):
+
+    def _assert_matches_iris(self, cube, sample_coords, method, extrapolation_mode):
+        from iris.analysis import Linear, Nearest
+        scheme = Linear if method == 'lin' else Nearest
+        expected = cube.interpolate([(c.name(), c.points) for c in sample_coords],
+                                    scheme(extrapolation_mode=extrapolation_mode))
+        result = SparseRegridder(cube, sample_coords, method, extrapolation_mode == 'extrapolate')(cube)
+
+        assert result.shape == expected.shape
+        assert_array_equal(np.ma.getmaskarray(result.data), np.ma.getmaskarray(expected.data))
+        assert_allclose(np.ma.compressed(result.data), np.ma.compressed(expected.data))
+        for coord in expected.coords():
+            assert_array_equal(result.coord(coord.name()).points, coord.points)
+
+    def test_matches_iris_interpolation(self):
+        cube = _make_cube(np.linspace(-60, 60, 13), np.linspace(-100, 100, 21), mask_fraction=0.1)
+        sample_coords = _make_sample_coords(np.linspace(-70, 70, 9), np.linspace(-120, 90, 17))
+        for method in ['lin', 'nn']:
+            for extrapolation_mode in ['mask', 'extrapolate']:
+                self._assert_matches_iris(cube, sample_coords, method, extrapolation_mode)
+
+    def test_matches_iris_interpolation_of_circular_and_decreasing_coordinates(self):
+        cube = _make_cube(np.linspace(80, -80, 17), np.arange(0, 360, 10.0), circular=True)
+        sample_coords = _make_sample_coords(np.linspace(-75, 75, 7), np.arange(-180, 180, 7.5))
+        for method in ['lin', 'nn']:
+            self._assert_matches_iris(cube, sample_coords, method, 'mask')
+
+    def test_area_weighted_regridding_conserves_the_area_weighted_mean(self):
+        from iris.analysis.cartography import area_weights
+        cube = _make_cube(np.linspace(-87.5, 87.5, 36), np.arange(2.5, 360, 5.0), circular=True)
+        sample_coords = _make_sample_coords(np.linspace(-80, 80, 9), np.arange(10, 360, 20.0))
+        result = SparseRegridder(cube, sample_coords, 'area')(cube)
+
+        assert result.shape == (9, 18, 3)
+        for cube_or_result in [cube, result]:
+            cube_or_result.coord('latitude').guess_bounds()
+            cube_or_result.coord('longitude').guess_bounds()
+        expected_mean = np.average(cube.data, weights=area_weights(cube), axis=(0, 1))
+        assert_allclose(np.average(result.data, weights=area_weights(result), axis=(0, 1)), expected_mean)
+
+    def test_area_weighted_regridding_masks_uncovered_cells(self):
+        cube = _make_cube(np.linspace(-10, 10, 5), np.linspace(-10, 10, 5))
+        sample_coords = _make_sample_coords(np.array([0.0, 40.0]), np.array([-5.0, 5.0]))
+        result = SparseRegridder(cube, sample_coords, 'area')(cube)
+        assert_array_equal(np.ma.getmaskarray(result.data)[:, :, 0], [[False, False], [True, True]])
+
+    def test_weights_are_cached(self):
+        from cis.collocation import data_index
+        cube = _make_cube(np.linspace(-60, 60, 13), np.linspace(-100, 100, 21))
+        sample_coords = _make_sample_coords(np.linspace(-50, 50, 5), np.linspace(-50, 50, 5))
+        regridder = SparseRegridder(cube, sample_coords, 'lin')
+        cached_regridder = SparseRegridder(_make_cube(cube.coord('latitude').points, cube.coord('longitude').points,
+                                                      seed=1), sample_coords, 'lin')
+        assert cached_regridder._matrix.data is not regridder._matrix.data
+        assert_array_equal(cached_regridder._matrix.data, regridder._matrix.data)
+        assert len(data_index.index_cache._entries) > 0
+
+    def test_can_not_regrid_over_auxiliary_coordinates(self):
+        from iris.coords import AuxCoord
+        cube = _make_cube(np.linspace(-60, 60, 13), np.linspace(-100, 100, 21))
+        assert SparseRegridder.can_regrid(cube, ['latitude', 'longitude'])
+        cube.add_aux_coord(AuxCoord(np.zeros((13, 21)), long_name='surface_pressure'), (0, 1))
+        assert not SparseRegridder.can_regrid(cube, ['latitude', 'longitude'])
+        assert SparseRegridder.can_regrid(cube, ['time'])
@@ -0,0 +1,75 @@
+"""
+Test the cache of collocation indexes
+"""
+import shutil
+import tempfile
+import unittest
+
+from nose.tools import eq_
+import numpy as np
+import pandas as pd
+
+from cis.collocation import data_index
+from cis.collocation.col_implementations import SepConstraintKdtree
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def test_fingerprint_depends_on_values_and_types(self):
+        a = np.arange(5.0)
+        eq_(data_index.fingerprint(a, 'x', None), data_index.fingerprint(a.copy(), 'x', None))
+        assert data_index.fingerprint(a) != data_index.fingerprint(a + 1)
+        assert data_index.fingerprint(a) != data_index.fingerprint(a.astype(np.float32))
+        assert data_index.fingerprint(a, 1) != data_index.fingerprint(a, 2)
+
+    def test_least_recently_used_index_is_removed_from_memory(self):
+        cache = data_index.IndexCache(max_entries=2)
+        cache.put('a', x=np.arange(1))
+        cache.put('b', x=np.arange(2))
+        cache.get('a')
+        cache.put('c', x=np.arange(3))
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert np.array_equal(cache.get('c')['x'], np.arange(3))
+        eq_(cache.get('b'), None)
+
+    def test_indexes_are_stored_on_disk(self):
+        directory = tempfile.mkdtemp()
+        try:
+            data_index.IndexCache(directory=directory).put('a', x=np.arange(4), y=np.ones(2))
+
+            cache = data_index.IndexCache(directory=directory)
+            assert 'a' in cache
+            arrays = cache.get('a')
+            assert np.array_equal(arrays['x'], np.arange(4))
+            assert np.array_equal(arrays['y'], np.ones(2))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_neighbour_indices_are_reused_without_indexing(self):
+        rng = np.random.RandomState(0)
+        data = pd.DataFrame({'latitude': rng.uniform(-10, 10, 500), 'longitude': rng.uniform(-10, 10, 500),
+                             'vals': rng.uniform(0, 1, 500)})
+        sample = pd.DataFrame({'latitude': rng.uniform(-10, 10, 50), 'longitude': rng.uniform(-10, 10, 50)})
+
+        constraint = SepConstraintKdtree('500km')
+        assert constraint.neighbour_indices_key(False, data, sample) not in data_index.index_cache
+        data_index.create_indexes(constraint, None, data, None)
+        offsets, indices = constraint.get_neighbour_indices(False, data, sample)
+
+        # A new constraint, without any indexes, finds the same points from the cache
+        constraint = SepConstraintKdtree('500km')
+        assert constraint.neighbour_indices_key(False, data, sample) in data_index.index_cache
+        cached_offsets, cached_indices = constraint.get_neighbour_indices(False, data, sample)
+        assert np.array_equal(cached_offsets, offsets)
+        assert np.array_equal(cached_indices, indices)
+
+        # But not for different data points
+        data.loc[0, 'latitude'] += 1
+        assert constraint.neighbour_indices_key(False, data, sample) not in data_index.index_cache
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -373,5 +373,159 @@ class TestMean(unittest.TestCase):
         eq_(new_data.data[0], 25.5)
 
 
+class TestDataOnlyBatch(unittest.TestCase):
+    values = np.array([1.0, 2.0, 3.0, 4.0, 10.0, -1.0])
+    offsets = np.array([0, 3, 4, 6])
+
+    def _check_matches_single(self, kernel):
+        batch = kernel.get_value_for_data_only_batch(self.values, self.offsets)
+        single = [kernel.get_value_for_data_only(self.values[start:end])
+                  for start, end in zip(self.offsets[:-1], self.offsets[1:])]
+        assert_almost_equal(np.transpose(batch), single)
+
+    def test_mean(self):
+        from cis.collocation.col_implementations import mean
+        self._check_matches_single(mean())
+
+    def test_stddev(self):
+        from cis.collocation.col_implementations import stddev
+        batch = stddev().get_value_for_data_only_batch(self.values, self.offsets)
+        assert_almost_equal(batch[[0, 2]], [1.0, np.std([10.0, -1.0], ddof=1)])
+        # A single value has no corrected standard deviation
+        assert np.isnan(batch[1])
+
+    def test_min_max_sum(self):
+        from cis.collocation.col_implementations import min, max, sum
+        for kernel in [min(), max(), sum()]:
+            self._check_matches_single(kernel)
+
+    def test_moments(self):
+        from cis.collocation.col_implementations import moments
+        means, stddevs, counts = moments().get_value_for_data_only_batch(self.values, self.offsets)
+        assert_almost_equal(means, [2.0, 4.0, 4.5])
+        assert_almost_equal(stddevs[[0, 2]], [1.0, np.std([10.0, -1.0], ddof=1)])
+        assert_equal(counts, [3, 1, 2])
+
+    def test_batch_collocation_matches_per_point_collocation(self):
+        from cis.collocation.col_framework import AbstractDataOnlyKernel
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, moments, SepConstraintKdtree
+
+        class per_point_moments(AbstractDataOnlyKernel):
+            """Moments kernel without a batch method, so that the per-point path is used"""
+            return_size = 3
+            get_variable_details = moments.get_variable_details
+
+            def get_value_for_data_only(self, values):
+                return moments().get_value_for_data_only(values)
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0), HyperPoint(lat=4.0, lon=-3.0), HyperPoint(lat=-8.0, lon=5.0),
+             HyperPoint(lat=45.0, lon=45.0)])
+
+        batch = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('600km'),
+                                                       moments())
+        single = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('600km'),
+                                                        per_point_moments())
+        for b, s in zip(batch, single):
+            assert_equal(b.data.mask, s.data.mask)
+            assert_almost_equal(b.data.filled(0), s.data.filled(0))
+
+    def test_subclass_overriding_only_get_value_for_data_only_is_not_batched(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, mean, SepConstraintKdtree
+
+        class double_mean(mean):
+            def get_value_for_data_only(self, values):
+                return 2 * np.mean(values)
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0), HyperPoint(lat=4.0, lon=-3.0), HyperPoint(lat=45.0, lon=45.0)])
+
+        means = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('2000km'),
+                                                       mean())[0]
+        doubled = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('2000km'),
+                                                         double_mean())[0]
+        assert_equal(doubled.data.mask, means.data.mask)
+        assert_almost_equal(doubled.data.compressed(), 2 * means.data.compressed())
+
+    def test_batch_collocation_with_altitude_and_time_constraints(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, moments, SepConstraintKdtree
+        import datetime as dt
+
+        ug_data = mock.make_regular_4d_ungridded_data()
+        sample_points = UngriddedData.from_points_array(
+            [HyperPoint(lat=1.0, lon=1.0, alt=12.0, t=dt.datetime(1984, 8, 29, 8, 34)),
+             HyperPoint(lat=4.0, lon=-3.0, alt=40.0, t=dt.datetime(1984, 8, 30, 8, 34)),
+             HyperPoint(lat=45.0, lon=45.0, alt=12.0, t=dt.datetime(1984, 8, 29, 8, 34))])
+
+        constraint = SepConstraintKdtree(h_sep='2000km', a_sep=15, t_sep='P1D')
+        means, stddevs, counts = GeneralUngriddedCollocator().collocate(sample_points, ug_data, constraint,
+                                                                        moments())
+        assert_almost_equal(means.data[:2], [8.5, 24.5])
+        assert_equal(counts.data[:2], [6, 6])
+        assert_equal(means.data.mask, [False, False, True])
+
+
+class TestNearestNeighbourBatch(unittest.TestCase):
+    def _check_batch_matches_get_value(self, kernel, **coords):
+        import pandas as pd
+        rng = np.random.RandomState(0)
+        data = pd.DataFrame(dict(vals=np.arange(40.0), **{k: rng.choice(v, 40) for k, v in coords.items()}))
+        points = pd.DataFrame({k: rng.choice(v, 5) for k, v in coords.items()})
+        offsets = np.array([0, 10, 11, 25, 32, 40])
+        indices = rng.permutation(40)
+
+        batch = kernel.get_value_batch(points, data, offsets, indices)
+        expected = [kernel.get_value(points.iloc[i], data.iloc[indices[offsets[i]:offsets[i + 1]]])
+                    for i in range(len(points))]
+        assert_equal(batch, expected)
+
+    def test_nn_horizontal(self):
+        from cis.collocation.col_implementations import nn_horizontal
+        self._check_batch_matches_get_value(nn_horizontal(), latitude=np.arange(-10.0, 10.0, 2.5),
+                                            longitude=np.arange(-10.0, 10.0, 2.5))
+
+    def test_nn_altitude(self):
+        from cis.collocation.col_implementations import nn_altitude
+        self._check_batch_matches_get_value(nn_altitude(), altitude=np.arange(0.0, 100.0, 5.0))
+
+    def test_nn_pressure(self):
+        from cis.collocation.col_implementations import nn_pressure
+        self._check_batch_matches_get_value(nn_pressure(), air_pressure=np.arange(10.0, 1000.0, 10.0))
+
+    def test_nn_time(self):
+        from cis.collocation.col_implementations import nn_time
+        self._check_batch_matches_get_value(nn_time(), time=np.arange(0.0, 10.0, 0.25))
+
+    def test_subclass_overriding_only_get_value_is_not_batched(self):
+        from cis.collocation.col_implementations import GeneralUngriddedCollocator, nn_horizontal, \
+            SepConstraintKdtree
+
+        class farthest_horizontal(nn_horizontal):
+            def get_value(self, point, data):
+                from cis.collocation.kdtree import haversine
+                distances = haversine(data[['latitude', 'longitude']].values,
+                                      np.array([point.latitude, point.longitude]))
+                return data.vals.values[np.argmax(distances)]
+
+        ug_data = mock.make_regular_2d_ungridded_data()
+        sample_points = UngriddedData.from_points_array([HyperPoint(lat=0.0, lon=0.0)])
+
+        nearest = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('1000km'),
+                                                         nn_horizontal())[0]
+        farthest = GeneralUngriddedCollocator().collocate(sample_points, ug_data, SepConstraintKdtree('1000km'),
+                                                          farthest_horizontal())[0]
+        eq_(nearest.data[0], 8.0)
+        assert farthest.data[0] != nearest.data[0]
+
+    def test_get_value_with_no_points_raises_ValueError(self):
+        import pandas as pd
+        from cis.collocation.col_implementations import nn_altitude
+        data = pd.DataFrame({'vals': [], 'altitude': []})
+        with self.assertRaises(ValueError):
+            nn_altitude().get_value(pd.Series({'altitude': 1.0}), data)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -84,6 +84,15 @@ class TestGriddedSubsetConstraint(TestCase):
                                          [7.0, 8.0, 9.0],
                                          [None, 11.0, None]])
 
+    def test_can_subset_multidimensional_gridded_data_by_shape(self):
+        data = make_from_cube(cis.test.util.mock.make_mock_cube(time_dim_length=4, horizontal_offset=2))
+        subset = data.subset(shape=cis.test.util.mock.WKT_DIAMOND)
+        assert subset.shape[2] == 4
+        for time_index in range(4):
+            expected = make_from_cube(data[:, :, time_index]).subset(shape=cis.test.util.mock.WKT_DIAMOND)
+            assert subset.data[:, :, time_index].tolist() == expected.data.tolist()
+        assert np.ma.count_masked(subset.data) > 0
+
     def test_can_subset_2d_gridded_data_by_longitude_with_wrapping_at_180(self):
         data = make_from_cube(cis.test.util.mock.make_mock_cube(lat_dim_length=5, lon_dim_length=9))
         long_coord = data.coord('longitude')
@@ -212,6 +221,14 @@ class TestUngriddedSubsetConstraint(TestCase):
         assert len(data.data_flattened) == 15
         assert len(data.coord('longitude').data_flattened) == 15
 
+    def test_original_longitudes_not_altered_when_subsetting_with_wrapping(self):
+        data = cis.test.util.mock.make_regular_2d_ungridded_data(
+            lat_dim_length=5, lon_dim_length=9, lon_min=5., lon_max=325.)
+        original_lons = data.lon.data.copy()
+        subset = data.subset(longitude=[-45.0, 90.0])
+        assert (data.lon.data == original_lons).all()
+        assert subset.lon.data.min() == -35.0
+
     def test_can_subset_2d_ungridded_data_by_longitude_latitude(self):
         data = cis.test.util.mock.make_regular_2d_ungridded_data()
         subset = data.subset(longitude=[0.0, 5.0], latitude=[-5.0, 5.0])
@@ -262,6 +279,14 @@ class TestUngriddedSubsetConstraint(TestCase):
         subset = data.subset(longitude=[0.0, 5.0])
         assert (subset.data.tolist() == [2, 3, None, 6, 8, None, 11, 12, 14, 15])
 
+    def test_shape_subset_of_UngriddedDataList_applies_to_every_variable(self):
+        ug_data = cis.test.util.mock.make_regular_2d_ungridded_data()
+        ug_data2 = UngriddedData(ug_data.data + 1, Metadata(name='snow', standard_name='snowfall_flux',
+                                                            units="kg m-2 s-1", missing_value=-999), ug_data.coords())
+        subset = UngriddedDataList([ug_data, ug_data2]).subset(shape=cis.test.util.mock.WKT_DIAMOND)
+        assert subset[0].data.tolist() == [5, 7, 8, 9, 11]
+        assert subset[1].data.tolist() == [6, 8, 9, 10, 12]
+
     def test_GIVEN_UngriddedDataList_WHEN_constrain_THEN_correctly_subsetted_UngriddedDataList_returned(self):
         ug_data = cis.test.util.mock.make_regular_2d_ungridded_data()
         ug_data2 = UngriddedData(ug_data.data + 1, Metadata(name='snow', standard_name='snowfall_flux',
@@ -273,3 +298,36 @@ class TestUngriddedSubsetConstraint(TestCase):
         assert isinstance(subset, UngriddedDataList)
         assert subset[0].data.tolist() == [5, 6, 8, 9, 11, 12, 14, 15]
         assert subset[1].data.tolist() == [6, 7, 9, 10, 12, 13, 15, 16]
+
+
+class TestGetIndicesForPoints(TestCase):
+
+    def test_indices_match_testing_each_point_in_turn(self):
+        from shapely.geometry import Point
+        from shapely.wkt import loads
+        from cis.subsetting.subset import _get_indices_for_lat_lon_points
+        region = loads('POLYGON((0 0, 10 0, 10 10, 0 10, 0 0), (4 4, 6 4, 6 6, 4 6, 4 4))')
+        x, y = np.meshgrid(np.linspace(-2, 12, 29), np.linspace(-2, 12, 57))
+        expected = [i for i, (p_x, p_y) in enumerate(zip(x.flat, y.flat)) if region.contains(Point(p_x, p_y))]
+        assert _get_indices_for_lat_lon_points(x.flat, y.flat, region).tolist() == expected
+
+    def test_rasterized_mask_matches_testing_each_point_in_turn(self):
+        from shapely.geometry import Point
+        from shapely.wkt import loads
+        from cis.subsetting.subset import _rasterize_region
+        region = loads('MULTIPOLYGON(((0 0, 10 0, 10 10, 0 10, 0 0), (4 4, 6 4, 6 6, 4 6, 4 4)),'
+                       '((12 1, 15 3.3, 12 7.7, 12 1)))')
+        x, y = np.linspace(16, -2, 37), np.linspace(-2, 12, 57)
+        expected = [[region.contains(Point(p_x, p_y)) for p_x in x] for p_y in y]
+        assert _rasterize_region(x, y, region).tolist() == expected
+
+    def test_rasterized_mask_matches_testing_each_point_in_turn_for_sloped_edges_through_grid_points(self):
+        from shapely.geometry import Point
+        from shapely.wkt import loads
+        from cis.subsetting.subset import _rasterize_region
+        # The edges pass through points of the grid, where the crossings calculated in floating point are slightly off
+        region = loads('MULTIPOLYGON(((-3.3 -0.7, -3.0 -2.6, 2.1 -0.9, -3.3 -0.7)),'
+                       '((-4.1 1.3, 0.7 4.9, 3.8 0.2, -4.1 1.3)))')
+        x = y = np.round(np.arange(-5, 5.05, 0.1), 1)
+        expected = [[region.contains(Point(p_x, p_y)) for p_x in x] for p_y in y]
+        assert _rasterize_region(x, y, region).tolist() == expected
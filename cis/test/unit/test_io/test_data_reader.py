@@ -245,3 +245,93 @@ class TestDataReader(TestCase):
         reader = DataReader(get_data_func=get_data_func, get_variables_func=get_var_func)
         data = reader.read_datagroups([datagroup])
         assert_that(data[0].alias, is_('alias1'))
+
+    def test_GIVEN_multiple_variables_WHEN_read_data_THEN_all_variables_read_together(self):
+        variables = ['var1', 'var2']
+        filenames = 'filename1'
+        product = None
+        get_data_list_func = MagicMock(return_value=[make_regular_2d_ungridded_data(),
+                                                     make_regular_2d_ungridded_data()])
+        reader = DataReader(get_data_list_func=get_data_list_func)
+        data = reader.read_data_list(filenames, variables, product)
+
+        # Check the data read function is called once for all of the variables
+        assert_that(get_data_list_func.call_count, is_(1))
+        call_args = get_data_list_func.call_args_list[0][0]
+        assert_that(call_args[0], is_([filenames]))
+        assert_that(call_args[1], is_(variables))
+        assert_that(call_args[2], is_(product))
+        assert_that(data, instance_of(UngriddedDataList))
+        assert_that(len(data), is_(2))
+
+    def test_GIVEN_read_region_WHEN_read_data_THEN_read_region_passed_to_product(self):
+        read_region = {'time': [0, 1]}
+        get_data_list_func = MagicMock(return_value=[make_regular_2d_ungridded_data()])
+        reader = DataReader(get_data_list_func=get_data_list_func)
+        reader.read_single_datagroup({'filenames': ['filename1'], 'variables': ['var1']}, read_region=read_region)
+        assert_that(get_data_list_func.call_args_list[0][1], is_({'read_region': read_region}))
+
+
+class TestReadRegion(TestCase):
+
+    def setUp(self):
+        import tempfile
+        self.directory = tempfile.mkdtemp('cis_test_read_region')
+        self.filename = os.path.join(self.directory, 'flight.nc')
+        _make_gassp_file(self.filename)
+
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.directory)
+
+    def test_read_region_slice_covers_points_within_region(self):
+        import numpy as np
+        from cis.data_io.products.NCAR_NetCDF_RAF import NCAR_NetCDF_RAF
+        product = NCAR_NetCDF_RAF()
+        lons = np.array([170., 175., 180., -175., -170., 175.])
+        assert_that(product._get_read_region_slice({'longitude': lons}), is_(slice(None)))
+        product.read_region = {'longitude': [179, 186], 'time': [0, 1]}
+        assert_that(product._get_read_region_slice({'longitude': lons}), is_(slice(2, 4)))
+        assert_that(product._get_read_region_slice({'longitude': lons}, margin=3), is_(slice(0, 6)))
+        product.read_region = {'latitude': [10, 20]}
+        assert_that(product._get_read_region_slice({'latitude': lons}), is_(slice(0, 1)))
+
+    def test_GIVEN_read_region_WHEN_read_NCAR_RAF_data_THEN_only_hyperslab_read(self):
+        import numpy as np
+        from cis.data_io.netcdf import VariableHyperslab
+        std_time_of_start = 149750.0
+        read_region = {'time': [std_time_of_start + 0.25, std_time_of_start + 0.5]}
+        data = DataReader().read_data_list(self.filename, 'CN', read_region=read_region)[0]
+        full_data = DataReader().read_data_list(self.filename, 'CN')[0]
+
+        assert_that(data._data_manager[0], instance_of(VariableHyperslab))
+        assert_that(data.shape, is_((21601,)))
+        times = data.coord(standard_name='time').points
+        assert_that(times.min(), is_(read_region['time'][0]))
+        assert_that(times.max(), is_(read_region['time'][1]))
+        assert_that(np.ma.allequal(data.data, full_data.data[21600:43201]), is_(True))
+        assert_that(np.array_equal(np.ma.getmaskarray(data.data), np.ma.getmaskarray(full_data.data)[21600:43201]),
+                    is_(True))
+
+
+def _make_gassp_file(filename, n=86400):
+    """
+    Make a (GASSP flavoured) NCAR RAF file of a day of data, one point a second from 2010-01-01, with a few missing
+    """
+    import numpy as np
+    import netCDF4
+    dataset = netCDF4.Dataset(filename, 'w')
+    dataset.GASSP_Version = '1.0'
+    dataset.Coordinates = 'LON LAT ALT Time'
+    dataset.createDimension('Time', n)
+    for name, units, values in [('Time', 'seconds since 2010-01-01 00:00:00', np.arange(n)),
+                                ('LAT', 'degrees_north', np.linspace(-30, 30, n)),
+                                ('LON', 'degrees_east', np.linspace(150, 210, n) % 360),
+                                ('ALT', 'm', np.linspace(1000, 2000, n))]:
+        variable = dataset.createVariable(name, 'f8', ('Time',))
+        variable.units = units
+        variable[:] = values
+    variable = dataset.createVariable('CN', 'f4', ('Time',), fill_value=-9999.)
+    variable.units = 'cm-3'
+    variable[:] = np.where(np.arange(n) % 1000 == 0, -9999., np.arange(n) * 0.5)
+    dataset.close()
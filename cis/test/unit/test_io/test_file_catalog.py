@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from hamcrest import assert_that, is_
+
+from cis.data_io.file_catalog import get_subset_extent, get_aggregation_extent, get_collocation_extent, \
+    get_extent, prune_files, read_catalog, write_catalog, _file_stamp
+from cis.time_util import PartialDateTime, convert_datetime_to_std_time
+
+
+class TestGetExtent(TestCase):
+
+    def test_extent_of_gridded_data_includes_bounds_in_standard_time(self):
+        from cis.test.util.mock import make_mock_cube
+        cube = make_mock_cube(time_dim_length=3)
+        cube.coord('time').bounds = None
+        cube.coord('latitude').bounds = None
+        cube.coord('longitude').bounds = None
+        cube.coord('longitude').guess_bounds()
+        extent = get_extent(cube)
+        time = cube.coord('time')
+        assert_that(extent['time'], is_([convert_datetime_to_std_time(time.units.num2date(time.points.min())),
+                                         convert_datetime_to_std_time(time.units.num2date(time.points.max()))]))
+        assert_that(extent['longitude'], is_([float(cube.coord('longitude').bounds.min()),
+                                              float(cube.coord('longitude').bounds.max())]))
+        assert_that(extent['latitude'], is_([float(cube.coord('latitude').points.min()),
+                                             float(cube.coord('latitude').points.max())]))
+
+    def test_extent_of_ungridded_data_ignores_missing_values(self):
+        import numpy as np
+        from cis.test.util.mock import make_regular_2d_ungridded_data
+        data = make_regular_2d_ungridded_data()
+        lat = data.coord(standard_name='latitude')
+        lat.data = np.ma.masked_greater(lat.data, 5)
+        extent = get_extent(data)
+        assert_that(extent['latitude'], is_([float(lat.data.min()), float(lat.data.max())]))
+        assert 'time' not in extent
+
+    def test_subset_extent(self):
+        shape = 'POLYGON((-10 0, 10 0, 10 20, -10 0))'
+        extent = get_subset_extent({'t': PartialDateTime(2010, 1), 'shape': shape, 'z': [0, 10]})
+        assert_that(extent, is_({'time': [convert_datetime_to_std_time(datetime(2010, 1, 1)),
+                                          convert_datetime_to_std_time(PartialDateTime(2010, 1).max())],
+                                 'longitude': [-10.0, 10.0], 'latitude': [0.0, 20.0]}))
+
+    def test_aggregation_extent_is_widened_by_a_step(self):
+        extent = get_aggregation_extent({'x': slice(-180, 180, 10), 'y': None,
+                                         't': slice(datetime(2010, 1, 1), datetime(2010, 1, 2), timedelta(hours=12))})
+        start = convert_datetime_to_std_time(datetime(2010, 1, 1))
+        assert_that(extent, is_({'longitude': [-190.0, 190.0], 'time': [start - 0.5, start + 1.5]}))
+
+    def test_collocation_extent_is_widened_by_the_time_separation(self):
+        from cis.test.util.mock import make_regular_2d_with_time_ungridded_data
+        sample = make_regular_2d_with_time_ungridded_data()
+        times = sample.coord(standard_name='time').points
+        assert_that(get_collocation_extent(sample, 'P1D'), is_({'time': [times.min() - 1, times.max() + 1]}))
+        assert_that(get_collocation_extent(sample), is_({}))
+
+
+class TestPruneFiles(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp('cis_test_catalog')
+        self.filenames = []
+        for i in range(3):
+            filename = os.path.join(self.directory, 'file_{}.nc'.format(i))
+            with open(filename, 'w') as f:
+                f.write('data')
+            self.filenames.append(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write_entries(self, ranges, name='time', product='cis'):
+        entries = {}
+        for filename, file_range in zip(self.filenames, ranges):
+            entry = _file_stamp(filename)
+            entry.update({'product': product, 'variables': ['rain'], name: file_range})
+            entries[os.path.basename(filename)] = entry
+        write_catalog(self.directory, entries)
+
+    def test_files_outside_the_extent_are_skipped(self):
+        self._write_entries([[0, 1], [1, 2], [2, 3]])
+        assert_that(prune_files(self.filenames, {'time': [1.5, 1.8]}), is_(self.filenames[1:2]))
+        assert_that(prune_files(self.filenames, {'time': [1, 2.5]}), is_(self.filenames))
+        assert_that(prune_files(self.filenames, {'latitude': [80, 90]}), is_(self.filenames))
+
+    def test_longitudes_are_compared_modulo_360(self):
+        self._write_entries([[0, 90], [170, 190], [-180, 180]], name='longitude')
+        assert_that(prune_files(self.filenames, {'longitude': [-185, -175]}), is_(self.filenames[1:]))
+        assert_that(prune_files(self.filenames, {'longitude': [400, 410]}), is_([self.filenames[0],
+                                                                                self.filenames[2]]))
+
+    def test_files_not_in_the_catalog_or_changed_since_they_were_indexed_are_kept(self):
+        self._write_entries([[0, 1], [1, 2]])
+        with open(self.filenames[0], 'a') as f:
+            f.write('more data')
+        assert_that(prune_files(self.filenames, {'time': [10, 11]}), is_([self.filenames[0], self.filenames[2]]))
+
+    def test_files_indexed_with_a_different_product_are_kept(self):
+        self._write_entries([[0, 1], [1, 2], [2, 3]])
+        assert_that(prune_files(self.filenames, {'time': [10, 11]}, 'NetCDF_Gridded'), is_(self.filenames))
+
+    def test_first_file_is_kept_if_all_are_outside_the_extent(self):
+        self._write_entries([[0, 1], [1, 2], [2, 3]])
+        assert_that(prune_files(self.filenames, {'time': [10, 11]}, 'cis'), is_(self.filenames[:1]))
+
+    def test_writing_the_catalog_keeps_existing_entries(self):
+        self._write_entries([[0, 1], [1, 2], [2, 3]])
+        write_catalog(self.directory, {'file_0.nc': {'time': [5, 6]}})
+        catalog = read_catalog(self.directory)
+        assert_that(catalog['file_0.nc'], is_({'time': [5, 6]}))
+        assert_that(catalog['file_2.nc']['time'], is_([2, 3]))
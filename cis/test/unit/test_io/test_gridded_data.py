@@ -254,6 +254,23 @@ def test_set_longitude_bounds_wrap_at_180():
     assert ((long_coord.bounds[6] == np.array([22.5, 67.5])).all())
 
 
+@istest
+def test_set_longitude_range_rotates_data_lazily():
+    import dask.array as da
+    cube = mock.make_5x3_lon_lat_2d_cube_with_missing_data()
+    expected = np.ma.copy(cube.data)
+    cube.data = da.ma.masked_array(da.from_array(expected.data, chunks=2), mask=expected.mask)
+    gd = gridded_data.make_from_cube(cube)
+    gd.coord('longitude').points = np.array([0., 10., 20., 340., 350.])
+    gd.coord('longitude').bounds = None
+    gd.set_longitude_range(-180.0)
+    assert gd.has_lazy_data()
+    assert (gd.coord('longitude').points == [-20., -10., 0., 10., 20.]).all()
+    lon_idx = gd.coord_dims('longitude')[0]
+    assert (gd.data.data == np.roll(expected.data, 2, lon_idx)).all()
+    assert (gd.data.mask == np.roll(expected.mask, 2, lon_idx)).all()
+
+
 if __name__ == '__main__':
     import nose
 
@@ -241,6 +241,27 @@ class TestUngriddedDataLazyLoading(TestCase):
             if coord is not None:
                 assert_that(len(coord), is_(14))
 
+    def test_GIVEN_missing_coord_values_in_shared_coords_WHEN_data_THEN_same_points_removed_from_all_data(self):
+        x_points = np.arange(-10, 11, 5)
+        y_points = np.arange(-5, 6, 5)
+        y, x = np.meshgrid(y_points, x_points)
+        y = np.ma.masked_array(y, np.zeros(y.shape, dtype=bool))
+        y.mask[1, 2] = True
+
+        x = Coord(x, Metadata(standard_name='latitude', units='degrees'))
+        y = Coord(y, Metadata(standard_name='longitude', units='degrees'))
+        coords = CoordList([x, y])
+
+        data = np.reshape(np.arange(15) + 1.0, (5, 3))
+
+        ug = UngriddedData(None, Metadata(), coords, lambda x: data)
+        ug2 = UngriddedData(None, Metadata(), coords, lambda x: data * 10)
+        assert ug.coords() is ug2.coords()
+        assert_that(ug.data.tolist(), is_([1.0, 2.0, 3.0, 4.0, 5.0] + [float(i) for i in range(7, 16)]))
+        assert_that((ug2.data / 10).tolist(), is_(ug.data.tolist()))
+        for coord in coords:
+            assert_that(len(coord.data), is_(14))
+
 
 class TestUngriddedCoordinates(TestCase):
 
@@ -4,7 +4,7 @@ import pandas as pd
 from hamcrest import *
 from nose.tools import istest, eq_
 import numpy as np
-from cis.collocation.kdtree import KDTree
+from cis.collocation.kdtree import KDTree, HaversineDistanceKDTree, HaversineDistanceCKDTree
 from cis.time_util import cis_standard_time_unit
 import cis.data_io.gridded_data as gridded_data
 from cis.data_io.hyperpoint import HyperPoint, HyperPointList
@@ -219,10 +219,10 @@ class TestSepConstraint(object):
         #  in each direction
         constraint = SepConstraintKdtree(h_sep=400)
 
-        index = HaversineDistanceKDTreeIndex()
-        index.index_data(sample_points, ug_data_points, coord_map, leafsize=2)
+        # The balancing is a property of the pure-Python tree
+        tree = HaversineDistanceKDTree(ug_data_points[['latitude', 'longitude']], leafsize=2)
 
-        depth = self.get_max_depth(index.index.tree, 0)
+        depth = self.get_max_depth(tree.tree, 0)
 
         assert_that(depth, is_(2), "Depth is 2, there are three unique values -10, 0, 10")
 
@@ -307,6 +307,144 @@ class TestSepConstraintWithoutHorizontalSeparation(object):
         assert (np.equal(ref_vals, new_vals).all())
 
 
+class TestSepConstraintNeighbourIndices(object):
+    """Checks the constrained points found for all sample points at once, using whichever index is most selective,
+    match a brute force search.
+    """
+
+    def _random_points(self, n, seed):
+        rng = np.random.RandomState(seed)
+        return pd.DataFrame({'latitude': rng.uniform(-10, 10, n), 'longitude': rng.uniform(-10, 10, n),
+                             'altitude': rng.uniform(0, 1000, n), 'air_pressure': rng.uniform(100, 1000, n),
+                             'time': rng.uniform(0, 10, n), 'vals': rng.uniform(0, 1, n)})
+
+    def _check_against_brute_force(self, constraint, max_candidate_pairs=None):
+        from cis.collocation import data_index
+        from cis.collocation.kdtree import haversine
+
+        data = self._random_points(2000, 0)
+        sample = self._random_points(100, 1)
+        if max_candidate_pairs is not None:
+            constraint.max_candidate_pairs = max_candidate_pairs
+        data_index.create_indexes(constraint, None, data, None)
+        offsets, indices = constraint.get_neighbour_indices(False, data, sample)
+
+        for i in range(len(sample)):
+            keep = np.ones(len(data), dtype=bool)
+            if constraint.h_sep:
+                keep &= haversine(data[['latitude', 'longitude']].values,
+                                  sample[['latitude', 'longitude']].values[i]) <= constraint.h_sep
+            if hasattr(constraint, 't_sep'):
+                keep &= np.abs(data.time.values - sample.time[i]) < constraint.t_sep
+            if hasattr(constraint, 'a_sep'):
+                keep &= np.abs(data.altitude.values - sample.altitude[i]) < constraint.a_sep
+            if hasattr(constraint, 'p_sep'):
+                ratio = data.air_pressure.values / sample.air_pressure[i]
+                keep &= np.maximum(ratio, 1 / ratio) < constraint.p_sep
+            assert np.array_equal(indices[offsets[i]:offsets[i + 1]], np.flatnonzero(keep))
+
+    @istest
+    def test_time_constraint(self):
+        self._check_against_brute_force(SepConstraintKdtree(t_sep='PT3H'))
+
+    @istest
+    def test_time_and_altitude_constraints_in_chunks(self):
+        self._check_against_brute_force(SepConstraintKdtree(t_sep='PT12H', a_sep='100m'), max_candidate_pairs=500)
+
+    @istest
+    def test_pressure_constraint(self):
+        self._check_against_brute_force(SepConstraintKdtree(p_sep=1.05))
+
+    @istest
+    def test_horizontal_and_time_constraints(self):
+        self._check_against_brute_force(SepConstraintKdtree(h_sep='1000km', t_sep='PT1H'))
+
+    @istest
+    def test_sorted_coordinates_index_finds_windows(self):
+        from cis.collocation.data_index import SortedCoordinatesIndex
+
+        data = pd.DataFrame({'time': [3.0, 1.0, 2.0, 5.0], 'air_pressure': [100.0, 400.0, 200.0, 800.0]})
+        index = SortedCoordinatesIndex()
+        index.index_data(None, data, None)
+
+        starts, stops = index.find_windows('time', [2.0, 10.0], 1.5)
+        assert np.array_equal(index.sort_orders['time'][starts[0]:stops[0]], [1, 2, 0])
+        eq_(stops[1] - starts[1], 0)
+
+        starts, stops = index.find_windows('air_pressure', [300.0], 2.0)
+        assert np.array_equal(index.sort_orders['air_pressure'][starts[0]:stops[0]], [2, 1])
+
+
+class TestHaversineDistanceCKDTree(object):
+    """Checks the compiled tree finds the same neighbours as the pure-Python one.
+    """
+
+    def _random_points(self, n, seed, lat_range=90, lon_range=180):
+        rng = np.random.RandomState(seed)
+        return np.column_stack((rng.uniform(-lat_range, lat_range, n), rng.uniform(-lon_range, lon_range, n)))
+
+    @istest
+    def test_query_ball_tree_gives_same_neighbours_as_pure_python_tree(self):
+        data = self._random_points(2000, 0, lat_range=20, lon_range=30)
+        sample = self._random_points(200, 1, lat_range=20, lon_range=30)
+        mask = np.zeros(len(data), dtype=bool)
+        mask[::7] = True
+
+        expected = HaversineDistanceKDTree(sample).query_ball_tree(HaversineDistanceKDTree(data, mask=mask), 300)
+        result = HaversineDistanceCKDTree(sample).query_ball_tree(HaversineDistanceCKDTree(data, mask=mask), 300)
+
+        eq_(len(expected), len(result))
+        for e, r in zip(expected, result):
+            eq_(sorted(e), r)
+
+    @istest
+    def test_query_ball_tree_gives_exact_neighbours_over_the_whole_globe(self):
+        from cis.collocation.kdtree import haversine
+        data = self._random_points(500, 0)
+        sample = self._random_points(50, 1)
+
+        result = HaversineDistanceCKDTree(sample).query_ball_tree(HaversineDistanceCKDTree(data), 1500)
+
+        for s, r in zip(sample, result):
+            eq_(np.flatnonzero(haversine(data, s) <= 1500).tolist(), r)
+
+    @istest
+    def test_query_ball_point_gives_same_neighbours_as_pure_python_tree(self):
+        data = self._random_points(500, 2)
+        sample = self._random_points(10, 3)
+
+        expected = HaversineDistanceKDTree(data).query_ball_point(sample, 2000)
+        result = HaversineDistanceCKDTree(data).query_ball_point(sample, 2000)
+
+        for e, r in zip(expected, result):
+            eq_(sorted(e), r)
+        eq_(sorted(HaversineDistanceKDTree(data).query_ball_point(sample[0], 2000)),
+            HaversineDistanceCKDTree(data).query_ball_point(sample[0], 2000))
+
+    @istest
+    def test_query_finds_nearest_point_and_distance(self):
+        from cis.collocation.kdtree import haversine
+        data = self._random_points(500, 4)
+        sample = self._random_points(20, 5)
+
+        distances, indices = HaversineDistanceCKDTree(data).query(sample)
+        all_distances = np.array([haversine(data, s) for s in sample])
+
+        assert np.array_equal(indices, np.argmin(all_distances, axis=1))
+        assert np.allclose(distances, np.min(all_distances, axis=1))
+
+    @istest
+    def test_query_skips_masked_points(self):
+        data = np.array([[0.0, 0.0], [10.0, 10.0]])
+        tree = HaversineDistanceCKDTree(data, mask=[True, False])
+        distance, index = tree.query([0.0, 0.0])
+        eq_(index, 1)
+
+        distance, index = tree.query([0.0, 0.0], distance_upper_bound=100)
+        eq_(index, 2)
+        eq_(distance, np.inf)
+
+
 if __name__ == '__main__':
     import nose
 
@@ -586,6 +586,35 @@ class TestParseAggregate(ParseTestFiles):
         assert_that(dg[0]['product'], is_('cis'))
         assert_that(dg[0]['variables'], contains_inanyorder('rain', 'snow'))
 
+    def test_GIVEN_streaming_WHEN_aggregate_THEN_streaming_set(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, 'x=[-10,10,2]']
+        assert_that(parse_args(args).streaming, is_(False))
+        assert_that(parse_args(args + ['--streaming']).streaming, is_(True))
+
+    def test_GIVEN_merge_WHEN_aggregate_THEN_grid_is_not_needed(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, '--merge']
+        main_args = parse_args(args)
+        assert_that(main_args.merge, is_(True))
+        assert_that(main_args.grid, is_(None))
+
+    def test_GIVEN_merge_and_grid_WHEN_aggregate_THEN_raises_error(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file, 'x=[-10,10,2]', '--merge']
+        try:
+            parse_args(args)
+            assert False
+        except SystemExit as e:
+            if e.code != 2:
+                raise e
+
+    def test_GIVEN_no_grid_WHEN_aggregate_THEN_raises_error(self):
+        args = ['aggregate', 'var1:%s' % self.escaped_single_valid_file]
+        try:
+            parse_args(args)
+            assert False
+        except SystemExit as e:
+            if e.code != 2:
+                raise e
+
     def test_GIVEN_longitude_limits_not_monotonically_increasing_WHEN_aggregate_THEN_raises_error(self):
         limits = ['x=[270,90,10]', 'x=[-30,-60,1]']
         for lim in limits:
@@ -672,6 +701,38 @@ class TestParseCollocate(ParseTestFiles):
         assert_that(not sg.get('collocator', False))
         assert_that(sg['variable'], is_('rain'))
 
+    def test_can_specify_number_of_workers(self):
+        args = ["col", "variable:" + self.escaped_test_directory_files[0], self.escaped_test_directory_files[0] +
+                ':collocator=box', '--workers', '4']
+        args = parse_args(args)
+        eq_(4, args.workers)
+
+    def test_invalid_number_of_workers_gives_error(self):
+        args = ["col", "variable:" + self.escaped_test_directory_files[0], self.escaped_test_directory_files[0] +
+                ':collocator=box', '--workers', '0']
+        try:
+            parse_args(args)
+            assert False
+        except SystemExit as e:
+            if e.code != 2:
+                raise e
+
+    def test_can_specify_number_of_read_workers(self):
+        args = ["col", "variable:" + self.escaped_test_directory_files[0], self.escaped_test_directory_files[0] +
+                ':collocator=box', '--read-workers', '8']
+        args = parse_args(args)
+        eq_(8, args.read_workers)
+
+    def test_invalid_number_of_read_workers_gives_error(self):
+        args = ["col", "variable:" + self.escaped_test_directory_files[0], self.escaped_test_directory_files[0] +
+                ':collocator=box', '--read-workers', '0']
+        try:
+            parse_args(args)
+            assert False
+        except SystemExit as e:
+            if e.code != 2:
+                raise e
+
     def test_can_specify_one_valid_samplefile_and_one_complete_datagroup(self):
         args = ["col", "variable:" + self.escaped_test_directory_files[0], self.escaped_test_directory_files[0] +
                 ":collocator=col,constraint=con,kernel=nn"]
@@ -774,3 +835,25 @@ class TestParseInfo(ParseTestFiles):
         assert_that(dg[0]['filenames'], is_([self.test_directory_files[0]]))
         assert_that(dg[0].get('product', None), is_('cis'))
         assert_that(dg[0].get('variables', None), is_([var1]))
+
+
+class TestParseIndex(ParseTestFiles):
+    """
+    Tests specific to the index command
+    """
+
+    def test_GIVEN_index_command_WHEN_directory_and_product_present_THEN_files_and_product_set(self):
+        args = ["index", self.escaped_test_directory + ':product=cis']
+        main_args = parse_args(args)
+        dg = main_args.datagroups
+        assert_that(len(dg), is_(1))
+        assert_that(dg[0]['filenames'], is_(self.test_directory_files))
+        assert_that(dg[0].get('product', None), is_('cis'))
+
+    def test_GIVEN_directory_with_catalog_WHEN_files_expanded_THEN_catalog_not_included(self):
+        import os
+        from cis.data_io.file_catalog import CATALOG_FILENAME
+        open(os.path.join(self.test_directory, CATALOG_FILENAME), 'w').close()
+        for files in [self.escaped_test_directory, os.path.join(self.escaped_test_directory, '*')]:
+            main_args = parse_args(["index", files])
+            assert_that(main_args.datagroups[0]['filenames'], is_(self.test_directory_files))
@@ -292,6 +292,19 @@ class TestUtils(unittest.TestCase):
         conc = concatenate(arrays)
         assert numpy.ma.count_masked(conc) == 1
 
+    def test_GIVEN_2d_arrays_of_different_types_WHEN_concatenate_along_axis_THEN_matches_numpy(self):
+        arrays = [numpy.ma.array([[0, 90], [1, 2]], mask=[[False, True], [False, False]]),
+                  numpy.array([[0.5], [180.]]), numpy.ma.array([[3, 4, 5], [6, 7, 8]], dtype=numpy.int8)]
+        conc = concatenate(arrays, axis=1)
+        expected = numpy.ma.concatenate(arrays, axis=1)
+        assert conc.dtype == expected.dtype
+        assert numpy.array_equal(conc.data, expected.data)
+        assert numpy.array_equal(numpy.ma.getmaskarray(conc), numpy.ma.getmaskarray(expected))
+
+    def test_GIVEN_arrays_of_different_shapes_WHEN_concatenate_THEN_raises_ValueError(self):
+        with self.assertRaises(ValueError):
+            concatenate([numpy.zeros((2, 3)), numpy.zeros((2, 1))])
+
 
 class TestFindLongitudeWrapStart(unittest.TestCase):
 
@@ -308,3 +321,61 @@ class TestFindLongitudeWrapStart(unittest.TestCase):
         data = make_regular_2d_ungridded_data(lat_dim_length=2, lon_dim_length=90, lon_min=5, lon_max=345.)
 
         eq_(find_longitude_wrap_start(data), 0)
+
+
+class TestSearchsorted(unittest.TestCase):
+
+    def _assert_matches_numpy(self, array, values):
+        for side in ['left', 'right']:
+            numpy.testing.assert_array_equal(searchsorted(array, values, side), numpy.searchsorted(array, values, side))
+
+    def test_GIVEN_evenly_spaced_array_THEN_matches_numpy_searchsorted(self):
+        array = numpy.linspace(-180, 180, 721)
+        values = numpy.concatenate([numpy.random.RandomState(0).uniform(-200, 200, 1000), array,
+                                    numpy.nextafter(array, numpy.inf), numpy.nextafter(array, -numpy.inf),
+                                    [numpy.nan, numpy.inf, -numpy.inf]])
+        assert is_uniformly_spaced(array)
+        self._assert_matches_numpy(array, values)
+        self._assert_matches_numpy(array.astype(numpy.float32), values)
+
+    def test_GIVEN_nearly_evenly_spaced_array_THEN_matches_numpy_searchsorted(self):
+        rng = numpy.random.RandomState(1)
+        array = numpy.arange(50.0) + rng.uniform(-0.1, 0.1, 50)
+        assert is_uniformly_spaced(array)
+        self._assert_matches_numpy(array, numpy.concatenate([rng.uniform(-5, 55, 1000), array]))
+
+    def test_GIVEN_unevenly_spaced_array_THEN_matches_numpy_searchsorted(self):
+        array = numpy.array([0., 1., 2., 10., 11.])
+        assert not is_uniformly_spaced(array)
+        self._assert_matches_numpy(array, numpy.linspace(-1, 12, 27))
+
+
+def _read_slowly_and_get_workers(item):
+    import time
+    time.sleep(0.01 * (item % 3))
+    return item, get_read_workers()
+
+
+class TestMapFiles(unittest.TestCase):
+
+    def test_results_are_in_the_order_of_the_items(self):
+        with read_workers(4):
+            results = map_files(_read_slowly_and_get_workers, range(10))
+        assert [item for item, _ in results] == list(range(10))
+
+    def test_files_are_read_one_at_a_time_within_each_worker(self):
+        with read_workers(4):
+            results = map_files(_read_slowly_and_get_workers, range(10))
+            assert get_read_workers() == 4
+        assert all(workers == 1 for _, workers in results)
+
+    def test_results_are_in_the_order_of_the_items_when_read_by_processes(self):
+        with read_workers(2):
+            results = map_files(_read_slowly_and_get_workers, range(5), processes=True)
+        assert [item for item, _ in results] == list(range(5))
+
+    def test_number_of_read_workers_is_restored(self):
+        workers = get_read_workers()
+        with read_workers(3):
+            assert get_read_workers() == 3
+        assert get_read_workers() == workers
@@ -5,6 +5,7 @@ import warnings
 import numpy as np
 from cis.exceptions import InvalidCommandLineOptionError
 import contextlib
+import threading
 
 
 # number of bytes in a MB
@@ -24,23 +25,42 @@ def concatenate(arrays, axis=0):
     of the arrays are masked arrays then the returned array will be a masked array with the correct mask, otherwise a
     numpy array is returned.
 
+    The output (and mask) is allocated once and each array copied into its place, so that concatenating many arrays
+    doesn't copy the growing result for each one.
+
     :param arrays: A list of numpy arrays (masked or not)
     :param axis: The axis along which to concatenate (the default is 0)
     :return: The concatenated array
     """
-    from numpy.ma import MaskedArray
-    if any(isinstance(array, MaskedArray) for array in arrays):
-        from numpy.ma import concatenate
-    else:
-        from numpy import concatenate
-
-    res = arrays[0]
-
-    if len(arrays) > 1:
-        for array in arrays[1:]:
-            res = concatenate((res, array), axis)
-
-    return res
+    import numpy as np
+    if len(arrays) == 1:
+        return arrays[0]
+
+    arrays = [np.asanyarray(array) for array in arrays]
+    shape = list(arrays[0].shape)
+    shape[axis] = sum(array.shape[axis] for array in arrays)
+    for array in arrays:
+        array_shape = list(array.shape)
+        array_shape[axis] = shape[axis]
+        if array_shape != shape:
+            raise ValueError("All the arrays must have the same shape, except along the concatenation axis")
+    masked = any(isinstance(array, np.ma.MaskedArray) for array in arrays)
+    has_mask = any(np.ma.getmask(array) is not np.ma.nomask for array in arrays)
+
+    data = np.empty(shape, dtype=np.result_type(*arrays))
+    mask = np.zeros(shape, dtype=bool) if has_mask else None
+    index = [slice(None)] * len(shape)
+    start = 0
+    for array in arrays:
+        index[axis] = slice(start, start + array.shape[axis])
+        data[tuple(index)] = np.ma.getdata(array)
+        if has_mask:
+            mask[tuple(index)] = np.ma.getmaskarray(array)
+        start += array.shape[axis]
+
+    if masked:
+        data = np.ma.masked_array(data, mask=np.ma.nomask if mask is None else mask)
+    return data
 
 
 def calculate_histogram_bin_edges(data, axis, user_min, user_max, step, log_scale=False):
@@ -193,6 +213,56 @@ def array_equal_including_nan(array1, array2):
     return True
 
 
+def is_uniformly_spaced(array):
+    """
+    Are the values of an array evenly spaced, to within a quarter of their spacing? This is enough for
+    :func:`searchsorted` to find the position of any value with one correction step.
+
+    :param array: A sorted 1D numpy array
+    :return: True if the values are evenly spaced
+    """
+    if array.size < 3 or not np.issubdtype(array.dtype, np.number):
+        return False
+    step = (float(array[-1]) - float(array[0])) / (array.size - 1)
+    if not step > 0:
+        return False
+    return np.abs(array - (array[0] + step * np.arange(array.size))).max() <= 0.25 * step
+
+
+def searchsorted(array, values, side='left'):
+    """
+    Find the indices at which the values would be inserted into a sorted array, exactly as :func:`numpy.searchsorted`
+    does (including for NaNs). If the array is evenly spaced, as most grid coordinates are, the indices are calculated
+    from the spacing rather than by a binary search, so each value takes constant rather than logarithmic time.
+
+    :param array: A sorted (ascending) 1D numpy array
+    :param values: The values to find the insertion indices of
+    :param str side: 'left' for the first suitable index, 'right' for the last
+    :return: The insertion indices, with the same shape as the values
+    """
+    array = np.asarray(array)
+    if not is_uniformly_spaced(array):
+        return np.searchsorted(array, values, side=side)
+
+    values = np.asarray(values)
+    size = array.size
+    step = (float(array[-1]) - float(array[0])) / (size - 1)
+    with np.errstate(invalid='ignore'):
+        estimate = np.floor((values - array[0]) / step) + 1
+    # NaNs sort after everything
+    estimate = np.clip(np.where(np.isnan(estimate), size, estimate), 0, size).astype(np.intp)
+
+    # The estimate is at most one out, as every value of the array is within a quarter step of its even spacing
+    below = array[np.maximum(estimate - 1, 0)]
+    above = array[np.minimum(estimate, size - 1)]
+    with np.errstate(invalid='ignore'):
+        if side == 'right':
+            too_high, too_low = below > values, above <= values
+        else:
+            too_high, too_low = below >= values, above < values
+    return estimate - ((estimate > 0) & too_high) + ((estimate < size) & too_low)
+
+
 def get_coord(data_object, variable, data):
     """
     Find a specified coord
@@ -713,6 +783,80 @@ def single_warnings_only():
         yield
 
 
+# The number of files to read at once, set per thread so that files read by a pool of workers are not read by a
+#  further pool within each worker
+_read_settings = threading.local()
+
+
+def get_read_workers():
+    """
+    Get the number of files to read at once: the number set by :func:`read_workers`, or otherwise by the
+    ``CIS_READ_WORKERS`` environment variable (one, i.e. reading files in turn, by default).
+
+    :return int: The number of files to read at once
+    """
+    import os
+    workers = getattr(_read_settings, 'workers', None)
+    if workers is None:
+        workers = int(os.environ.get("CIS_READ_WORKERS", 1))
+    return workers
+
+
+@contextlib.contextmanager
+def read_workers(workers):
+    """
+    Set the number of files to read at once within this context.
+
+    :param int workers: The number of files to read at once, or None to leave the number unchanged
+    """
+    previous = getattr(_read_settings, 'workers', None)
+    if workers is not None:
+        if workers < 1:
+            raise ValueError("The number of read workers must be at least one")
+        _read_settings.workers = workers
+    try:
+        yield
+    finally:
+        _read_settings.workers = previous
+
+
+def _read_in_worker(function, item):
+    with read_workers(1):
+        return function(item)
+
+
+def map_files(function, items, processes=False):
+    """
+    Apply a function which reads a file (or a variable from one) to each of a list of items, reading up to
+    :func:`get_read_workers` of them at once. The results are returned in the same order as the items, however many
+    are read at once.
+
+    By default the files are read by a pool of threads, which suits libraries which release the GIL while reading, such
+    as netCDF4 (note that the underlying C libraries must have been built thread-safe to read more than one file at
+    once, so this mustn't be used for HDF4 files). A pool of processes can be used instead for reading functions which
+    are mostly Python, as long as the function and its results can be pickled.
+
+    :param callable function: The function to call with each item
+    :param list items: The files or variables to read
+    :param bool processes: Read with a pool of processes, rather than threads
+    :return list: The result of the function for each item
+    """
+    from functools import partial
+    items = list(items)
+    workers = min(get_read_workers(), len(items))
+    if workers <= 1:
+        return [function(item) for item in items]
+
+    from multiprocessing import Pool
+    from multiprocessing.pool import ThreadPool
+    pool = Pool(workers) if processes else ThreadPool(workers)
+    try:
+        return list(pool.imap(partial(_read_in_worker, function), items))
+    finally:
+        pool.close()
+        pool.join()
+
+
 def squeeze(data):
     from iris.cube import Cube
     from iris.util import squeeze